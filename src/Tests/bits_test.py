@@ -0,0 +1,75 @@
+import random
+from array import array
+from types import SimpleNamespace
+
+import pytest
+from Utils import bits, bitarrays
+from Utils.bitarrays import BitLayout
+
+
+@pytest.fixture(params=('numpy', 'python'))
+def backend(request, monkeypatch):
+    if request.param == 'python': monkeypatch.setattr(bitarrays, 'numpy', None)
+    return request.param
+
+
+def test_extract_legacy():
+    assert bits.extract(0b01100, tobit=2) == 0b11
+    assert bits.extract(0b1100_0010, 6, 6) == 0b1
+    assert bits.extract(0b0011_1010, 4, 2) == 0b110
+    assert bits.extract(1 << 100 | 0b110, tobit=1) == 1 << 99 | 0b11
+
+
+def test_batched_same_semantics(backend):
+    random.seed(1)
+    data = [random.getrandbits(16) for _ in range(200)] + [0, 0xFFFF]
+    buffer = array('H', data)
+    for frombit, tobit in ((None, 0), (None, 3), (0, 0), (7, 4), (15, 0), (3, 3)):
+        assert list(bitarrays.extract(buffer, frombit, tobit)) == [bits.extract(v, frombit, tobit) for v in data]
+    assert list(bitarrays.set(buffer, (0, 5))) == [bits.set((0, 5), v) for v in data]
+    assert list(bitarrays.clear(buffer, 15)) == [bits.clear(v, 15) for v in data]
+    assert list(bitarrays.flag(memoryview(buffer), 9)) == [bits.flag(v, 9) for v in data]
+    matrix = bitarrays.flags(buffer, 16)
+    assert [tuple(row) for row in matrix] == [bits.flags(v, 16) for v in data]
+    assert list(bitarrays.bitsarray(matrix)) == data
+    assert list(bitarrays.words(buffer.tobytes())) == data
+
+
+def test_bit_layout(backend):
+    layout = BitLayout('<u2', ready=0, error=1, mode=(4, 2), counter=(15, 8))
+    assert layout.unpack(0x0105) == dict(ready=True, error=False, mode=1, counter=1)
+    assert layout.pack(ready=True, mode=1, counter=1) == 0x0105
+
+    payload = bytes.fromhex('0501 1FFF 0000')  # bits [7..5] are not described by layout
+    columns = layout.decode(payload)
+    assert list(columns['ready']) == [True, True, False]
+    assert list(columns['counter']) == [1, 0xFF, 0]
+    assert bytes(array('H', layout.encode(**columns))) == payload
+    assert list(layout.encode(mode=[7, 8])) == [0b11100, 0]  # values are truncated to field width
+
+    with pytest.raises(ValueError): BitLayout(a=(3, 0), b=3)
+    with pytest.raises(ValueError): BitLayout('<u1', a=(8, 0))
+    with pytest.raises(ValueError): layout.encode(unknown=[1])
+
+
+def test_bit_struct():
+    from Utils import BitStruct
+    header = BitStruct('Header', (('start', 'B'), ('address', 'B'),
+                                  ('length', BitLayout('<u2', words=(11, 0), even=15)), ('rfc', '2s')))
+    assert header.size == 6 and header.names == ('start', 'address', 'words', 'even', 'rfc')
+    packed = header.pack(0x5A, 0x0C, words=6, even=True, rfc=b'\x9F\x73')
+    assert packed == bytes.fromhex('5A 0C 06 80 9F 73')
+    record = header.unpack(packed)
+    assert record == (0x5A, 0x0C, 6, True, b'\x9F\x73') and record.even is True
+    assert header.encode(record) == header.encode(SimpleNamespace(**record._asdict())) == packed
+
+    buffer = bytearray(8)
+    header.pack_into(buffer, 2, 0x5A, words=0xFFFF)  # values are truncated to field width
+    assert buffer == bytes.fromhex('0000 5A 00 FF 0F 0000')
+    assert list(header.iter_unpack(packed * 3)) == [record] * 3
+
+    with pytest.raises(ValueError): BitStruct('Bad', (('offset', 'B'),))
+    with pytest.raises(ValueError): BitStruct('Bad', (('a', 'B'), ('b', BitLayout('<u1', a=0))))
+    with pytest.raises(ValueError): BitStruct('Bad', (('b', BitLayout('>u2', a=0)),), '<')
+    big = BitStruct('Big', (('b', BitLayout('>u2', hi=(15, 8), lo=(7, 0))), ('c', BitLayout('u1', x=0))), '!')
+    assert big.unpack_from(b'\x12\x34\x01') == big.Record(hi=0x12, lo=0x34, x=1)
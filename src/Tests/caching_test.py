@@ -0,0 +1,206 @@
+import gc
+from threading import Thread
+from time import sleep
+
+import pytest
+from Utils import memo, memoLastPosArgs
+
+
+def test_memo_function():
+    calls = []
+
+    @memo
+    def square(x, power=2):
+        calls.append(x)
+        return x ** power
+
+    assert [square(3), square(3), square(3, power=3), square(3, power=3)] == [9, 9, 27, 27]
+    assert calls == [3, 3]
+    info = square.cache_info()
+    assert (info.hits, info.misses, info.currsize, info.maxsize) == (2, 2, 2, None)
+    square.invalidate(3)
+    square(3)
+    assert calls == [3, 3, 3]
+    square.cache_clear()
+    assert square.cache_info().currsize == 0
+
+
+@pytest.mark.parametrize('policy, evicted', (('LRU', 1), ('LFU', 2)))
+def test_memo_bounded(policy, evicted):
+    calls = []
+
+    @memo(maxsize=2, policy=policy)
+    def identity(x):
+        calls.append(x)
+        return x
+
+    for x in (1, 1, 1, 2, 3): identity(x)
+    calls.clear()
+    identity(evicted)
+    assert calls == [evicted]
+    assert identity.cache_info().evictions == 2
+    with pytest.raises(ValueError): memo(identity, policy='MRU')
+
+
+def test_memo_ttl():
+    calls = []
+
+    @memo(ttl=0.05)
+    def identity(x):
+        calls.append(x)
+        return x
+
+    identity(1), identity(1)
+    sleep(0.06)
+    identity(1)
+    assert calls == [1, 1]
+    assert identity.cache_info().expired == 1
+
+
+def test_memo_per_instance():
+    class Device:
+        def __init__(self, name): self.name = name
+
+        @memo
+        def describe(self, suffix):
+            return self.name + suffix
+
+    class SlottedDevice(Device):
+        __slots__ = 'name',
+
+    first, second = Device('first'), Device('second')
+    assert first.describe('!') == 'first!'
+    assert second.describe('!') == 'second!'  # instances do not share results
+    assert Device.describe.cache_info().currsize == 2
+    Device.describe.cache_clear(first)
+    assert Device.describe.cache_info().currsize == 1
+
+    del first, second
+    gc.collect()
+    assert Device.describe.cache_info().currsize == 0  # caches are freed with instances
+
+    local = SlottedDevice.__new__(SlottedDevice)  # no __weakref__ slot, shared cache is used
+    local.name = 'slotted'
+    assert local.describe('?') == local.describe('?') == 'slotted?'
+
+
+def test_memo_threads():
+    @memo(maxsize=16)
+    def double(x): return x * 2
+
+    errors = []
+
+    def worker():
+        try:
+            for i in range(2000): assert double(i % 32) == i % 32 * 2
+        except Exception as e: errors.append(e)
+
+    threads = [Thread(target=worker) for _ in range(4)]
+    for thread in threads: thread.start()
+    for thread in threads: thread.join()
+    assert not errors
+    assert double.cache_info().currsize <= 16
+
+
+def test_memo_last_pos_args():
+    class Device:
+        def __init__(self, value): self.value = value
+
+        @memoLastPosArgs
+        def scaled(self, factor): return self.value * factor
+
+    assert Device(2).scaled(3) == 6
+    assert Device(5).scaled(3) == 15
+
+    calls = []
+
+    @memoLastPosArgs
+    def total(values):
+        calls.append(values)
+        return sum(values)
+
+    # ▼ Unhashable arguments are compared by equality
+    assert total([1, 2]) == total([1, 2]) == 3 and len(calls) == 1
+    assert total([1, 3]) == 4 and total([1, 2]) == 3 and len(calls) == 3
+
+
+def test_memo_lfu_large():
+    calls = []
+
+    @memo(maxsize=1000, policy='LFU')
+    def square(x):
+        calls.append(x)
+        return x * x
+
+    for x in range(1000):
+        for _ in range(x % 10 + 1): square(x)
+    # ▼ Each new key is used twice right away, so only least used old keys are evicted
+    for x in range(1000, 1100):
+        square(x), square(x)
+    assert square.cache_info().evictions == 100
+    survivors = [x for x in range(1100) if x >= 1000 or x % 10]
+    del calls[:]
+    for x in survivors: square(x)
+    assert calls == []
+
+
+def test_cached_property():
+    from Utils import cachedproperty
+
+    class Device:
+        def __init__(self): self.calls = 0
+
+        @cachedproperty
+        def model(self):
+            """ Device model """
+            self.calls += 1
+            return f'model-{self.calls}'
+
+    device = Device()
+    assert Device.model.__doc__.strip() == 'Device model'
+    assert device.model == device.model == 'model-1'
+    assert 'model' in vars(device)  # subsequent reads bypass the descriptor
+    del device.model
+    assert device.model == 'model-2'
+    cachedproperty.invalidate(device)
+    assert device.model == 'model-3' and Device().model == 'model-1'
+
+
+def test_cached_property_slots():
+    from Utils import add_slots, cachedproperty
+
+    calls = []
+
+    class Base:
+        __slots__ = ()
+
+        def __getattr__(self, name): return f'fallback-{name}'
+
+    @add_slots
+    class Register(Base):
+        address: int
+
+        def __init__(self, address): self.address = address
+
+        @cachedproperty
+        def name(self):
+            calls.append(self.address)
+            sleep(0.01)
+            return f'R{self.address}'
+
+    register = Register(5)
+    assert Register.__dictoffset__ == 0  # no instance __dict__
+    threads = [Thread(target=lambda: register.name) for _ in range(8)]
+    for thread in threads: thread.start()
+    for thread in threads: thread.join()
+    assert register.name == 'R5' and calls == [5]
+    assert register.other == 'fallback-other'
+    cachedproperty.invalidate(register, 'name')
+    assert register.name == 'R5' and calls == [5, 5]
+
+    class Plain:
+        __slots__ = ()
+        value = cachedproperty(lambda self: 1)
+
+    with pytest.raises(TypeError):
+        Plain().value
@@ -0,0 +1,85 @@
+""" Startup benchmark of ConfigLoader: cold load of config file parsed from YAML vs from parsed config cache
+        vs lazily loaded sections (only `--touch` of them are accessed, like most tools do)
+        and reload of the file with one section edited (as performed by ConfigLoader.watch())
+    Config file of `--sections` sections is generated, each having scalar params and a numeric table
+        of `--table` entries, like calibration tables of real configs
+            python -m Tests.configloader_benchmarks --sections 30 --table 1000
+"""
+
+import shutil
+from argparse import ArgumentParser
+from os.path import join as joinpath
+from tempfile import mkdtemp
+from time import perf_counter
+
+from Utils import ConfigLoader, configloader
+
+
+def makeClasses(sections: int, table: int):
+    return [type(ConfigLoader)(f'CONFIG{i}', (ConfigLoader,), dict(
+            NAME=f'section {i}', ENABLED=True, GAIN=1.0, CHANNELS=[0, 1, 2, 3],
+            TABLE=[j * 0.001 for j in range(table)]), section=f'SECTION{i}') for i in range(sections)]
+
+
+def coldLoad(classes, cached: bool = False, lazy: bool = False, touch: int = 0) -> float:
+    """ Return time of loading all sections with empty CONFIGS_DICT (as on app startup)
+            and accessing params of first `touch` sections
+    """
+    ConfigLoader.CACHE_PARSED_CONFIG = cached
+    ConfigLoader.LAZY_LOAD = lazy
+    configloader.CONFIGS_DICT = {}
+    configloader.PENDING_SECTIONS = {}
+    for configClass in classes: configClass._materialize_()
+    start = perf_counter()
+    for configClass in classes: configClass.load()
+    for configClass in classes[:touch]: configClass.NAME
+    return perf_counter() - start
+
+
+def editReload(classes, indexed: bool = True) -> float:
+    """ Return time of reloading config file with one param changed (as done by ConfigLoader.watch())
+            `indexed` - whether sections texts of previous file version are known, so only edited one is parsed
+    """
+    path = joinpath(ConfigLoader.path, ConfigLoader.filename)
+    for configClass in classes: configClass.GAIN = 1.0
+    classes[0].save(force=True)
+    with open(path) as file: text = file.read()
+    configloader.FILE_SECTIONS.clear()
+    if indexed: configloader.FILE_SECTIONS.update(configloader._indexSections_(text))
+    with open(path, 'w') as file: file.write(text.replace('GAIN: 1.0', 'GAIN: 2.0', 1))
+    start = perf_counter()
+    assert len(classes[0].reload()) == 1
+    return perf_counter() - start
+
+
+def main():
+    parser = ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sections', type=int, default=30)
+    parser.add_argument('--table', type=int, default=1000, help="Numeric table entries per section")
+    parser.add_argument('--touch', type=int, default=3, help="Sections accessed after lazy load")
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    configloader.log.disabled = True
+    ConfigLoader.path = mkdtemp()
+    try:
+        classes = makeClasses(args.sections, args.table)
+        classes[0].save(force=True)
+        coldLoad(classes, cached=True)  # create cache
+        size = sum(len(line) for line in open(joinpath(ConfigLoader.path, ConfigLoader.filename)))
+        print(f"Config: {args.sections} sections × {args.table} table entries, {size / 1024:.0f} kB")
+        cases = {'YAML': dict(), 'cache': dict(cached=True),
+                 f'lazy ({args.touch} sections accessed)': dict(lazy=True, touch=args.touch)}
+        for name, options in cases.items():
+            elapsed = min(coldLoad(classes, **options) for _ in range(args.repeat))
+            print(f"{name:<32} {elapsed * 1000:>10.1f} ms")
+        coldLoad(classes)
+        for name, indexed in (('reload, whole file parsed', False), ('reload, edited section parsed', True)):
+            elapsed = min(editReload(classes, indexed) for _ in range(args.repeat))
+            print(f"{name:<32} {elapsed * 1000:>10.1f} ms")
+    finally:
+        shutil.rmtree(ConfigLoader.path)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,4 +1,4 @@
-from os import remove, rmdir
+from os import remove, rmdir, replace
 from os.path import join as joinpath, isfile, isdir, dirname
 from shutil import copyfile
 
@@ -11,6 +11,8 @@ PATH = dirname(__file__) + r"\configs\.PelengTools\Tests\ConfigLoader"
 savedState = {
     'BASE_PATH': ConfigLoader.BASE_PATH,
     'AUTO_CREATE_CONFIG_FILE': ConfigLoader.AUTO_CREATE_CONFIG_FILE,
+    'CACHE_PARSED_CONFIG': ConfigLoader.CACHE_PARSED_CONFIG,
+    'LAZY_LOAD': ConfigLoader.LAZY_LOAD,
     'filename': ConfigLoader.filename,
     'path': ConfigLoader.path,
     'loader': ConfigLoader.loader,
@@ -24,6 +26,10 @@ def reset(f):
     def reset_configloader_wrapper(*args, **kwargs):
         configloader.CONFIG_CLASSES = set()
         configloader.CONFIGS_DICT = {}
+        configloader.PENDING_SECTIONS = {}
+        configloader.SECTION_TEXTS = {}
+        configloader.FILE_SECTIONS.clear()
+        configloader.SECTION_ORDER.clear()
         for name, value in savedState.items():
             setattr(ConfigLoader, name, value)
         ConfigLoader.loader.default_flow_style = False
@@ -288,6 +294,28 @@ def test_check_invalid_types():
     ConfigLoader.members = classmethod(original_members_func)
 
 
+def test_check_invalid_types_large_tables():
+    shared = [object()]
+    table = [float(i) for i in range(100_000)]
+    members = [('TABLE', table), ('MATRIX', [table] * 1000), ('A', [shared, shared]), ('B', {'s': shared})]
+    original_members_func = ConfigLoader.members.__func__
+    ConfigLoader.members = lambda: iter(members)
+    try:
+        # ▼ Shared table is traversed once, shared list met at the same depth is reported under each of its names
+        assert ConfigLoader._checkInvalidTypes_() == {'A[0][0]', 'A[1][0]', 'B[s][0]'}
+    finally:
+        ConfigLoader.members = classmethod(original_members_func)
+
+
+def test_detach():
+    from Utils.configloader import _detach
+    for value in (1, 'a', (1, ('b', None))):
+        assert _detach(value) is value
+    for value in ([1.0, 2.0], {1, 2}, {'a': 1}, [[1], {'b': [2]}], ([1],)):
+        copy = _detach(value)
+        assert copy == value and copy is not value
+
+
 @reset
 def test_wrong_config_file():
     class CONFIG(ConfigLoader, section='TEST'):
@@ -717,3 +745,285 @@ def test_ignore_updates_unit():  # TODO: ignoreUpdates concerns saving config
     )
 
     # remove(joinpath(PATH, 'testconfig_save_triple.yaml'))
+
+
+@reset
+def test_dirty_tracking_save():
+    from tempfile import mkdtemp
+
+    class CONFIG(ConfigLoader, section='DIRTY'):
+        NAME = 'name'
+        TABLE = [1, 2]
+
+    class OTHER(ConfigLoader, section='OTHER'):
+        VALUE = 1.5
+
+    ConfigLoader.path = mkdtemp()
+    ConfigLoader.filename = 'testconfig_dirty.yaml'
+    configFilePath = joinpath(ConfigLoader.path, ConfigLoader.filename)
+
+    assert CONFIG.save() is True
+    assert CONFIG.updated is False and OTHER.updated is False
+    assert CONFIG._dirty_ is False and CONFIG.save() is False
+    otherText = configloader.SECTION_TEXTS['OTHER']
+
+    CONFIG.TABLE.append(3)  # in-place change is not an assignment, but is still detected
+    assert CONFIG._dirty_ is False and CONFIG.updated is True
+    assert configloader.CONFIGS_DICT['DIRTY']['TABLE'] == [1, 2]
+    CONFIG.NAME = 'new'
+    assert CONFIG._dirty_ is True
+    assert CONFIG.save() is True
+    assert configloader.SECTION_TEXTS['OTHER'] is otherText  # unchanged section is not re-dumped
+    assert isfile(configFilePath + '.bak') and not isfile(configFilePath + '.tmp')
+
+    with open(configFilePath) as file:
+        assert YAML(typ='safe').load(file) == dict(DIRTY=dict(NAME='new', TABLE=[1, 2, 3]), OTHER=dict(VALUE=1.5))
+    with open(configFilePath + '.bak') as file:
+        assert YAML(typ='safe').load(file) == dict(DIRTY=dict(NAME='name', TABLE=[1, 2]), OTHER=dict(VALUE=1.5))
+
+    CONFIG.NAME = 'name'
+    CONFIG.NAME = 'new'
+    assert CONFIG.updated is False
+
+
+@reset
+def test_parsed_config_cache():
+    from tempfile import mkdtemp
+
+    class CONFIG(ConfigLoader, section='CACHED'):
+        NAME = ''
+        TABLE = (0.0,)
+
+    ConfigLoader.path = mkdtemp()
+    ConfigLoader.filename = 'testconfig_cached.yaml'
+    ConfigLoader.CACHE_PARSED_CONFIG = True
+    configFilePath = joinpath(ConfigLoader.path, ConfigLoader.filename)
+    with open(configFilePath, 'w') as file:
+        file.write('CACHED:\n  NAME: cached\n  TABLE: [1.5, 2.5]\n')
+
+    CONFIG.load()
+    assert isfile(configFilePath + '.cache')
+    assert CONFIG.NAME == 'cached' and CONFIG.TABLE == (1.5, 2.5)
+
+    class FailingLoader:
+        def load(self, stream): raise AssertionError("YAML should not be parsed")
+
+    # ▼ Valid cache is used instead of parsing YAML
+    ConfigLoader.loader = FailingLoader()
+    configloader.CONFIGS_DICT = {}
+    CONFIG.NAME = ''
+    CONFIG.load()
+    assert CONFIG.NAME == 'cached'
+    assert configloader.CONFIGS_DICT == dict(CACHED=dict(NAME='cached', TABLE=(1.5, 2.5)))
+
+    # ▼ Changed config file invalidates cache
+    ConfigLoader.loader = savedState['loader']
+    with open(configFilePath, 'w') as file:
+        file.write('CACHED:\n  NAME: edited\n  TABLE: [1.5, 2.5]\n')
+    CONFIG.load(force=True)
+    assert CONFIG.NAME == 'edited'
+
+
+@reset
+def test_lazy_load():
+    from tempfile import mkdtemp
+
+    class LAZY1(ConfigLoader, section='LAZY1'):
+        NAME = ''
+        GAIN = 1.0
+
+    class LAZY2(ConfigLoader, section='LAZY2'):
+        TABLE = ()
+
+    class MISSING(ConfigLoader, section='MISSING'):
+        VALUE = 7
+
+    ConfigLoader.path = mkdtemp()
+    ConfigLoader.filename = 'testconfig_lazy.yaml'
+    ConfigLoader.LAZY_LOAD = True
+    configFilePath = joinpath(ConfigLoader.path, ConfigLoader.filename)
+    with open(configFilePath, 'w') as file:
+        file.write('# comment\nLAZY1:\n  NAME: lazy\n  GAIN: 2\nLAZY2:\n  TABLE: [1, 2]\nOTHER: {A: 1}\n')
+
+    for configClass in (LAZY1, LAZY2, MISSING): configClass.load()
+    assert configloader.CONFIGS_DICT == {}
+    assert set(configloader.PENDING_SECTIONS) == {'LAZY1', 'LAZY2', 'OTHER'}
+    assert LAZY1.updated is False and 'NAME' not in vars(LAZY1)
+
+    # ▼ First access materializes and casts only the accessed section
+    assert LAZY1.NAME == 'lazy' and LAZY1.GAIN == 2.0 and type(LAZY1.GAIN) is float
+    assert configloader.CONFIGS_DICT == dict(LAZY1=dict(NAME='lazy', GAIN=2.0))
+    assert LAZY1.updated is False
+    assert MISSING.VALUE == 7 and configloader.CONFIGS_DICT['MISSING'] == dict(VALUE=7)
+
+    # ▼ Assignment materializes the section before assigning
+    LAZY2.TABLE = (3,)
+    assert LAZY2.updated is True and configloader.CONFIGS_DICT['LAZY2'] == dict(TABLE=(1, 2))
+
+    # ▼ Sections never materialized are saved back as is, in the order of config file
+    LAZY1.save()
+    with open(configFilePath) as file:
+        text = file.read()
+    assert YAML(typ='safe').load(text) == dict(LAZY1=dict(NAME='lazy', GAIN=2.0), LAZY2=dict(TABLE=[3]),
+                                               MISSING=dict(VALUE=7), OTHER=dict(A=1))
+    assert list(configloader._indexSections_(text)) == ['LAZY1', 'LAZY2', 'OTHER', 'MISSING']
+
+    # ▼ Config files which cannot be split into sections safely are parsed as a whole
+    assert configloader._indexSections_('A: &a {X: 1}\nB: *a\n') is None
+    assert configloader._indexSections_('{A: 1}\n') is None
+    assert configloader._indexSections_('1: x\n') is None
+    assert configloader._indexSections_('A:\n  X: 1\n\nB: 2\n') == {'A': 'A:\n  X: 1\n\n', 'B': 'B: 2\n'}
+    assert configloader._indexSections_('A: 1\nB:\n  Y: 2') == {'A': 'A: 1\n', 'B': 'B:\n  Y: 2\n'}
+
+
+@reset
+def test_lazy_load_no_trailing_newline():
+    from tempfile import mkdtemp
+
+    class NEW(ConfigLoader, section='C'):
+        Z = 3
+
+    ConfigLoader.path = mkdtemp()
+    ConfigLoader.filename = 'testconfig_lazy_newline.yaml'
+    ConfigLoader.LAZY_LOAD = True
+    configFilePath = joinpath(ConfigLoader.path, ConfigLoader.filename)
+    with open(configFilePath, 'w') as file: file.write('A:\n  X: 1\nB:\n  Y: 2')
+    NEW.load()
+    assert NEW.Z == 3
+    NEW.save(force=True)
+    with open(configFilePath) as file:
+        assert YAML(typ='safe').load(file) == dict(A=dict(X=1), B=dict(Y=2), C=dict(Z=3))
+
+
+@reset
+def test_lazy_load_concurrent_access():
+    from tempfile import mkdtemp
+    from threading import Thread
+
+    class LAZY(ConfigLoader, section='LAZY'):
+        NAME = ''
+        TABLE = ()
+
+    ConfigLoader.path = mkdtemp()
+    ConfigLoader.filename = 'testconfig_lazy_threads.yaml'
+    ConfigLoader.LAZY_LOAD = True
+    with open(joinpath(ConfigLoader.path, ConfigLoader.filename), 'w') as file:
+        file.write('LAZY:\n  NAME: lazy\n  TABLE: [1, 2]\n')
+    LAZY.load()
+
+    # ▼ Reader whose class dict lookup missed the param before other thread materialized the section
+    LAZY._materialize_()
+    assert type(LAZY).__getattr__(LAZY, 'NAME') == 'lazy'
+    with pytest.raises(AttributeError):
+        type(LAZY).__getattr__(LAZY, 'MISSING')
+
+    LAZY._defer_()
+    results = []
+    threads = [Thread(target=lambda: results.append((LAZY.NAME, LAZY.TABLE))) for _ in range(8)]
+    for thread in threads: thread.start()
+    for thread in threads: thread.join()
+    assert results == [('lazy', (1, 2))] * 8
+
+
+@reset
+def test_reload():
+    from tempfile import mkdtemp
+
+    class TUNING(ConfigLoader, section='TUNING'):
+        GAIN = 1.0
+        TABLE = (1, 2)
+
+    class OTHER(ConfigLoader, section='OTHER'):
+        NAME = 'other'
+
+    ConfigLoader.path = mkdtemp()
+    ConfigLoader.filename = 'testconfig_reload.yaml'
+    configFilePath = joinpath(ConfigLoader.path, ConfigLoader.filename)
+    with open(configFilePath, 'w') as file:
+        file.write('TUNING:\n  GAIN: 2\n  TABLE: [1, 2]\nOTHER:\n  NAME: x\n')
+    TUNING.load()
+    OTHER.load()
+    calls = []
+    TUNING.onChange(calls.append)
+    OTHER.onChange(lambda changed: 1/0)  # failing callback does not break reload
+
+    assert TUNING.reload() == set() and calls == []
+
+    with open(configFilePath, 'w') as file:
+        file.write('TUNING:\n  GAIN: 3\n  TABLE: [1, 2]  # comment\nOTHER:\n  NAME: y\n')
+    assert TUNING.reload() == {'TUNING', 'OTHER'}
+    assert calls == [dict(GAIN=3.0)] and type(TUNING.GAIN) is float and OTHER.NAME == 'y'
+    assert TUNING.updated is False and configloader.CONFIGS_DICT['TUNING'] == dict(GAIN=3.0, TABLE=(1, 2))
+
+    # ▼ Only edited sections are parsed, invalid YAML keeps current values
+    assert configloader.FILE_SECTIONS['OTHER'] == 'OTHER:\n  NAME: y\n'
+    with open(configFilePath, 'w') as file:
+        file.write('TUNING:\n  GAIN: [3\nOTHER:\n  NAME: y\n')
+    assert TUNING.reload() == set() and TUNING.GAIN == 3.0
+
+
+def watchConfig(polling):
+    from tempfile import mkdtemp
+    from threading import Event
+
+    class WATCHED(ConfigLoader, section='WATCHED'):
+        GAIN = 1.0
+
+    ConfigLoader.path = mkdtemp()
+    ConfigLoader.filename = 'testconfig_watch.yaml'
+    configFilePath = joinpath(ConfigLoader.path, ConfigLoader.filename)
+    with open(configFilePath, 'w') as file: file.write('WATCHED:\n  GAIN: 2.0\n')
+    WATCHED.load()
+    changed = Event()
+    WATCHED.onChange(lambda params: changed.set())
+
+    with WATCHED.watch(interval=0.01, debounce=0.05, polling=polling) as watcher:
+        # ▼ Own saves are reloaded, but change nothing
+        WATCHED.save(force=True)
+        with open(configFilePath, 'w') as file: file.write('WATCHED:\n  GAIN: 5.0\n')
+        assert changed.wait(5)
+        assert WATCHED.GAIN == 5.0
+    assert watcher.thread.is_alive() is False and watcher.reloads >= 1
+
+    # ▼ Stopped watcher may be restarted, file moved away and back is noticed
+    changed.clear()
+    with watcher:
+        replace(configFilePath, configFilePath + '.moved')
+        with open(configFilePath + '.moved', 'w') as file: file.write('WATCHED:\n  GAIN: 6.0\n')
+        replace(configFilePath + '.moved', configFilePath)
+        assert changed.wait(5)
+        assert WATCHED.GAIN == 6.0
+
+
+@reset
+def test_watch_inotify(): watchConfig(polling=False)
+
+
+@reset
+def test_watch_polling(): watchConfig(polling=True)
+
+
+@reset
+def test_save_keeps_config_file():
+    from tempfile import mkdtemp
+
+    class KEPT(ConfigLoader, section='KEPT'):
+        VALUE = 1
+
+    ConfigLoader.path = mkdtemp()
+    ConfigLoader.filename = 'testconfig_kept.yaml'
+    configFilePath = joinpath(ConfigLoader.path, ConfigLoader.filename)
+    KEPT.save(force=True)
+    with open(configFilePath) as file: previous = file.read()
+
+    # ▼ Config file is never missing while being saved
+    original = configloader.replace
+    def checkedReplace(source, target):
+        assert isfile(configFilePath)
+        original(source, target)
+    configloader.replace = checkedReplace
+    KEPT.VALUE = 2
+    try: assert KEPT.save() is True
+    finally: configloader.replace = original
+    with open(configFilePath + '.bak') as file: assert file.read() == previous
+    with open(configFilePath) as file: assert YAML(typ='safe').load(file) == dict(KEPT=dict(VALUE=2))
@@ -0,0 +1,40 @@
+import io
+
+from Utils import bytewise, bytewise_format, bitwise, hexdump, hexlines
+
+
+def test_bytewise():
+    assert bytewise(b'') == bytewise(None) == '<Void>'
+    assert bytewise(bytes.fromhex('0055FF01')) == '00 55 FF 01'
+    assert bytewise(bytearray(b'\x5A\x00')) == bytewise(memoryview(b'\x5A\x00')) == '5A 00'
+    data = bytes(range(100))
+    assert bytewise(data, collapseAfter=100) == bytewise(data)
+    assert bytewise(data, collapseAfter=10) == '00 01 02 ... 63 (100 bytes)'
+    assert bytewise(data, collapseAfter=12) == '00 01 02 0 ... 63 (100 bytes)'
+
+
+def test_bytewise_format():
+    assert bytewise_format([0, 90, 255]) == bytewise_format(b'\x00\x5A\xFF') == '00 5A FF'
+    assert bytewise_format(b'', void='-') == '-'
+
+
+def test_bitwise():
+    assert bitwise(b'FG') == '0100 0110  0100 0111'
+    assert bitwise(b'') == ''
+    assert bitwise(None) == '<Void>'
+
+
+def test_hexdump():
+    data = bytes(range(0x20, 0x34))
+    assert hexdump(data, text=True).splitlines() == [
+        '00000000  20 21 22 23 24 25 26 27 28 29 2A 2B 2C 2D 2E 2F  | !"#$%&\'()*+,-./|',
+        '00000010  30 31 32 33                                      |0123|',
+    ]
+    assert list(hexlines(data, width=8, offsets=False))[-1] == '30 31 32 33'
+    large = bytes(range(256)) * 1000
+    lines = list(hexlines(large, width=32))
+    assert len(lines) == len(large) // 32
+    assert lines[-1].startswith(f'{len(large) - 32:08X}  E0 E1')
+    file = io.StringIO()
+    hexdump(large, file=file)
+    assert file.getvalue() == hexdump(large) + '\n'
@@ -0,0 +1,51 @@
+import json
+from time import sleep
+
+import pytest
+from Utils import Profiler, Timer
+
+
+def test_spans():
+    profiler = Profiler()
+    for _ in range(3):
+        with profiler.span('outer'):
+            with profiler.span('inner'):
+                sleep(0.001)
+    with profiler.span('other'): pass
+    snapshot = profiler.snapshot()
+    assert list(snapshot) == ['other', 'outer', 'outer/inner']
+    inner = snapshot['outer/inner']
+    assert inner['count'] == 3 and inner['unit'] == 'ns'
+    assert 1_000_000 <= inner['min'] <= inner['p50'] <= inner['p99'] <= inner['max'] <= snapshot['outer']['max']
+    assert json.loads(profiler.json())['outer']['count'] == 3
+    report = profiler.report().splitlines()
+    assert report[0].split()[:3] == ['span', 'count', 'min'] and report[3].startswith('  inner ')
+    profiler.reset()
+    assert profiler.snapshot() == {} and profiler.stats('outer') is None
+
+
+def test_profile_decorator():
+    profiler = Profiler()
+
+    @profiler.profile()
+    def work(x): return x * 2
+
+    @profiler.profile('failing')
+    def fail(): raise ValueError
+
+    assert [work(i) for i in range(5)] == [0, 2, 4, 6, 8]
+    with pytest.raises(ValueError): fail()
+    assert profiler.stats(work.__qualname__)['count'] == 5
+    assert profiler.stats('failing')['count'] == 1
+    profiler.enabled = False
+    work(1)
+    with profiler.span('disabled'): pass
+    assert profiler.stats(work.__qualname__)['count'] == 5 and profiler.stats('disabled') is None
+
+
+def test_timer(capsys):
+    with Timer('ok') as timer: sleep(0.001)
+    assert timer.elapsed >= 0.001 and 'duration' in capsys.readouterr().out
+    with pytest.raises(RuntimeError):
+        with Timer('failing'): raise RuntimeError
+    assert 'execution failure' in capsys.readouterr().out
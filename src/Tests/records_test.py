@@ -0,0 +1,85 @@
+import pickle
+
+import pytest
+from Utils import record, RecordArray, add_slots
+
+
+@record
+class Sample:
+    channel: int
+    value: float = 0.0
+    tags: list = []
+
+
+@record
+class TimedSample(Sample):
+    time: float = 0.0
+
+
+def test_record():
+    sample = Sample(3, 0.5)
+    assert (sample.channel, sample.value, sample.tags) == (3, 0.5, [])
+    assert sample.tags is not Sample(1).tags
+    assert Sample.__fields__ == ('channel', 'value', 'tags') and not hasattr(sample, '__dict__')
+    assert sample == Sample(3, 0.5) != Sample(3, 0.6)
+    with pytest.raises(TypeError): hash(sample)
+    assert repr(sample) == 'Sample(channel=3, value=0.5, tags=[])'
+    assert pickle.loads(pickle.dumps(sample)) == sample
+    with pytest.raises(TypeError): Sample()
+
+
+def test_record_inheritance():
+    timed = TimedSample(1, 2.0, [], 10.0)
+    assert TimedSample.__fields__ == ('channel', 'value', 'tags', 'time')
+    assert TimedSample.__slots__ == ('time',)
+    assert timed.time == 10.0 and timed != Sample(1, 2.0)
+    assert pickle.loads(pickle.dumps(timed)) == timed
+
+    with pytest.raises(TypeError):
+        @record
+        class Invalid(Sample):
+            extra: int
+
+    @add_slots
+    class Slotted(Sample):
+        channel: int
+        extra: int
+
+    assert Slotted.__slots__ == ('extra',)
+
+
+def test_record_options():
+    @record
+    class Unhashable:
+        a: int
+
+    @record(hash=True)
+    class Hashable:
+        a: int
+        b: tuple = ()
+
+    @record(repr=False)
+    class Custom:
+        a: int
+        def __eq__(self, other): return True
+
+    with pytest.raises(TypeError): hash(Unhashable(1))
+    assert hash(Hashable(1, (2,))) == hash(Hashable(1, (2,))) and len({Hashable(1), Hashable(1)}) == 1
+    assert Custom(1) == Custom(2) and repr(Custom(1)).startswith('<')
+
+
+def test_record_array():
+    @record
+    class Point:
+        x: float
+        y: float
+        valid: bool = True
+
+    points = RecordArray(Point, [(1.0, 2.0, True), Point(3.0, 4.0, False)])
+    points.append(Point(5.0, 6.0))
+    assert len(points) == 3 and points[1] == Point(3.0, 4.0, False) and points[2].valid is True
+    assert list(points)[0] == Point(1.0, 2.0) and sum(points.column('x')) == 9.0
+    assert points.column('x').typecode == 'd' and points.column('valid').typecode == 'b'
+    assert RecordArray(Sample, channel='i', value='f', tags='b').column('channel').typecode == 'i'
+    with pytest.raises(TypeError): RecordArray(Sample)
+    with pytest.raises(ValueError): points.append((1.0,))
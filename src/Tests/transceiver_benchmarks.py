@@ -0,0 +1,195 @@
+""" Benchmarks of Transceiver framing hot path
+    Every case is run over in-memory fake serial port, so only framing costs are measured
+    Results are displayed as µs/packet and packets/sec and may be saved to JSON file
+        to be compared against on subsequent runs (so regressions are visible):
+            python -m Tests.transceiver_benchmarks --json before.json
+            python -m Tests.transceiver_benchmarks --compare before.json
+    --pty option adds round trip cases over pseudo-terminal with VirtualDevice (POSIX only)
+"""
+
+import json
+from argparse import ArgumentParser
+from time import perf_counter
+from typing import Callable, Dict
+
+from Utils import Logger
+from Transceiver import PelengTransceiver, rfc1071, lrc
+from Tests.transceiver_test import makePacket
+
+
+CASES: Dict[str, Callable[[int], Callable[[], None]]] = {}
+
+
+def case(name: str):
+    """ Register benchmark case. Decorated function takes number of packets to process
+            and returns callable processing that many packets (setup is not measured)
+    """
+    def decorator(setup):
+        CASES[name] = setup
+        return setup
+    return decorator
+
+
+class MemoryTransceiver(PelengTransceiver):
+    """ PelengTransceiver reading from in-memory stream and writing to nowhere """
+
+    def __init__(self, stream: bytes = b''):
+        super().__init__(device=1)
+        self.rx = stream
+        self.position = 0
+
+    def readSimple(self, size=1) -> bytes:
+        data = self.rx[self.position:self.position + size]
+        self.position += len(data)
+        return data
+
+    def write(self, data) -> int:
+        return len(data)
+
+    @property
+    def in_waiting(self) -> int:
+        return len(self.rx) - self.position
+
+
+def receiving(stream: bytes, n: int) -> Callable[[], None]:
+    transceiver = MemoryTransceiver(stream)
+
+    def run():
+        for _ in range(n): transceiver.receivePacket()
+    return run
+
+
+PAYLOAD_SMALL = bytes(range(16))
+PAYLOAD_LARGE = bytes(i & 0xFF for i in range(1024))
+
+# ▼ Garbage containing false startbytes - to exercise header search and bad header RFC path
+GARBAGE = b'\x00\x5A\x01\x02\x03\x04\x05\x06' * 4
+
+
+@case('encode [16]')
+def encode_small(n):
+    transceiver = MemoryTransceiver()
+    def run():
+        for _ in range(n): transceiver.sendPacket(PAYLOAD_SMALL)
+    return run
+
+
+@case('encode [1024]')
+def encode_large(n):
+    transceiver = MemoryTransceiver()
+    def run():
+        for _ in range(n): transceiver.sendPacket(PAYLOAD_LARGE)
+    return run
+
+
+@case('decode [16]')
+def decode_small(n):
+    return receiving(makePacket(PAYLOAD_SMALL) * n, n)
+
+
+@case('decode [1024]')
+def decode_large(n):
+    return receiving(makePacket(PAYLOAD_LARGE) * n, n)
+
+
+@case('resync after garbage [16]')
+def resync(n):
+    return receiving((GARBAGE + makePacket(PAYLOAD_SMALL)) * n, n)
+
+
+@case('address mismatch rejection [16]')
+def mismatch(n):
+    return receiving((makePacket(PAYLOAD_SMALL, address=7) + makePacket(PAYLOAD_SMALL)) * n, n)
+
+
+@case('rfc1071 [6]')
+def rfc_header(n):
+    header = makePacket(b'')[:6]
+    def run():
+        for _ in range(n): rfc1071(header)
+    return run
+
+
+@case('rfc1071 [1024]')
+def rfc_large(n):
+    def run():
+        for _ in range(n): rfc1071(PAYLOAD_LARGE)
+    return run
+
+
+@case('lrc [1024]')
+def lrc_large(n):
+    def run():
+        for _ in range(n): lrc(PAYLOAD_LARGE)
+    return run
+
+
+def addPtyCases():
+    from Transceiver.virtual_device import VirtualDevice
+
+    def roundtrip(size):
+        def setup(n):
+            device = VirtualDevice(address=1, replySize=size)
+            device.start()
+            transceiver = PelengTransceiver(port=device.port, device=1, timeout=1)
+
+            def run():
+                try:
+                    for _ in range(n):
+                        transceiver.sendPacket(PAYLOAD_SMALL)
+                        transceiver.receivePacket()
+                finally:
+                    transceiver.close()
+                    device.stop()
+            return run
+        return setup
+
+    case('pty round trip [16]')(roundtrip(16))
+    case('pty round trip [1024]')(roundtrip(1024))
+
+
+def measure(setup, n: int, repeat: int) -> float:
+    """ Return best time per packet in seconds """
+    best = float('inf')
+    for _ in range(repeat):
+        run = setup(n)
+        start = perf_counter()
+        run()
+        best = min(best, perf_counter() - start)
+    return best / n
+
+
+def main():
+    parser = ArgumentParser(description="Transceiver framing benchmarks")
+    parser.add_argument('-n', type=int, default=2000, help="packets per measurement")
+    parser.add_argument('-r', '--repeat', type=int, default=5, help="measurements per case (best one is taken)")
+    parser.add_argument('-k', dest='filter', default='', help="run only cases containing this substring")
+    parser.add_argument('--pty', action='store_true', help="add round trip cases over pseudo-terminal")
+    parser.add_argument('--json', help="save results to this file")
+    parser.add_argument('--compare', help="compare results against ones saved to this file")
+    args = parser.parse_args()
+
+    if args.pty: addPtyCases()
+    baseline = {}
+    if args.compare:
+        with open(args.compare) as file: baseline = json.load(file)
+
+    results = {}
+    print(f"{'case':<36} {'µs/packet':>12} {'packets/sec':>14}" + (f" {'change':>10}" if baseline else ''))
+    with Logger.suppressed('all'):
+        for name, setup in CASES.items():
+            if args.filter not in name: continue
+            n = args.n if not name.startswith('pty') else max(args.n // 10, 1)
+            seconds = measure(setup, n, args.repeat if not name.startswith('pty') else 1)
+            results[name] = dict(us_per_packet=seconds * 1e6, packets_per_sec=1 / seconds)
+            line = f"{name:<36} {seconds * 1e6:>12.2f} {1 / seconds:>14,.0f}"
+            if name in baseline:
+                line += f" {seconds * 1e6 / baseline[name]['us_per_packet'] - 1:>+10.1%}"
+            print(line)
+
+    if args.json:
+        with open(args.json, 'w') as file: json.dump(results, file, indent=4)
+
+
+if __name__ == '__main__':
+    main()
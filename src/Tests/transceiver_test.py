@@ -0,0 +1,473 @@
+import asyncio
+import json
+import os
+import struct
+from time import sleep
+
+import pytest
+from Transceiver import PelengTransceiver, rfc1071, lrc, Rfc1071, Lrc
+from Transceiver import SerialReadTimeoutError, BadDataError, BadCrcError, SerialCommunicationError
+from Transceiver.decoder import PelengDecoder, Frame
+from Transceiver.metrics import Histogram, LinkMetrics
+from Transceiver.capture import CaptureReader, CaptureReplayer, Direction, Outcome
+from Transceiver.transactions import TransactionEngine
+from Transceiver.async_transceiver import AsyncPelengTransceiver
+from Transceiver.scheduler import PollScheduler
+from Transceiver.virtual_device import VirtualDevice
+
+
+def msg(e): return e.value.args[0]
+
+
+def makePacket(msg: bytes, address: int = 0) -> bytes:
+    zerobyte = b'\x00' if len(msg) % 2 else b''
+    datalen = len(msg) + len(zerobyte)
+    header = struct.pack('< B B H', 0x5A, address, (datalen // 2) | (len(zerobyte) << 15))
+    packet = header + rfc1071(header) + msg + zerobyte
+    return packet + rfc1071(packet)
+
+
+class FakeTransceiver(PelengTransceiver):
+    """ PelengTransceiver reading from in-memory buffer instead of serial port """
+
+    def __init__(self, data: bytes = b'', **kwargs):
+        super().__init__(device=1, **kwargs)
+        self.rx = bytearray(data)
+        self.tx = bytearray()
+
+    def readSimple(self, size=1) -> bytes:
+        data = bytes(self.rx[:size])
+        del self.rx[:size]
+        return data
+
+    def write(self, data) -> int:
+        self.tx += data
+        return len(data)
+
+    def reset_input_buffer(self):
+        self.rx.clear()
+
+    @property
+    def in_waiting(self) -> int:
+        return len(self.rx)
+
+
+class EchoTransceiver(FakeTransceiver):
+    """ Devices reply with their own address echoing the command, device 7 is silent """
+    timeout = 0.2
+
+    def readSimple(self, size=1) -> bytes:
+        if not self.rx: sleep(0.001)
+        return super().readSimple(size)
+
+    def write(self, data) -> int:
+        packet = bytes(data)
+        address, payload = packet[1], packet[6:-2]
+        if address != 7: self.rx += makePacket(payload, address=address)
+        return len(data)
+
+
+# ———————————————————————————————————————————————————————————————————————————————————————————————————————————————————— #
+
+
+def test_decoder_chunked():
+    stream = makePacket(b'first') + makePacket(b'2nd!') + makePacket(b'')
+    decoder = PelengDecoder()
+    received = []
+    for i in range(len(stream)):
+        decoder.feed(stream[i:i+1])
+        received.extend(decoder)
+    assert received == [b'first', b'2nd!', b'']
+    assert decoder.discarded == 0
+    assert decoder.needed == decoder.HEADER_LEN
+
+
+def test_decoder_large_packet():
+    decoder = PelengDecoder()
+    decoder.feed(makePacket(b'\xFF' * 4000))
+    assert decoder.frame().data == b'\xFF' * 4000
+
+
+def test_decoder_garbage():
+    decoder = PelengDecoder()
+    decoder.feed(b'\x01\x5A\x02\x03\x04\x05\x06' + makePacket(b'data') + b'\x5A\x00')
+    assert list(decoder) == [b'data']
+    assert decoder.discarded == 7
+    assert decoder.buffer == b'\x5A\x00'
+
+
+@pytest.mark.parametrize('threshold', (256, 1_000_000))
+def test_decoder_bulk_resync(threshold):
+    garbage = bytes((0x5A, i & 0xFF, 0, 1, 2, 3)[i % 6] for i in range(3000))
+    decoder = PelengDecoder()
+    decoder.VECTORIZED_SCAN_THRESHOLD = threshold
+    decoder.feed(garbage + makePacket(b'data') + b'\x01\x02\x03\x5A\x00')
+    assert list(decoder) == [b'data']
+    assert decoder.discarded == len(garbage) + 3
+    assert decoder.resyncs == 2
+    assert decoder.buffer == b'\x5A\x00'
+
+
+def test_decoder_address_mismatch():
+    decoder = PelengDecoder(master=0, addressAction='DENY')
+    decoder.feed(makePacket(b'alien', address=3) + makePacket(b'own'))
+    frame = decoder.frame()
+    assert (frame.address, frame.data) == (0, b'own')
+
+    decoder.ADDRESS_MISMATCH_ACTION = 'ERROR'
+    decoder.feed(makePacket(b'alien', address=3) + makePacket(b'own'))
+    with pytest.raises(SerialCommunicationError):
+        decoder.frame()
+    assert list(decoder) == [b'own']
+
+
+def test_decoder_bad_crc():
+    decoder = PelengDecoder()
+    packet = bytearray(makePacket(b'data'))
+    packet[-1] ^= 0xFF
+    decoder.feed(packet + makePacket(b'next'))
+    with pytest.raises(BadCrcError):
+        decoder.frame()
+    assert decoder.frame().data == b'next'
+
+
+def test_receive_packet():
+    transceiver = FakeTransceiver(b'garbage' + makePacket(b'reply') + makePacket(b'second'))
+    assert transceiver.receivePacket() == b'reply'
+    assert transceiver.receivePacket() == b'second'
+    with pytest.raises(SerialReadTimeoutError):
+        transceiver.receivePacket()
+
+
+def test_receive_packet_incomplete():
+    transceiver = FakeTransceiver(makePacket(b'reply')[:-1])
+    with pytest.raises(BadDataError) as e:
+        transceiver.receivePacket()
+    assert msg(e) == "Bad packet (data too small, [7] out of [8])"
+
+    transceiver = FakeTransceiver(makePacket(b'reply')[:4])
+    with pytest.raises(BadDataError) as e:
+        transceiver.receivePacket()
+    assert msg(e) == "Bad header (too small, [4] out of [6])"
+
+
+def test_receive_packet_resync_limit():
+    transceiver = FakeTransceiver(b'\x00' * 100 + makePacket(b'reply'))
+    assert transceiver.receivePacket() == b'reply'
+
+    transceiver = FakeTransceiver(b'\x00' * (PelengTransceiver.RESYNC_LIMIT + 100))
+    with pytest.raises(SerialCommunicationError):
+        transceiver.receivePacket()
+
+
+
+def test_receive_packet_other_master():
+    alien = makePacket(b'alien', address=3)
+    transceiver = FakeTransceiver(alien + makePacket(b'reply'))
+    assert transceiver.receivePacket() == b'reply'
+
+    transceiver = FakeTransceiver(alien[:-1])
+    with pytest.raises(SerialReadTimeoutError):
+        transceiver.receivePacket()
+    assert transceiver.nTimeouts == 1
+
+    transceiver = FakeTransceiver(alien * (PelengTransceiver.RESYNC_LIMIT // len(alien) + 1))
+    with pytest.raises(SerialReadTimeoutError):
+        transceiver.receivePacket()
+
+    class ChattyTransceiver(FakeTransceiver):
+        """ Other master keeps the bus busy forever """
+        RESYNC_LIMIT = 1 << 30
+        RESYNC_TIMEOUT = 0.05
+
+        def readSimple(self, size=1) -> bytes:
+            return alien
+
+    transceiver = ChattyTransceiver()
+    transceiver.ADDRESS_MISMATCH_ACTION = 'DENY'
+    with pytest.raises(SerialReadTimeoutError):
+        transceiver.receivePacket()
+    assert transceiver.nTimeouts == 1
+
+
+def test_histogram():
+    histogram = Histogram()
+    for value in range(1, 10001): histogram.record(value)
+    snapshot = histogram.snapshot()
+    assert (snapshot['count'], snapshot['min'], snapshot['max']) == (10000, 1, 10000)
+    assert snapshot['mean'] == 5000.5
+    for percent in (50, 90, 99, 99.9):
+        assert abs(histogram.percentile(percent) - percent * 100) <= percent * 100 / 2**(Histogram.PRECISION_BITS-1)
+    for value in range(300):
+        assert Histogram._highestEquivalent_(Histogram._index_(value)) >= value
+    assert Histogram().percentile(50) is None
+
+
+def test_link_metrics():
+    alien = makePacket(b'alien', address=3)
+    broken = bytearray(makePacket(b'data'))
+    broken[-1] ^= 0xFF
+    transceiver = FakeTransceiver(b'garbage' + makePacket(b'reply') + alien + broken)
+    transceiver.sendPacket(b'command')
+    assert transceiver.receivePacket() == b'reply'
+    with pytest.raises(BadCrcError):
+        transceiver.receivePacket()
+    with pytest.raises(SerialReadTimeoutError):
+        transceiver.receivePacket()
+
+    snapshot = json.loads(transceiver.metrics.json())
+    assert {name: snapshot[name] for name in LinkMetrics.COUNTERS + LinkMetrics.DECODER_COUNTERS} == dict(
+            packetsSent=1, packetsReceived=1, bytesSent=16, bytesReceived=len(makePacket(b'reply')),
+            timeouts=1, crcErrors=1, resyncs=1, discarded=len(b'garbage'), mismatches=1)
+    assert snapshot['roundTrip']['count'] == snapshot['read']['count'] == 1
+    assert transceiver.nTimeouts == 1
+
+    transceiver.metrics.reset()
+    assert transceiver.metrics.snapshot()['discarded'] == transceiver.nTimeouts == 0
+
+
+def test_capture(tmp_path):
+    path = str(tmp_path / 'link.cap')
+    broken = bytearray(makePacket(b'data'))
+    broken[-1] ^= 0xFF
+    stream = b'garbage' + makePacket(b'reply') + makePacket(b'alien', address=3) + broken + makePacket(b'last')
+    transceiver = FakeTransceiver(stream)
+    with transceiver.capturing(path):
+        transceiver.sendPacket(b'command')
+        assert transceiver.receivePacket() == b'reply'
+        with pytest.raises(BadCrcError):
+            transceiver.receivePacket()
+        assert transceiver.receivePacket() == b'last'
+    transceiver.sendPacket(b'not captured')
+
+    with CaptureReader(path) as capture:
+        records = list(capture)
+    assert [(record.direction, record.outcome) for record in records] == [
+        (Direction.TX, Outcome.OK), (Direction.RX, Outcome.DISCARDED), (Direction.RX, Outcome.OK),
+        (Direction.RX, Outcome.DENIED), (Direction.RX, Outcome.BAD_CRC), (Direction.RX, Outcome.OK)]
+    assert records[0].data == makePacket(b'command', address=1)
+    assert b''.join(record.data for record in records[1:]) == stream
+
+    replayed = list(CaptureReplayer(path).replay())
+    assert [type(item) for item in replayed] == [Frame, BadCrcError, Frame]
+    assert (replayed[0].data, replayed[2].data) == (b'reply', b'last')
+
+    with open(path, 'ab') as file: file.write(b'\x10\x00')  # truncated record
+    assert len(list(CaptureReader(path))) == len(records)
+
+
+def test_capture_replay_sessions(tmp_path):
+    from time import perf_counter
+    from Transceiver.capture import FILE_HEADER, MAGIC, RECORD_HEADER
+
+    path = str(tmp_path / 'sessions.cap')
+    timestamps = (10**12, 10**12 + 10**7, 5 * 10**11, 9 * 10**17)  # 10 ms apart, then previous boot, then days later
+    with open(path, 'wb') as file:
+        file.write(FILE_HEADER.pack(MAGIC, 0, timestamps[0]))
+        for i, timestamp in enumerate(timestamps):
+            packet = makePacket(f'p{i}'.encode())
+            file.write(RECORD_HEADER.pack(len(packet), timestamp, Direction.RX, Outcome.OK) + packet)
+
+    start = perf_counter()
+    replayed = [frame.data for frame in CaptureReplayer(path).replay(realtime=True)]
+    elapsed = perf_counter() - start
+    assert replayed == [b'p0', b'p1', b'p2', b'p3']
+    assert 0.01 <= elapsed < 1
+
+
+def test_checksums_incremental():
+    data = bytes(range(256)) * 5 + b'\x7F'
+    for split in (0, 1, 6, 7, 600, len(data)):
+        assert Rfc1071(data[:split]).update(data[split:]).digest() == rfc1071(data)
+        assert Lrc(data[:split]).update(data[split:]).digest() == lrc(data)
+    assert lrc(b'') == Lrc().digest() == b''
+    assert rfc1071(b'\x5A\x00\x03\x80') == b'\xA2\x7F'
+
+
+def test_send_packet():
+    transceiver = FakeTransceiver()
+    for size in (0, 1, 2, 11, 300, 1001):
+        message = bytes(i % 256 for i in range(size))
+        transceiver.tx.clear()
+        assert transceiver.sendPacket(message) == transceiver.packetSize(size)
+        assert transceiver.tx == makePacket(message, address=1)
+
+    transceiver.deviceAddress = 0x0C
+    transceiver.tx.clear()
+    transceiver.sendPacket(bytes.fromhex(PelengTransceiver.chch_command))
+    assert transceiver.tx == bytes.fromhex(PelengTransceiver.chch_packet_out)
+
+
+def test_send_packet_into():
+    class LrcTransceiver(FakeTransceiver):
+        AUTO_LRC = True
+
+    transceiver = LrcTransceiver()
+    message = b'command'
+    buffer = bytearray(transceiver.packetSize(len(message)))
+    buffer[transceiver.HEADER_LEN:transceiver.HEADER_LEN + len(message)] = message
+    transceiver.sendPacketInto(buffer, len(message))
+    assert transceiver.tx == buffer == makePacket(message + lrc(message), address=1)
+
+
+def test_transaction_engine():
+    transceiver = EchoTransceiver()
+    with TransactionEngine(transceiver, depth=3) as engine:
+        futures = [engine.submit(f'cmd{i}'.encode(), address=i % 3 + 1) for i in range(9)]
+        assert [future.result(timeout=1) for future in futures] == [f'cmd{i}'.encode() for i in range(9)]
+        silent = engine.submit(b'void', address=7, timeout=0.05)
+        with pytest.raises(SerialReadTimeoutError):
+            silent.result(timeout=1)
+    assert transceiver.ADDRESS_MISMATCH_ACTION == 'WARN&DENY'
+
+
+def test_transaction_engine_stop_blocked_submitter():
+    from threading import Thread
+
+    engine = TransactionEngine(EchoTransceiver(), depth=1, timeout=5)
+    engine.start()
+    first = engine.submit(b'void', address=7)  # silent device, occupies the only slot
+    errors = []
+
+    def submitter():
+        try: engine.submit(b'void', address=7)
+        except RuntimeError as e: errors.append(e)
+
+    thread = Thread(target=submitter, daemon=True)
+    thread.start()
+    sleep(0.05)
+    engine.stop()
+    thread.join(1)
+    assert not thread.is_alive() and len(errors) == 1
+    assert first.cancelled() and not any(engine.pending.values())
+
+
+def test_transaction_engine_master_replies():
+    class MasterEchoTransceiver(EchoTransceiver):
+        """ Devices reply with master address, like real ones do """
+        def write(self, data) -> int:
+            self.rx += makePacket(bytes(data)[6:-2], address=self.masterAddress)
+            return len(data)
+
+    with TransactionEngine(MasterEchoTransceiver(), depth=2) as engine:
+        # ▼ Replies carry no device address, so they are matched in global FIFO order
+        futures = [engine.submit(f'cmd{i}'.encode(), address=i % 3 + 1) for i in range(6)]
+        assert [future.result(timeout=1) for future in futures] == [f'cmd{i}'.encode() for i in range(6)]
+
+
+def test_transaction_engine_slow_write():
+    from threading import Event, Thread
+
+    class SlowTransceiver(EchoTransceiver):
+        release = Event()
+        def write(self, data) -> int:
+            if bytes(data)[6:-2] == b'slow': self.release.wait(5)
+            return super().write(data)
+
+    transceiver = SlowTransceiver()
+    with TransactionEngine(transceiver, depth=2) as engine:
+        first = engine.submit(b'fast', address=1)
+        submitter = Thread(target=lambda: engine.submit(b'slow', address=2))
+        submitter.start()
+        sleep(0.05)
+        # ▼ Neither reader thread nor other submitters wait for the write in progress
+        assert first.result(timeout=1) == b'fast'
+        queued = engine.submit(b'queued', address=3)
+        assert not queued.done()
+        transceiver.release.set()
+        submitter.join()
+        assert queued.result(timeout=1) == b'queued'
+
+
+@pytest.mark.skipif(not hasattr(os, 'openpty'), reason="pseudo-terminals are not available")
+def test_async_transceiver():
+    async def exchange():
+        import tty
+        master, slave = os.openpty()
+        tty.setraw(slave)
+        async with AsyncPelengTransceiver(master, device=5) as transceiver:
+            assert await transceiver.send_packet(b'command') == transceiver.packetSize(7)
+            assert os.read(slave, 100) == makePacket(b'command', address=5)
+
+            os.write(slave, b'garbage' + makePacket(b'reply') + makePacket(b'next'))
+            assert await transceiver.receivePacket() == b'reply'
+            assert await transceiver.receivePacket() == b'next'
+            with pytest.raises(SerialReadTimeoutError):
+                await transceiver.receivePacket(timeout=0.01)
+
+            os.write(slave, makePacket(b'1') + makePacket(b'2'))
+            frames = []
+            async for frame in transceiver:
+                frames.append(frame.data)
+                if len(frames) == 2: break
+            assert frames == [b'1', b'2']
+        os.close(master)
+        os.close(slave)
+
+    asyncio.run(exchange())
+
+
+def test_poll_scheduler():
+    ports = [EchoTransceiver(), EchoTransceiver()]
+    for port in ports: port.ADDRESS_MISMATCH_ACTION = 'NONE'
+    replies = []
+    errors = []
+    with PollScheduler(workers=2) as scheduler:
+        jobs = [scheduler.addJob(port, f'poll-{i}'.encode(), address=i+1, period=0.01, callback=replies.append)
+                for i, port in enumerate(ports)]
+        silent = scheduler.addJob(ports[0], b'void', address=7, period=0.5, errback=errors.append)
+        sleep(0.3)
+    assert all(job.runs > 5 and job.errors == 0 for job in jobs)
+    assert replies.count(b'poll-0') == jobs[0].runs and replies.count(b'poll-1') == jobs[1].runs
+    assert silent.errors == len(errors) == 1 and isinstance(errors[0], SerialReadTimeoutError)
+    stats = scheduler.stats()
+    assert stats[jobs[1].name]['rate'] > 0 and set(stats[silent.name]) >= {'rate', 'jitter', 'missed'}
+
+
+def test_poll_scheduler_non_serial_error():
+    port = EchoTransceiver()
+    port.ADDRESS_MISMATCH_ACTION = 'NONE'
+    errors = []
+    scheduler = PollScheduler(workers=1)
+    with scheduler:
+        # ▼ Address out of byte range fails in sendPacket with non-serial error
+        broken = scheduler.addJob(port, b'broken', address=0x100, period=0.01, errback=errors.append)
+        healthy = scheduler.addJob(port, b'healthy', address=1, period=0.01)
+        sleep(0.2)
+    assert broken.errors == len(errors) > 1 and not isinstance(errors[0], SerialCommunicationError)
+    assert healthy.runs > 5 and healthy.errors == 0
+    assert scheduler.activePorts == set() and not any(scheduler.ports.values())
+    assert not broken.queued and not healthy.queued
+
+
+@pytest.fixture
+def virtualDevice():
+    if not hasattr(os, 'openpty'): pytest.skip("pseudo-terminals are not available")
+    with VirtualDevice(address=3) as device:
+        yield device
+
+
+def test_virtual_device(virtualDevice):
+    transceiver = PelengTransceiver(port=virtualDevice.port, device=3, timeout=0.1)
+    try:
+        transceiver.sendPacket(b'hello')
+        assert transceiver.receivePacket() == b'\x01hello'
+
+        expected = dict(badHeaderRfc=BadDataError, badPacketRfc=BadCrcError, wrongMaster=SerialReadTimeoutError,
+                        truncated=BadDataError)
+        for fault, errorType in expected.items():
+            virtualDevice.inject(fault)
+            transceiver.sendPacket(b'data')
+            with pytest.raises(errorType):
+                transceiver.receivePacket()
+
+        virtualDevice.inject('oddEven')
+        transceiver.sendPacket(b'data')
+        assert transceiver.receivePacket() == b'\x01data\x00'
+
+        virtualDevice.replySize = 1000
+        transceiver.sendPacket(b'data')
+        assert len(transceiver.receivePacket()) == 1001
+        assert virtualDevice.nCommands == 7
+    finally:
+        transceiver.close()
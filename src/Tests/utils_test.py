@@ -0,0 +1,64 @@
+import pytest
+from Utils import add_slots, inject_args, inject_init, inject_slots
+
+
+def test_inject_args():
+    class Device:
+        @inject_args
+        def __init__(self, port, baudrate=9600, *, timeout=1.0, **options):
+            self.opened = (self.port, self.baudrate, self.timeout)
+
+    device = Device('COM1', parity='N')
+    assert (device.port, device.baudrate, device.timeout, device.parity) == ('COM1', 9600, 1.0, 'N')
+    assert device.opened == ('COM1', 9600, 1.0)
+    assert Device(baudrate=115200, port='COM2').baudrate == 115200
+    with pytest.raises(TypeError): Device()
+
+
+def test_inject_slots():
+    class Frozen:
+        __slots__ = 'a', 'b', 'sum'
+
+        @inject_slots('start')
+        def __init__(self, a, b=2):
+            object.__setattr__(self, 'sum', a + b)
+
+        def __setattr__(self, name, value): raise AttributeError("Frozen")
+
+    frozen = Frozen(1)
+    assert (frozen.a, frozen.b, frozen.sum) == (1, 2, 3)
+
+    class Bare:
+        __slots__ = 'x',
+
+        @inject_slots
+        def __init__(self, x=None): pass
+
+    assert Bare().x is None and Bare(5).x == 5
+
+
+def test_inject_init():
+    calls = []
+
+    @inject_init
+    @add_slots
+    class Point:
+        x: int
+        y: int
+        tag: str
+        length: int
+
+        def __init__(self, x, y=0, *, tag='point'):
+            """ Point docstring """
+            self.length = abs(self.x) + abs(self.y)
+            calls.append(tag)
+
+    point = Point(3, -4, tag='p')
+    assert (point.x, point.y, point.tag, point.length) == (3, -4, 'p', 7)
+    assert Point(1).tag == 'point' and calls == ['p', 'point']
+    assert Point.__init__.__doc__.strip() == 'Point docstring'
+    assert Point.__init__.__qualname__.endswith('Point.__init__')
+    with pytest.raises(TypeError): Point(1, 2, 3)
+    with pytest.raises(TypeError):
+        @inject_init
+        class NoInit: pass
@@ -1,4 +1,10 @@
 from .serial_transceiver import SerialTransceiver, PelengTransceiver
+from .decoder import PelengDecoder, Frame
+from .metrics import LinkMetrics, Histogram
+from .capture import CaptureWriter, CaptureReader, CaptureReplayer
+from .transactions import TransactionEngine
+from .async_transceiver import AsyncPelengTransceiver
+from .scheduler import PollScheduler
 from .errors import *
 from .checksums import *
 from .interface import Transceiver
@@ -0,0 +1,189 @@
+import asyncio
+import os
+from logging import INFO
+from time import perf_counter_ns
+from typing import Optional, Union
+
+from Utils import Logger, bytewise
+from .decoder import PelengDecoder, Frame
+from .errors import *
+from .metrics import LinkMetrics
+from .serial_transceiver import PelengProtocol
+
+log = Logger("Serial")
+slog = Logger("Packets")
+
+
+class AsyncPelengTransceiver(PelengProtocol):
+    """ asyncio-native Peleng protocol transceiver working over file descriptor
+            (serial port device, pseudo-terminal, pipe, etc.)
+        Incoming data is read in loop.add_reader() callback and fed to PelengDecoder,
+            so no threads are involved and many ports may be driven by single event loop
+        Framing rules and error types are the same as for PelengTransceiver
+        Usage:
+            >>> async with AsyncPelengTransceiver('/dev/ttyUSB0', device=12) as transceiver:
+            >>>     await transceiver.sendPacket(command)
+            >>>     reply = await transceiver.receivePacket()
+            >>>     async for frame in transceiver: ...
+    """
+
+    INTERFACE_NAME = 'async'
+    DEFAULT_BAUDRATE = 921600
+    READ_CHUNK_SIZE = 65536
+
+    def __init__(self, port: Union[str, int], device: int = None, master: int = PelengProtocol.MASTER_ADR,
+                 baudrate: int = DEFAULT_BAUDRATE, timeout: float = 0.5):
+        """ port - device path to open or file descriptor opened by caller (it will not be closed) """
+        self.port = port
+        self.baudrate: int = baudrate
+        self.timeout: float = timeout
+        self.deviceAddress: int = device
+        self.decoder = PelengDecoder(master)
+        self.metrics = LinkMetrics(self.decoder)
+        self.txBuffer = bytearray(256)
+        self.fd: Optional[int] = None
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.frames: Optional[asyncio.Queue] = None
+        self.writeLock: Optional[asyncio.Lock] = None
+
+    @property
+    def token(self) -> str:
+        if self.fd is None: return self.INTERFACE_NAME.capitalize() + ': ' + 'closed'
+        return self.INTERFACE_NAME.capitalize() + ': ' + str(self.port)
+
+    @property
+    def is_open(self) -> bool:
+        return self.fd is not None
+
+    async def __aenter__(self):
+        self.open()
+        return self
+
+    async def __aexit__(self, errtype, value, traceback):
+        self.close()
+
+    def open(self):
+        """ Open port and start listening to it in running event loop """
+        if self.fd is not None: return
+        if isinstance(self.port, int):
+            fd = self.port
+            os.set_blocking(fd, False)
+        else:
+            try: fd = os.open(self.port, os.O_RDWR | os.O_NOCTTY | os.O_NONBLOCK)
+            except OSError as e: raise SerialError(f"Cannot open port '{self.port}' - {e}")
+        if os.isatty(fd): self.configureTty(fd)
+        self.fd = fd
+        self.loop = asyncio.get_running_loop()
+        self.frames = asyncio.Queue()
+        self.writeLock = asyncio.Lock()
+        self.decoder.reset()
+        self.loop.add_reader(fd, self._onReadable_)
+
+    def close(self):
+        if self.fd is None: return
+        self.loop.remove_reader(self.fd)
+        if not isinstance(self.port, int): os.close(self.fd)
+        self.fd = None
+        self.frames.put_nowait(None)  # wake up iterators
+
+    def configureTty(self, fd: int):
+        """ Set raw 8-N-1 mode and baudrate on terminal device """
+        import termios, tty
+        tty.setraw(fd)
+        attrs = termios.tcgetattr(fd)
+        try:
+            speed = getattr(termios, f'B{self.baudrate}')
+        except AttributeError:
+            raise SerialError(f"Baudrate {self.baudrate} is not supported")
+        attrs[4] = attrs[5] = speed
+        termios.tcsetattr(fd, termios.TCSANOW, attrs)
+
+    async def sendPacket(self, msg: bytes, address: int = None) -> int:
+        """ Wrap msg and send packet over the port. Return number of bytes sent """
+
+        if self.fd is None: raise SerialError("Port is not open")
+        async with self.writeLock:
+            packet = self.wrapMessage(msg, address)
+            await self._write_(packet)
+            self.metrics.packetSent(len(packet))
+            if self.capture is not None: self.capture.sent(packet)
+            # ▼ Formatted under the lock, as packet is a view of shared .txBuffer
+            if slog.isEnabledFor(INFO):
+                slog.info(f"Packet [{len(packet)}]: {bytewise(packet)}")
+        return len(packet)
+
+    async def receivePacket(self, timeout: float = None) -> bytes:
+        """ Wait for next valid packet and return its payload
+            Raise SerialReadTimeoutError if nothing is received for `timeout` (.timeout by default) seconds
+        """
+
+        if self.fd is None: raise SerialError("Port is not open")
+        readStarted = perf_counter_ns()
+        try:
+            frame = await asyncio.wait_for(self.frames.get(), timeout or self.timeout)
+        except asyncio.TimeoutError:
+            self.metrics.timeouts += 1
+            raise SerialReadTimeoutError("No reply")
+        if isinstance(frame, Exception): raise frame
+        if frame is None: raise SerialError("Port has been closed")
+        self.metrics.read.record((perf_counter_ns() - readStarted) // 1000)
+        return frame.data
+
+    # ▼ asyncio-style aliases
+    send_packet = sendPacket
+    receive_packet = receivePacket
+
+    async def __aiter__(self):
+        """ Yield incoming frames until port is closed, corrupted packets are logged and skipped """
+        while self.fd is not None:
+            frame = await self.frames.get()
+            if frame is None: return
+            if isinstance(frame, SerialCommunicationError):
+                log.warning(frame)
+                continue
+            if isinstance(frame, Exception): raise frame
+            yield frame
+
+    async def _write_(self, data: memoryview):
+        while data:
+            try:
+                sent = os.write(self.fd, data)
+            except BlockingIOError:
+                sent = 0
+            except OSError as e:
+                raise SerialWriteTimeoutError(f"Failed to write to '{self.port}' - {e}")
+            data = data[sent:]
+            if data:
+                writable = self.loop.create_future()
+                self.loop.add_writer(self.fd, writable.set_result, None)
+                try: await writable
+                finally: self.loop.remove_writer(self.fd)
+
+    def _onReadable_(self):
+        try:
+            data = os.read(self.fd, self.READ_CHUNK_SIZE)
+        except BlockingIOError:
+            return
+        except OSError as e:
+            data = None
+            error = SerialError(f"Failed to read from '{self.port}' - {e}")
+        else:
+            error = SerialError(f"Port '{self.port}' has been closed by other side")
+        if not data:
+            self.frames.put_nowait(error)
+            self.loop.remove_reader(self.fd)
+            return
+
+        decoder = self.decoder
+        decoder.feed(data)
+        while True:
+            try:
+                frame: Frame = decoder.frame()
+            except SerialCommunicationError as e:
+                self.frames.put_nowait(e)
+                continue
+            if frame is None: break
+            self.metrics.packetReceived(len(frame.packet))
+            if slog.isEnabledFor(INFO):
+                slog.info(f"Reply  [{len(frame.packet)}]: {bytewise(frame.packet)}")
+            self.frames.put_nowait(frame)
@@ -0,0 +1,171 @@
+import mmap
+import os
+import struct
+from enum import IntEnum
+from threading import Lock
+from time import monotonic_ns, sleep, time_ns
+from typing import Iterator, NamedTuple, Optional, Union
+
+from Utils import bytewise
+from .decoder import Outcome, PelengDecoder, Frame
+from .errors import *
+
+# CAPTURE FILE STRUCTURE (all fields are little-endian)
+# File header:  Magic (8 bytes)   WallClock (u64, ns since epoch)   Monotonic (u64, ns) - both taken at creation
+# Record:       Length (u32)   Timestamp (u64, monotonic ns)   Direction (u8)   Outcome (u8)   Data (Length bytes)
+
+MAGIC = b'PLNGCAP\x01'
+FILE_HEADER = struct.Struct('< 8s Q Q')
+RECORD_HEADER = struct.Struct('< I Q B B')
+
+
+class Direction(IntEnum):
+    TX = 0
+    RX = 1
+
+
+class Record(NamedTuple):
+    timestamp: int  # monotonic clock, ns
+    direction: Direction
+    outcome: Outcome
+    data: bytes
+
+
+class CaptureWriter:
+    """ Append-only binary recorder of transceiver traffic
+        Sent packets and all data received by the decoder (valid packets, rejected packets
+            and discarded garbage) are written as length-prefixed records in arrival order
+        Writing is thread-safe, so capture may be shared between sending and receiving threads
+        Usage:
+            >>> with transceiver.capturing('link.cap'):
+            >>>     ...
+            >>> for record in CaptureReader('link.cap'): ...
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.lock = Lock()
+        self.file = open(path, 'ab')
+        if self.file.tell() == 0:
+            self.file.write(FILE_HEADER.pack(MAGIC, time_ns(), monotonic_ns()))
+        self.records: int = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, errtype, value, traceback):
+        self.close()
+
+    def write(self, direction: Direction, outcome: Outcome, data: bytes):
+        record = RECORD_HEADER.pack(len(data), monotonic_ns(), direction, outcome)
+        with self.lock:
+            if self.file.closed: return  # capture has been stopped by other thread
+            self.file.write(record)
+            self.file.write(data)
+            self.records += 1
+
+    def sent(self, packet: bytes):
+        self.write(Direction.TX, Outcome.OK, packet)
+
+    def received(self, data: bytes, outcome: Outcome):
+        """ Decoder capture callback """
+        self.write(Direction.RX, outcome, data)
+
+    def flush(self):
+        with self.lock: self.file.flush()
+
+    def close(self):
+        with self.lock:
+            if not self.file.closed: self.file.close()
+
+
+class CaptureReader:
+    """ Reader of capture files produced by CaptureWriter
+        File is memory-mapped, so captures of any size are read without loading them into memory
+        Truncated record at the end of file (e.g. if recording process has crashed) is ignored
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, 'rb') as file:
+            size = os.fstat(file.fileno()).st_size
+            if size < FILE_HEADER.size:
+                raise ValueError(f"File '{path}' is not a capture file (too small)")
+            self.map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.wallClock, self.started = FILE_HEADER.unpack_from(self.map)
+        if magic != MAGIC:
+            self.map.close()
+            raise ValueError(f"File '{path}' is not a capture file (bad signature)")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, errtype, value, traceback):
+        self.close()
+
+    def __iter__(self) -> Iterator[Record]:
+        data = self.map
+        offset = FILE_HEADER.size
+        end = len(data)
+        while offset + RECORD_HEADER.size <= end:
+            length, timestamp, direction, outcome = RECORD_HEADER.unpack_from(data, offset)
+            offset += RECORD_HEADER.size
+            if offset + length > end: return
+            yield Record(timestamp, Direction(direction), Outcome(outcome), data[offset:offset + length])
+            offset += length
+
+    def close(self):
+        self.map.close()
+
+
+class CaptureReplayer:
+    """ Feeds received data from capture file back through PelengDecoder
+        Yields the same frames (and the same SerialCommunicationError instances for corrupted packets)
+            that decoder produced while recording, either at full speed or in real time
+        Usage:
+            >>> for frame in CaptureReplayer('link.cap').replay(realtime=True):
+            >>>     if isinstance(frame, SerialCommunicationError): ...
+    """
+
+    def __init__(self, path: str, decoder: PelengDecoder = None):
+        self.path = path
+        self.decoder = decoder if decoder is not None else PelengDecoder(addressAction='DENY')
+
+    def replay(self, realtime: bool = False, speed: float = 1.0,
+               maxGap: float = 10.0) -> Iterator[Union[Frame, SerialCommunicationError]]:
+        """ realtime - keep intervals between records as they were recorded (scaled by 1/speed)
+            maxGap - longest interval between records (seconds) considered to be within one recording session
+            Capture file may contain several sessions appended by different runs, their monotonic timestamps
+                are not comparable, so interval going backwards or exceeding `maxGap` is treated
+                as session boundary: time base is reset and the next record is replayed with no delay
+        """
+        decoder = self.decoder
+        with CaptureReader(self.path) as reader:
+            origin: Optional[int] = None
+            previous: Optional[int] = None
+            for record in reader:
+                if record.direction != Direction.RX: continue
+                if realtime:
+                    if previous is not None and not 0 <= record.timestamp - previous <= maxGap * 1e9: origin = None
+                    previous = record.timestamp
+                    if origin is None: origin = monotonic_ns() - record.timestamp / speed
+                    delay = (origin + record.timestamp / speed - monotonic_ns()) / 1e9
+                    if delay > 0: sleep(delay)
+                decoder.feed(record.data)
+                while True:
+                    try: frame = decoder.frame()
+                    except SerialCommunicationError as e:
+                        yield e
+                        continue
+                    if frame is None: break
+                    yield frame
+                if record.outcome == Outcome.INCOMPLETE: decoder.reset()
+
+
+if __name__ == '__main__':
+    import sys
+
+    with CaptureReader(sys.argv[1]) as capture:
+        for record in capture:
+            print(f"{(record.timestamp - capture.started) / 1e6:>12.3f} ms  {record.direction.name}  "
+                  f"{record.outcome.name:<10} [{len(record.data)}]: {bytewise(record.data, collapseAfter=96)}")
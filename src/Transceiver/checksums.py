@@ -1,7 +1,47 @@
 from functools import reduce
+from operator import xor
 
+try:
+    import numpy
+except ImportError:
+    numpy = None
 
-__all__ = 'rfc1071', 'lrc'
+
+__all__ = 'rfc1071', 'lrc', 'Rfc1071', 'Lrc'
+
+
+# ▼ Sequences of this size and larger are processed by NumPy backend (if NumPy is available)
+NUMPY_THRESHOLD = 512  # in bytes
+
+# ▼ Sequences smaller than this are XORed bytewise, larger ones - wordwise
+SHORT_LRC_THRESHOLD = 32  # in bytes
+
+
+def _wordsum(seqBytes) -> int:
+    """ Sum of big-endian 16-bit words of bytes sequence, odd trailing byte is treated as zero-padded word """
+    if numpy is not None and len(seqBytes) >= NUMPY_THRESHOLD:
+        words = numpy.frombuffer(seqBytes, dtype='>u2', count=len(seqBytes) // 2)
+        result = int(words.sum(dtype=numpy.uint64))
+        if len(seqBytes) % 2: result += seqBytes[-1] << 8
+        return result
+    # ▼ Even bytes are MSBs, odd bytes are LSBs of words - both sums are computed at C level
+    return (sum(seqBytes[::2]) << 8) + sum(seqBytes[1::2])
+
+
+def _xor(msgBytes) -> int:
+    """ XOR of all bytes in a sequence """
+    if numpy is not None and len(msgBytes) >= NUMPY_THRESHOLD:
+        return int(numpy.bitwise_xor.reduce(numpy.frombuffer(msgBytes, dtype=numpy.uint8)))
+    if len(msgBytes) < SHORT_LRC_THRESHOLD:
+        return reduce(xor, msgBytes)
+    # ▼ Fold the whole sequence represented as one big integer in halves until single byte is left
+    value = int.from_bytes(msgBytes, byteorder='little')
+    width = len(msgBytes)
+    while width > 1:
+        half = (width + 1) // 2
+        value = (value & ((1 << half*8) - 1)) ^ (value >> half*8)
+        width = half
+    return value
 
 
 def rfc1071(seqBytes):
@@ -14,8 +54,7 @@ def rfc1071(seqBytes):
     :rtype:          bytes
     """
 
-    if (len(seqBytes) % 2): seqBytes += b'\x00'
-    chsum = sum((x<<8|y for x, y in zip(seqBytes[::2], seqBytes[1::2])))
+    chsum = _wordsum(seqBytes)
     chsum = (chsum & 0xFFFF) + (chsum >> 16)
     return int.to_bytes((~chsum) & 0xFFFF, length=2, byteorder='big')
 
@@ -30,22 +69,110 @@ def lrc(msgBytes):
     :rtype:          bytes
     """
 
-    if (msgBytes == b''): return b''
-    return int.to_bytes(reduce(lambda x,y: x^y, msgBytes), length=1, byteorder='big')
+    if (len(msgBytes) == 0): return b''
+    return int.to_bytes(_xor(msgBytes), length=1, byteorder='big')
+
+
+class Rfc1071:
+    """ Incremental RFC1071 checksum calculator
+        Feeding data by parts with .update() yields the same result as rfc1071() of the whole sequence
+        Checksum may be extended after .digest() is taken, so packet checksum may be computed
+            from header checksum state with no need to process header bytes once again:
+            >>> chsum = Rfc1071(header)
+            >>> headerRfc = chsum.digest()
+            >>> packetRfc = chsum.update(headerRfc).update(data).digest()
+    """
+
+    __slots__ = 'sum', 'size'
+
+    def __init__(self, seqBytes=b''):
+        self.sum: int = 0
+        self.size: int = 0
+        if seqBytes: self.update(seqBytes)
+
+    def update(self, seqBytes) -> 'Rfc1071':
+        if not len(seqBytes): return self
+        if self.size % 2:
+            # ▼ Previous part ended up in the middle of a word - first byte is LSB of that word
+            seqBytes = memoryview(seqBytes)
+            self.sum += seqBytes[0]
+            self.sum += _wordsum(seqBytes[1:])
+        else:
+            self.sum += _wordsum(seqBytes)
+        self.size += len(seqBytes)
+        return self
+
+    def digest(self) -> bytes:
+        chsum = (self.sum & 0xFFFF) + (self.sum >> 16)
+        return int.to_bytes((~chsum) & 0xFFFF, length=2, byteorder='big')
+
+    def copy(self) -> 'Rfc1071':
+        clone = self.__class__()
+        clone.sum, clone.size = self.sum, self.size
+        return clone
+
+
+class Lrc:
+    """ Incremental LRC checksum calculator
+        Feeding data by parts with .update() yields the same result as lrc() of the whole sequence
+    """
+
+    __slots__ = 'value', 'size'
+
+    def __init__(self, msgBytes=b''):
+        self.value: int = 0
+        self.size: int = 0
+        if msgBytes: self.update(msgBytes)
+
+    def update(self, msgBytes) -> 'Lrc':
+        if not len(msgBytes): return self
+        self.value ^= _xor(msgBytes)
+        self.size += len(msgBytes)
+        return self
+
+    def digest(self) -> bytes:
+        if self.size == 0: return b''
+        return int.to_bytes(self.value, length=1, byteorder='big')
+
+    def copy(self) -> 'Lrc':
+        clone = self.__class__()
+        clone.value, clone.size = self.value, self.size
+        return clone
 
 
 if __name__ == '__main__':
     import random
+    from timeit import timeit
+
+    def _ref_rfc1071(seqBytes):
+        if (len(seqBytes) % 2): seqBytes += b'\x00'
+        chsum = sum((x<<8|y for x, y in zip(seqBytes[::2], seqBytes[1::2])))
+        chsum = (chsum & 0xFFFF) + (chsum >> 16)
+        return int.to_bytes((~chsum) & 0xFFFF, length=2, byteorder='big')
+
+    def _ref_lrc(msgBytes):
+        if (msgBytes == b''): return b''
+        return int.to_bytes(reduce(lambda x,y: x^y, msgBytes), length=1, byteorder='big')
 
-    def _ref_lrc2(a):
-        res = 0
-        for b in a:
-            res = res^b
-        return int.to_bytes(res, length=1, byteorder='big')
+    def test_bit_exact():
+        for size in (*range(0, 20), 511, 512, 513, 4097, 100_000):
+            for i in range(10):
+                data = bytes(random.getrandbits(8) for _ in range(size))
+                assert rfc1071(data) == _ref_rfc1071(data), f"rfc1071 mismatch, size={size}"
+                assert lrc(data) == _ref_lrc(data), f"lrc mismatch, size={size}"
+                split = random.randint(0, size)
+                assert Rfc1071(data[:split]).update(data[split:]).digest() == _ref_rfc1071(data)
+                assert Lrc(data[:split]).update(data[split:]).digest() == _ref_lrc(data)
+        print("Bit-exact: OK")
 
-    def test_lrc():
-        a = bytes.fromhex("".join([random.choice('0123456789ABCDEF') for i in range(1_000_000)]))
-        print(lrc(a))
-        print(_ref_lrc2(a))
+    def benchmark():
+        print(f"{'size':>10} {'rfc1071':>12} {'ref':>12} {'lrc':>12} {'ref':>12}  (µs per call)")
+        for size in (6, 64, 1024, 65_536, 1_048_576):
+            data = bytes(random.getrandbits(8) for _ in range(size))
+            n = max(1, 100_000 // size)
+            results = (timeit(lambda: function(data), number=n) / n * 1e6
+                       for function in (rfc1071, _ref_rfc1071, lrc, _ref_lrc))
+            print(f"{size:>10} " + ' '.join(f'{result:>12.2f}' for result in results))
 
-    test_lrc()
+    test_bit_exact()
+    benchmark()
@@ -0,0 +1,226 @@
+from enum import IntEnum
+from logging import WARNING
+from typing import Callable, NamedTuple, Optional
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+from Utils import Logger, bytewise, BitLayout, BitStruct
+from .checksums import rfc1071
+from .errors import *
+
+log = Logger("Serial")
+
+
+# ▼ StartByte   ADR   Length|EVEN   HeaderRFC
+#   FIXME: bug in datalen unpacking - see coupling protocol notes (length is 12-bit, bits 12..14 are ignored)
+HEADER = BitStruct('PelengHeader', (('startbyte', 'B'), ('address', 'B'),
+                                    ('length', BitLayout('<u2', length=(11, 0), even=15)), ('rfc', '2s')), '<')
+
+
+class Frame(NamedTuple):
+    address: int
+    data: bytes
+    packet: bytes  # whole packet, including header and checksums
+
+
+class Outcome(IntEnum):
+    """ Result of parsing a chunk of received data """
+    OK = 0          # valid packet, accepted
+    BAD_CRC = 1     # packet with bad packet checksum, discarded
+    DENIED = 2      # packet addressed to other master, skipped
+    DISCARDED = 3   # garbage thrown away while searching for header
+    INCOMPLETE = 4  # data left in decoder buffer on reset
+
+
+class PelengDecoder:
+    """ Push-style incremental decoder of Peleng protocol packets
+        Accepts arbitrary byte chunks via .feed() and assembles them into frames:
+            Searches for STARTBYTE, discarding any garbage in front of it
+            Validates header RFC and determines the length of payload data
+            Waits until the whole packet is buffered, validates packet RFC and returns payload
+        Decoder does not perform any I/O, so it may be used on captured byte dumps as well
+            as on a live serial datastream (see PelengTransceiver.receivePacket())
+    """
+
+    HEADER_LEN: int = HEADER.size  # in bytes
+    STARTBYTE: int = 0x5A
+    STARTBYTE_BYTES: bytes = bytes((STARTBYTE,))
+
+    # ▼ Buffer data beyond this offset is scanned for header with NumPy (if NumPy is available)
+    VECTORIZED_SCAN_THRESHOLD: int = 256  # in bytes
+    VECTORIZED_SCAN_WINDOW: int = 4096  # in bytes
+
+    def __init__(self, master: int = 0, checkRfc: bool = True, addressAction: str = 'WARN&DENY'):
+        self.buffer = bytearray()
+        self.masterAddress = master
+        self.CHECK_RFC: bool = checkRfc
+        self.ADDRESS_MISMATCH_ACTION: str = addressAction
+
+        # ▼ (address, datalen, zerobyte, skip) of the packet being assembled, None if header is not found yet
+        self.header: Optional[tuple] = None
+
+        # ▼ Total number of bytes thrown away while searching for a valid header
+        self.discarded: int = 0
+
+        # ▼ Total number of times garbage has been discarded in front of a header
+        self.resyncs: int = 0
+
+        # ▼ Total number of packets discarded due to bad packet checksum
+        self.crcErrors: int = 0
+
+        # ▼ Total number of packets carrying unexpected master address
+        self.mismatches: int = 0
+
+        # ▼ Total number of bytes of packets skipped as addressed to other master
+        self.denied: int = 0
+
+        # ▼ Callback receiving every chunk of data decoder is done with along with its Outcome (see capture.py)
+        self.capture: Optional[Callable[[bytes, Outcome], None]] = None
+
+    def __iter__(self):
+        """ Yield payloads of all complete packets currently buffered """
+        while True:
+            frame = self.frame()
+            if frame is None: return
+            yield frame.data
+
+    def feed(self, chunk: bytes):
+        """ Append received bytes to decoder buffer """
+        self.buffer += chunk
+
+    def reset(self) -> bytes:
+        """ Drop all buffered data and return it """
+        pending = bytes(self.buffer)
+        if pending and self.capture is not None: self.capture(pending, Outcome.INCOMPLETE)
+        self.buffer.clear()
+        self.header = None
+        return pending
+
+    @property
+    def needed(self) -> int:
+        """ Minimum number of bytes that should be fed to decoder to complete current packet """
+        if self.header is None:
+            return max(self.HEADER_LEN - len(self.buffer), 1)
+        return max(self.HEADER_LEN + self.header[1] + 2 - len(self.buffer), 1)  # 2 is packet RFC
+
+    def frame(self) -> Optional[Frame]:
+        """ Extract next complete packet from buffered data, return None if there is not enough data yet
+            Packets with bad checksum are discarded with BadCrcError raised,
+                so decoding may be continued by just calling .frame() again
+            Packets addressed not to master are handled according to ADDRESS_MISMATCH_ACTION:
+                'WARN&DENY' / 'DENY' - packet is silently skipped (with warning for the former)
+                'WARN' - packet is accepted with warning
+                'ERROR' - SerialCommunicationError is raised, packet is skipped
+                any other value (e.g. 'NONE') - packet is accepted silently
+        """
+
+        buffer = self.buffer
+        while True:
+            if self.header is None and not self.__findHeader():
+                return None
+
+            address, datalen, zerobyte, skip = self.header
+            end = self.HEADER_LEN + datalen + 2  # 2 is packet RFC
+            if len(buffer) < end: return None
+            packet = bytes(buffer[:end])
+            del buffer[:end]
+            self.header = None
+
+            # ▼ Compare checksums instead of verifying whole packet checksum to be zero:
+            #   rfc1071() folds carry only once, so the latter is not reliable for large packets
+            if self.CHECK_RFC and rfc1071(memoryview(packet)[:-2]) != packet[-2:]:
+                self.crcErrors += 1
+                if self.capture is not None: self.capture(packet, Outcome.BAD_CRC)
+                raise BadCrcError(f"Bad packet checksum (expected '{bytewise(rfc1071(packet[:-2]))}', "
+                                  f"got '{bytewise(packet[-2:])}'). Packet discarded",
+                                  dataname="Packet", data=packet)
+            if self.capture is not None: self.capture(packet, Outcome.DENIED if skip else Outcome.OK)
+            if skip:
+                self.denied += len(packet)
+                continue
+            return Frame(address, packet[self.HEADER_LEN:-3 if zerobyte else -2], packet)  # 1 is zero padding byte
+
+    def __findHeader(self) -> bool:
+        buffer = self.buffer
+        if buffer[:1] == self.STARTBYTE_BYTES and self.__validHeader(0):
+            index = 0
+        else:
+            index = self.__scan()
+        if index == -1:
+            # ▼ Keep the tail that may turn out to be the beginning of a header
+            keep = buffer.find(self.STARTBYTE, max(len(buffer) - self.HEADER_LEN + 1, 0))
+            self.__discard(keep if keep != -1 else len(buffer))
+            return False
+        self.__discard(index)
+        self.header = self.__parseHeader(buffer)
+        return True
+
+    def __validHeader(self, index: int) -> bool:
+        buffer = self.buffer
+        end = index + self.HEADER_LEN
+        if len(buffer) < end: return False
+        return not self.CHECK_RFC or rfc1071(buffer[index:end-2]) == buffer[end-2:end]
+
+    def __scan(self) -> int:
+        """ Return index of the first valid header in buffer, -1 if there is none
+            Buffer head is searched candidate by candidate, the rest is scanned in windows
+                validating all STARTBYTE candidates of a window at once (if NumPy is available),
+                so the cost of the scan is proportional to the size of the garbage rather than of the buffer
+        """
+
+        buffer = self.buffer
+        last = len(buffer) - self.HEADER_LEN  # last index a complete header may start at
+        if last < 0: return -1
+        if not self.CHECK_RFC: return buffer.find(self.STARTBYTE, 0, last + 1)
+
+        head = last if numpy is None else min(last, self.VECTORIZED_SCAN_THRESHOLD)
+        index = buffer.find(self.STARTBYTE, 0, head + 1)
+        while index != -1 and not self.__validHeader(index):
+            index = buffer.find(self.STARTBYTE, index + 1, head + 1)
+        if index != -1 or head == last: return index
+
+        data = numpy.frombuffer(buffer, dtype=numpy.uint8)
+        for start in range(head + 1, last + 1, self.VECTORIZED_SCAN_WINDOW):
+            window = data[start:min(start + self.VECTORIZED_SCAN_WINDOW, last + 1)]
+            candidates = numpy.flatnonzero(window == self.STARTBYTE) + start
+            if not candidates.size: continue
+            b0, b1, b2, b3, b4, b5 = (data[candidates + i].astype(numpy.uint32) for i in range(6))
+            # ▼ Same arithmetic as rfc1071() performs on 4 header bytes
+            chsum = (b0 << 8 | b1) + (b2 << 8 | b3)
+            chsum = (chsum & 0xFFFF) + (chsum >> 16)
+            valid = numpy.flatnonzero((~chsum & 0xFFFF) == (b4 << 8 | b5))
+            if valid.size: return int(candidates[valid[0]])
+        return -1
+
+    def __discard(self, size: int):
+        if size == 0: return
+        if log.isEnabledFor(WARNING):
+            log.warning(f"Bad data in front of the stream: [{bytewise(bytes(self.buffer[:size]), collapseAfter=48)}]. "
+                        f"Discarded {size} bytes while searching for valid header")
+        if self.capture is not None: self.capture(bytes(self.buffer[:size]), Outcome.DISCARDED)
+        del self.buffer[:size]
+        self.discarded += size
+        self.resyncs += 1
+
+    def __parseHeader(self, header) -> tuple:
+        fields = HEADER.unpack_from(header)
+        address = fields.address
+        datalen = fields.length * 2  # extract size in bytes, not 16-bit words
+        zerobyte = fields.even
+        log.debug("ZeroByte: %s", zerobyte)
+        skip = False
+        if (address != self.masterAddress):
+            self.mismatches += 1
+            message = f"Unexpected master address (expected '{self.masterAddress}', got '{address}')"
+            if self.ADDRESS_MISMATCH_ACTION in ('WARN&DENY', 'WARN'):
+                log.warning(message)
+            if self.ADDRESS_MISMATCH_ACTION in ('WARN&DENY', 'DENY'):
+                # packet will be read to the end and rejected
+                skip = True
+            elif self.ADDRESS_MISMATCH_ACTION == 'ERROR':  # interrupt transaction — raise SerialCommunicationError
+                self.header = (address, datalen, zerobyte, True)
+                raise SerialCommunicationError(message)
+        return address, datalen, zerobyte, skip
@@ -0,0 +1,74 @@
+import json
+from time import perf_counter_ns
+from typing import Optional
+
+from Utils.histogram import Histogram
+
+
+class LinkMetrics:
+    """ Health counters and latency histograms of a single port
+        Counters are plain ints updated by the thread doing I/O on the port,
+            so reading them from other threads is cheap and needs no locking
+        Decoder-level counters (CRC failures, resyncs, discarded bytes, address mismatches)
+            are kept by PelengDecoder and exposed here as read-only properties
+        Latencies are recorded in microseconds:
+            .roundTrip - from packet being sent to reply being received
+            .read - time spent in receivePacket() waiting for the reply
+        Usage:
+            >>> print(transceiver.metrics.json())
+    """
+
+    COUNTERS = ('packetsSent', 'packetsReceived', 'bytesSent', 'bytesReceived', 'timeouts')
+    DECODER_COUNTERS = ('crcErrors', 'resyncs', 'discarded', 'mismatches')
+
+    def __init__(self, decoder=None):
+        self.decoder = decoder
+        self.packetsSent: int = 0
+        self.packetsReceived: int = 0
+        self.bytesSent: int = 0
+        self.bytesReceived: int = 0
+        self.timeouts: int = 0
+        self.roundTrip = Histogram()
+        self.read = Histogram()
+        self.lastSent: Optional[int] = None  # perf_counter_ns() of last packet sent
+
+    crcErrors = property(lambda self: self.decoder.crcErrors if self.decoder else 0)
+    resyncs = property(lambda self: self.decoder.resyncs if self.decoder else 0)
+    discarded = property(lambda self: self.decoder.discarded if self.decoder else 0)
+    mismatches = property(lambda self: self.decoder.mismatches if self.decoder else 0)
+
+    def packetSent(self, size: int):
+        self.packetsSent += 1
+        self.bytesSent += size
+        self.lastSent = perf_counter_ns()
+
+    def packetReceived(self, size: int, readStarted: int = None, sent: int = None):
+        """ Count received packet and record its latencies
+            readStarted - perf_counter_ns() of the moment reading has been started, if known
+            sent - perf_counter_ns() of the moment the command has been sent, time of last packet sent by default
+        """
+        now = perf_counter_ns()
+        self.packetsReceived += 1
+        self.bytesReceived += size
+        if readStarted is not None:
+            self.read.record((now - readStarted) // 1000)
+        if sent is None:
+            sent, self.lastSent = self.lastSent, None
+        if sent is not None:
+            self.roundTrip.record((now - sent) // 1000)
+
+    def reset(self):
+        for name in self.COUNTERS: setattr(self, name, 0)
+        if self.decoder:
+            for name in self.DECODER_COUNTERS: setattr(self.decoder, name, 0)
+        self.roundTrip.reset()
+        self.read.reset()
+        self.lastSent = None
+
+    def snapshot(self) -> dict:
+        snapshot = {name: getattr(self, name) for name in self.COUNTERS + self.DECODER_COUNTERS}
+        snapshot.update(roundTrip=self.roundTrip.snapshot(), read=self.read.snapshot())
+        return snapshot
+
+    def json(self, **kwargs) -> str:
+        return json.dumps(self.snapshot(), **kwargs)
@@ -0,0 +1,232 @@
+import heapq
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from itertools import count
+from math import sqrt
+from threading import Event, Lock, Thread
+from time import monotonic
+from typing import Callable, Deque, Dict, List, Optional
+
+from Utils import Logger
+from .errors import *
+
+log = Logger("Scheduler")
+log.setLevel('WARNING')
+
+
+class PollJob:
+    """ Periodic command sent to the device on specific port with reply statistics collected """
+
+    __slots__ = ('transceiver', 'command', 'address', 'period', 'callback', 'errback', 'name',
+                 'due', 'queued', 'active', 'runs', 'errors', 'missed',
+                 'firstStart', 'lastStart', 'intervals', 'intervalMean', 'intervalM2', 'lastError')
+
+    def __init__(self, transceiver, command: bytes, address: Optional[int], period: float,
+                 callback: Callable[[bytes], None] = None, errback: Callable[[Exception], None] = None,
+                 name: str = None):
+        self.transceiver = transceiver
+        self.command = command
+        self.address = address
+        self.period = period
+        self.callback = callback
+        self.errback = errback
+        self.name = name or f"{transceiver.port}:{address}:{command[:8].hex()}"
+        self.due: float = 0.0
+        self.queued: bool = False
+        self.active: bool = True
+        self.runs: int = 0
+        self.errors: int = 0
+        self.missed: int = 0
+        self.firstStart: Optional[float] = None
+        self.lastStart: Optional[float] = None
+        self.lastError: Optional[Exception] = None
+        # ▼ Welford running mean/variance of intervals between consecutive starts
+        self.intervals: int = 0
+        self.intervalMean: float = 0.0
+        self.intervalM2: float = 0.0
+
+    def _started_(self, now: float):
+        if self.lastStart is None:
+            self.firstStart = now
+        else:
+            interval = now - self.lastStart
+            self.intervals += 1
+            delta = interval - self.intervalMean
+            self.intervalMean += delta / self.intervals
+            self.intervalM2 += delta * (interval - self.intervalMean)
+        self.lastStart = now
+        self.runs += 1
+
+    @property
+    def rate(self) -> float:
+        """ Achieved polling rate, Hz """
+        if not self.intervals: return 0.0
+        return self.intervals / (self.lastStart - self.firstStart)
+
+    @property
+    def jitter(self) -> float:
+        """ Standard deviation of intervals between consecutive polls, seconds """
+        if self.intervals < 2: return 0.0
+        return sqrt(self.intervalM2 / (self.intervals - 1))
+
+    def stats(self) -> dict:
+        return dict(period=self.period, rate=self.rate, jitter=self.jitter,
+                    runs=self.runs, errors=self.errors, missed=self.missed)
+
+
+class PollScheduler:
+    """ Periodic poller driving many transceivers concurrently
+        Owns a set of PelengTransceiver instances and runs their I/O on a bounded thread pool:
+            • each port is served by at most one worker at a time (transactions on one port are serialized)
+            • jobs of different ports are executed concurrently, up to `workers` ports at once
+        Poll job is skipped and counted as missed deadline if it is still pending
+            or running when its next period begins
+        Usage:
+            >>> with PollScheduler(workers=8) as scheduler:
+            >>>     job = scheduler.addJob(transceiver, command, address=12, period=0.01, callback=handler)
+            >>>     ...
+            >>>     print(scheduler.stats())
+    """
+
+    def __init__(self, workers: int = 4):
+        self.workers: int = workers
+        self.ports: Dict[object, Deque[PollJob]] = {}  # transceiver -> jobs ready to run
+        self.activePorts = set()
+        self.jobs: List[PollJob] = []
+        self.heap: list = []
+        self.counter = count()
+        self.lock = Lock()
+        self.wakeup = Event()
+        self.running: bool = False
+        self.thread: Optional[Thread] = None
+        self.executor: Optional[ThreadPoolExecutor] = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, errtype, value, traceback):
+        self.stop()
+
+    def addPort(self, transceiver):
+        with self.lock:
+            self.ports.setdefault(transceiver, deque())
+        return transceiver
+
+    def removePort(self, transceiver):
+        with self.lock:
+            for job in self.jobs:
+                if job.transceiver is transceiver: job.active = False
+            self.jobs = [job for job in self.jobs if job.active]
+            self.ports.pop(transceiver, None)
+
+    def addJob(self, transceiver, command: bytes, address: int = None, period: float = 0.1,
+               callback: Callable[[bytes], None] = None, errback: Callable[[Exception], None] = None,
+               name: str = None) -> PollJob:
+        """ Schedule `command` to be sent to device `address` over `transceiver` every `period` seconds
+            Reply payload is passed to `callback`, communication error - to `errback`
+        """
+        self.addPort(transceiver)
+        job = PollJob(transceiver, command, address, period, callback, errback, name)
+        with self.lock:
+            job.due = monotonic()
+            self.jobs.append(job)
+            heapq.heappush(self.heap, (job.due, next(self.counter), job))
+        self.wakeup.set()
+        return job
+
+    def removeJob(self, job: PollJob):
+        with self.lock:
+            job.active = False
+            self.jobs.remove(job)
+
+    def start(self):
+        if self.running: return
+        self.running = True
+        self.executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='Poll worker')
+        self.thread = Thread(name="Poll scheduler", target=self._schedule_, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        if not self.running: return
+        self.running = False
+        self.wakeup.set()
+        self.thread.join()
+        self.executor.shutdown(wait=True)
+        # ▼ Drop polls queued but not run, so restarted scheduler does not see ports as busy
+        with self.lock:
+            self.activePorts.clear()
+            for queue in self.ports.values(): queue.clear()
+            for job in self.jobs: job.queued = False
+
+    def stats(self) -> Dict[str, dict]:
+        """ Return {job name: stats dict} with achieved rate, jitter and missed deadlines of all jobs """
+        return {job.name: job.stats() for job in tuple(self.jobs)}
+
+    def _schedule_(self):
+        heap = self.heap
+        while self.running:
+            with self.lock:
+                while heap and not heap[0][2].active:
+                    heapq.heappop(heap)
+                timeout = heap[0][0] - monotonic() if heap else None
+            if timeout is None or timeout > 0:
+                self.wakeup.wait(timeout)
+                self.wakeup.clear()
+                continue
+
+            with self.lock:
+                due, _, job = heapq.heappop(heap)
+                if not job.active: continue
+                now = monotonic()
+                if job.queued:
+                    # ▼ Previous poll is not completed yet — skip this one
+                    job.missed += 1
+                else:
+                    job.queued = True
+                    self.ports[job.transceiver].append(job)
+                    if job.transceiver not in self.activePorts:
+                        self.activePorts.add(job.transceiver)
+                        self.executor.submit(self._serve_, job.transceiver)
+                job.due += job.period
+                if job.due < now:
+                    # ▼ Scheduler has fallen behind — count skipped periods and realign
+                    skipped = int((now - job.due) // job.period) + 1
+                    job.missed += skipped
+                    job.due += skipped * job.period
+                heapq.heappush(heap, (job.due, next(self.counter), job))
+
+    def _serve_(self, transceiver):
+        """ Run all jobs queued for the port, then release it """
+        while True:
+            with self.lock:
+                queue = self.ports.get(transceiver)
+                if not queue:
+                    self.activePorts.discard(transceiver)
+                    return
+                job = queue.popleft()
+            self._run_(job)
+
+    def _run_(self, job: PollJob):
+        job._started_(monotonic())
+        try:
+            job.transceiver.sendPacket(job.command, job.address)
+            reply = job.transceiver.receivePacket()
+        except Exception as e:
+            # ▼ Any failure (including invalid job parameters) is reported, so the port is never left busy
+            job.errors += 1
+            job.lastError = e
+            if isinstance(e, SerialError): log.warning(f"Job {job.name}: {e}")
+            else: log.error(f"Job {job.name}: {e.__class__.__name__}: {e}")
+            self._notify_(job, job.errback, e)
+        else:
+            self._notify_(job, job.callback, reply)
+        finally:
+            job.queued = False
+
+    @staticmethod
+    def _notify_(job: PollJob, handler: Optional[Callable], result):
+        if handler is None: return
+        # ▼ Faulty handler should not stall the port
+        try: handler(result)
+        except Exception as e: log.error(f"Job {job.name}: handler {handler.__name__}() failed — {e}")
@@ -1,12 +1,15 @@
-import struct
+from logging import INFO
 from contextlib import contextmanager
-from functools import wraps
-from typing import Tuple
+from time import monotonic, perf_counter_ns
+from typing import Optional, Tuple
 
 import serial
 from Utils import Logger, bytewise, legacy
 from .interface import Transceiver
-from .checksums import rfc1071
+from .capture import CaptureWriter
+from .checksums import Rfc1071, lrc
+from .decoder import PelengDecoder, HEADER
+from .metrics import LinkMetrics
 from .errors import *
 
 log = Logger("Serial")
@@ -111,161 +114,229 @@ class SerialTransceiver(serial.Serial):
                     f"'{self.port}', {self.baudrate}, {self.bytesize}-{self.parity}-{self.stopbits}")
 
 
-class PelengTransceiver(SerialTransceiver, Transceiver):
+class decoderOption:
+    """ Descriptor forwarding transceiver attr to the same-name attr of its decoder """
+
+    def __set_name__(self, owner, name):
+        self.name = name
+
+    def __get__(self, instance, owner):
+        if instance is None: return self
+        return getattr(instance.decoder, self.name)
+
+    def __set__(self, instance, value):
+        setattr(instance.decoder, self.name, value)
+
+
+class PelengProtocol:
+    """ Peleng protocol framing rules shared by transceivers working over different transports
+        Successors should define .deviceAddress, .decoder (PelengDecoder), .metrics (LinkMetrics)
+            and .txBuffer (bytearray) attrs
+    """
+
     AUTO_LRC: bool = False
-    HEADER_LEN: int = 6  # in bytes
-    STARTBYTE: int = 0x5A
+    HEADER_LEN: int = PelengDecoder.HEADER_LEN  # in bytes
+    STARTBYTE: int = PelengDecoder.STARTBYTE
     MASTER_ADR: int = 0  # should be set in reply to host machine
 
+    masterAddress = decoderOption()
+    CHECK_RFC = decoderOption()
+    ADDRESS_MISMATCH_ACTION = decoderOption()
+
+    capture: Optional[CaptureWriter] = None
+
+    @property
+    def nTimeouts(self) -> int:
+        return self.metrics.timeouts
+
+    @nTimeouts.setter
+    def nTimeouts(self, value: int):
+        self.metrics.timeouts = value
+
+    def startCapture(self, path: str) -> CaptureWriter:
+        """ Start recording all sent and received data to binary capture file (appended if exists) """
+        self.stopCapture()
+        self.capture = CaptureWriter(path)
+        self.decoder.capture = self.capture.received
+        return self.capture
+
+    def stopCapture(self):
+        if self.capture is None: return
+        self.decoder.capture = None
+        self.capture.close()
+        self.capture = None
+
+    @contextmanager
+    def capturing(self, path: str):
+        """ Context manager recording traffic to capture file within its context """
+        capture = self.startCapture(path)
+        try: yield capture
+        finally: self.stopCapture()
+
+    @classmethod
+    def packetSize(cls, datalen: int) -> int:
+        """ Return size of the packet wrapping `datalen` bytes of payload """
+        if cls.AUTO_LRC and datalen: datalen += 1
+        return cls.HEADER_LEN + datalen + datalen % 2 + 2  # 2 is packet RFC
+
+    def wrapPacket(self, buffer: bytearray, datalen: int, address: int = None) -> int:
+        """ Assemble packet in-place around payload of `datalen` bytes placed in `buffer` at HEADER_LEN offset:
+                header with its RFC is written in front of payload,
+                LRC (if AUTO_LRC is set), zero padding byte (if needed) and packet RFC are appended after it
+            Return packet size """
+
+        if address is None: address = self.deviceAddress
+        view = memoryview(buffer)
+        end = self.HEADER_LEN + datalen
+        if self.AUTO_LRC and datalen:
+            view[end] = lrc(view[self.HEADER_LEN:end])[0]
+            end += 1
+            datalen += 1
+        assert (datalen <= 0xFFF)
+        assert (address <= 0xFF)
+        zerobyte = datalen % 2
+        if zerobyte:
+            view[end] = 0
+            end += 1
+            datalen += 1
+        # below: data_size = datalen//2 ► translate data size in 16-bit words
+        HEADER.pack_into(view, 0, self.STARTBYTE, address, datalen // 2, zerobyte)
+        chsum = Rfc1071(view[:self.HEADER_LEN - 2])
+        view[self.HEADER_LEN - 2:self.HEADER_LEN] = chsum.digest()
+        # ▼ extend header checksum to the whole packet
+        view[end:end + 2] = chsum.update(view[self.HEADER_LEN - 2:end]).digest()
+        return end + 2
+
+    def wrapMessage(self, msg: bytes, address: int = None) -> memoryview:
+        """ Assemble packet wrapping `msg` in reusable .txBuffer (grown if needed), so msg is copied only once
+            Return view of the packet, it is valid only until .txBuffer is reused """
+
+        packetSize = self.packetSize(len(msg))
+        if len(self.txBuffer) < packetSize:
+            self.txBuffer = bytearray(max(packetSize, len(self.txBuffer) * 2))
+        self.txBuffer[self.HEADER_LEN:self.HEADER_LEN + len(msg)] = msg
+        return memoryview(self.txBuffer)[:self.wrapPacket(self.txBuffer, len(msg), address)]
+
+
+class PelengTransceiver(SerialTransceiver, PelengProtocol, Transceiver):
+    RESYNC_LIMIT: int = 600  # max bytes discarded or skipped while searching for valid packet
+    RESYNC_TIMEOUT: float = 1.0  # max seconds spent searching for valid packet, None to disable
+
     chch_packet_out: bytes = '5A 0C 06 80 9F 73 01 01 A8 AB AF AA AC AB A3 AA 08 00 4E 52'
     chch_command: bytes = '01 01 A8 AB AF AA AC AB A3 AA 08'
     chch_packet_in: bytes = '5A 00 06 80 9F 7F 01 01 A8 AB AF AA AC AB A3 AA 08 00 4E 52'
     chch_reply: bytes = '01 01 A8 AB AF AA AC AB A3 AA 08'
 
-    def __init__(self, device: int = None, master: int = MASTER_ADR, **kwargs):
+    def __init__(self, device: int = None, master: int = PelengProtocol.MASTER_ADR, **kwargs):
+        self.decoder = PelengDecoder(master)
+        self.metrics = LinkMetrics(self.decoder)
         super().__init__(**kwargs)
         self.deviceAddress = device
         self.masterAddress = master
+        self.txBuffer = bytearray(256)
 
         self.CHECK_RFC: bool = True
         self.FLUSH_UNREAD_DATA: bool = False
         self.ADDRESS_MISMATCH_ACTION: str = 'WARN&DENY'
 
-    class addCRC():
-        """Decorator to sendPacket() method, appending LRC byte to msg"""
-        __slots__ = ('addLRC')
-
-        def __init__(self, addLRC):
-            self.addLRC = addLRC
-
-        def __call__(self, sendPacketFunction):
-            if (not self.addLRC):
-                return sendPacketFunction
-            else:
-                from .checksums import lrc
-
-                @wraps(sendPacketFunction)
-                def sendPacketWrapper(wrappee_self, msg, *args, **kwargs):
-                    return sendPacketFunction(wrappee_self, msg + lrc(msg), *args, **kwargs)
-
-                return sendPacketWrapper
-
     def receivePacket(self) -> bytes:
         """
         Reads packet from serial datastream and returns unwrapped data:
-            Reads header and determines the length of payload data
-            Reads payload and wrapper footer (checksum - 2 bytes)
-            Returns payload data if header and data lengths + header and packet checksums are OK. Raises error otherwise
-        If header is not contained in very first bytes of datastream, sequentially reads bytes portions of header length
-        until valid header is found. Raise error otherwise.
-        No extra data is grabbed from datastream after valid packet is successfully read.
+            Feeds all available bytes (but not less than required to complete the packet) to the decoder
+            Returns payload data as soon as decoder assembles a valid packet
+            Raises error if datastream ends up before valid packet is received
+        If header is not contained in very first bytes of datastream, garbage in front of it is discarded
+        until valid header is found. Packets addressed to other master are skipped the same way
+        (see .ADDRESS_MISMATCH_ACTION). Raise error if more than RESYNC_LIMIT bytes are discarded
+        or skipped or search takes longer than RESYNC_TIMEOUT seconds. If only skipped packets
+        have been received, that is reported as SerialReadTimeoutError.
+        Extra data grabbed from datastream is kept in the decoder buffer till the next call.
         """
 
-        bytesReceived = self.readSimple(self.HEADER_LEN)
-
-        # TODO: byteorder here ▼ and everywhere - ?
-        if (len(bytesReceived) == self.HEADER_LEN and bytesReceived[0] == self.STARTBYTE and
-                (not self.CHECK_RFC or int.from_bytes(rfc1071(bytesReceived), byteorder='big') == 0)):
-            header = bytesReceived
-            try:
-                return self.__readData(header)
-            except AddressMismatchError:
-                return self.receivePacket()
-        elif (len(bytesReceived) == 0):
+        decoder = self.decoder
+        discardedInitially = decoder.discarded
+        deniedInitially = decoder.denied
+        resyncStarted = None
+        readStarted = perf_counter_ns()
+        while True:
+            frame = decoder.frame()
+            if frame is not None: break
+            discarded = decoder.discarded - discardedInitially
+            denied = decoder.denied - deniedInitially
+            if discarded or denied:
+                if discarded + denied > self.RESYNC_LIMIT:
+                    self.__raiseResync(discarded, denied, f"{discarded} bytes discarded, {denied} bytes skipped")
+                if resyncStarted is None:
+                    resyncStarted = monotonic()
+                elif self.RESYNC_TIMEOUT is not None and monotonic() - resyncStarted > self.RESYNC_TIMEOUT:
+                    self.__raiseResync(discarded, denied, f"for {self.RESYNC_TIMEOUT} seconds")
+            bytesReceived = self.readSimple(max(self.in_waiting, decoder.needed))
+            if not bytesReceived:
+                self.__raiseIncomplete(discardedInitially)
+            decoder.feed(bytesReceived)
+
+        self.metrics.packetReceived(len(frame.packet), readStarted)
+        if slog.isEnabledFor(INFO):
+            slog.info(f"Reply  [{len(frame.packet)}]: {bytewise(frame.packet)}")
+        if (self.in_waiting != 0 or decoder.buffer):
+            log.warning(f"Unread data ({self.in_waiting + len(decoder.buffer)} bytes) "
+                        f"is left in a serial datastream")
+            if (self.FLUSH_UNREAD_DATA):
+                self.reset_input_buffer()
+                decoder.reset()
+                log.info(f"Serial input buffer flushed")
+        return frame.data
+
+    def __raiseResync(self, discarded: int, denied: int, details: str):
+        if discarded:
+            raise SerialCommunicationError(f"Cannot find header in datastream, {details}")
+        # ▼ Bus is busy with other master traffic, but this master got no reply
+        self.metrics.timeouts += 1
+        raise SerialReadTimeoutError(f"No reply, only packets to other master received ({details})")
+
+    def __raiseIncomplete(self, discardedInitially):
+        decoder = self.decoder
+        header = decoder.header
+        pending = decoder.reset()
+        if header is not None and header[3]:
+            # ▼ Truncated packet addressed to other master is not a reply to be reported as broken
+            self.metrics.timeouts += 1
             raise SerialReadTimeoutError("No reply")
-        elif (len(bytesReceived) < self.HEADER_LEN):
-            raise BadDataError(f"Bad header (too small, [{len(bytesReceived)}] out of [{self.HEADER_LEN}])",
-                               dataname="Header", data=bytesReceived)
-        else:
-            if (bytesReceived[0] == self.STARTBYTE):
-                log.warning(f"Bad header checksum (expected '{bytewise(rfc1071(bytesReceived[:-2]))}', "
-                            f"got '{bytewise(bytesReceived[-2:])}'). Header discarded, searching for valid one...")
-            else:
-                log.warning(f"Bad data in front of the stream: [{bytewise(bytesReceived)}]. "
-                            f"Searching for valid header...")
-            header = bytesReceived
-            for i in range(1, 100):  # TODO: limit infinite loop in a better way
-                while True:
-                    startbyteIndex = header.find(self.STARTBYTE, 1)  # ignore byte at position 0, it is not a startbyte
-                    if (startbyteIndex == -1):
-                        header = self.readSimple(self.HEADER_LEN)
-                        log.debug(f"Try next {self.HEADER_LEN} bytes: [{bytewise(header)}]")
-                        if (len(header) < self.HEADER_LEN):
-                            raise BadDataError("Failed to find valid header",
-                                               dataname="Header", data=header)
-
-                    else: break
-                headerReminder = self.readSimple(startbyteIndex)
-                header = header[startbyteIndex:] + headerReminder
-                log.debug(f"Try appending {startbyteIndex} more bytes: [{bytewise(header)}]")
-                if (len(headerReminder) < startbyteIndex):
-                    raise BadDataError("Bad header", dataname="Header", data=header)
-                if (not self.CHECK_RFC or int.from_bytes(rfc1071(header), byteorder='big') == 0):
-                    log.info(f"Found valid header at pos {i * self.HEADER_LEN + startbyteIndex}")
-                    try:
-                        return self.__readData(header)
-                    except AddressMismatchError:
-                        self.receivePacket()
-            else: raise SerialCommunicationError("Cannot find header in datastream, too many attempts...")
-        # TODO: Still have unread data at the end of the serial stream sometimes.
-        #       Action that once caused the issue: sent 'ms 43 0' without adding a signal value (need to alter the code)
-
-    def __readData(self, header):
-        datalen, zerobyte = self.__parseHeader(header)
-        data = self.read(datalen + 2)  # 2 is wrapper RFC
-        if (len(data) < datalen + 2):
-            raise BadDataError(f"Bad packet (data too small, [{len(data)}] out of [{datalen + 2}])",
-                               dataname="Packet", data=header + data)
-        if (not self.CHECK_RFC or int.from_bytes(rfc1071(header + data), byteorder='big') == 0):
-            slog.info(f"Reply  [{len(header + data)}]: {bytewise(header + data)}")
-            if (self.in_waiting != 0):
-                log.warning(f"Unread data ({self.in_waiting} bytes) is left in a serial datastream")
-                if (self.FLUSH_UNREAD_DATA):
-                    self.reset_input_buffer()
-                    log.info(f"Serial input buffer flushed")
-            return data[:-2] if (not zerobyte) else data[:-3]  # 2 is packet RFC, 1 is zero padding byte
+        elif header is not None:
+            datalen = header[1] + 2  # 2 is wrapper RFC
+            received = len(pending) - self.HEADER_LEN
+            raise BadDataError(f"Bad packet (data too small, [{received}] out of [{datalen}])",
+                               dataname="Packet", data=pending)
+        elif pending:
+            raise BadDataError(f"Bad header (too small, [{len(pending)}] out of [{self.HEADER_LEN}])",
+                               dataname="Header", data=pending)
+        elif decoder.discarded != discardedInitially:
+            raise BadDataError("Failed to find valid header")
         else:
-            raise BadCrcError(f"Bad packet checksum (expected '{bytewise(rfc1071(data[:-2]))}', "
-                              f"got '{bytewise(data[-2:])}'). Packet discarded",
-                              dataname="Packet", data=header + data)
-
-    def __parseHeader(self, header):
-        assert (len(header) == self.HEADER_LEN)
-        assert (header[0] == self.STARTBYTE)
-        # unpack header (fixed structure - 6 bytes)
-        fields = struct.unpack('< B B H H', header)  # FIXME: bug in datalen unpacking - see coupling protocol notes
-        datalen = (fields[2] & 0x0FFF) * 2  # extract size in bytes, not 16-bit words
-        zerobyte = (fields[2] & 1 << 15) >> 15  # extract EVEN flag (b15 in LSB / b7 in MSB)
-        log.debug(f"ZeroByte: {zerobyte == 1}")
-        if (fields[1] != self.masterAddress):
-            message = f"Unexpected master address (expected '{self.masterAddress}', got '{fields[1]}')"
-            if self.ADDRESS_MISMATCH_ACTION in ('WARN&DENY', 'WARN'):
-                log.warning(message)
-            if self.ADDRESS_MISMATCH_ACTION in ('WARN&DENY', 'DENY'):
-                # read current packet to the end, reject it and restart receivePacket method
-                try: self.read(datalen + 2)
-                except SerialError: pass
-                raise AddressMismatchError(fields[1])
-            elif self.ADDRESS_MISMATCH_ACTION == 'ERROR':  # interrupt transaction — raise SerialCommunicationError
-                raise SerialCommunicationError(message)
-        return datalen, zerobyte
-
-    @addCRC(AUTO_LRC)
-    def sendPacket(self, msg:bytes) -> int:
+            self.metrics.timeouts += 1
+            raise SerialReadTimeoutError("No reply")
+
+    def sendPacket(self, msg: bytes, address: int = None) -> int:
         """ Wrap msg and send packet over serial port. Return number of bytes sent
-            For DspAssist protocol - if AUTO_LRC is False, it is assumed that LRC byte is already appended to msg """
+            For DspAssist protocol - if AUTO_LRC is False, it is assumed that LRC byte is already appended to msg
+            Packet is assembled in reusable transceiver buffer, so msg is copied only once
+            Packet is addressed to `address` device if provided, to .deviceAddress otherwise """
 
-        datalen = len(msg)  # get data size in bytes
-        assert (datalen <= 0xFFF)
-        assert (self.deviceAddress <= 0xFF)
-        zerobyte = b'\x00' if (datalen % 2) else b''
-        datalen += len(zerobyte)
-        # below: data_size = datalen//2 ► translate data size in 16-bit words
-        header = struct.pack('< B B H', self.STARTBYTE, self.deviceAddress, (datalen // 2) | (len(zerobyte) << 15))
-        packet = header + rfc1071(header) + msg + zerobyte
-        packetToSend = packet + rfc1071(packet)
-        bytesSentCount = self.write(packetToSend)
-        slog.info(f"Packet [{len(packetToSend)}]: {bytewise(packetToSend)}")
+        return self.__writePacket(self.wrapMessage(msg, address))
+
+    def sendPacketInto(self, buffer: bytearray, datalen: int, address: int = None) -> int:
+        """ Wrap payload of `datalen` bytes placed in `buffer` at HEADER_LEN offset
+                and send resulting packet over serial port. Return number of bytes sent
+            Packet is assembled in-place, so `buffer` should be at least .packetSize(datalen) bytes long """
+
+        return self.__writePacket(memoryview(buffer)[:self.wrapPacket(buffer, datalen, address)])
+
+    def __writePacket(self, packet: memoryview) -> int:
+        bytesSentCount = self.write(packet)
+        self.metrics.packetSent(bytesSentCount)
+        if self.capture is not None: self.capture.sent(packet)
+        if slog.isEnabledFor(INFO):
+            slog.info(f"Packet [{len(packet)}]: {bytewise(packet)}")
         return bytesSentCount
 
 
@@ -0,0 +1,198 @@
+from collections import deque, defaultdict
+from concurrent.futures import Future
+from itertools import count
+from threading import Condition, Thread
+from time import monotonic, perf_counter_ns
+from typing import Callable, Deque, Dict, Optional
+
+from Utils import Logger
+from .decoder import Frame
+from .errors import *
+
+log = Logger("Transactions")
+log.setLevel('WARNING')
+
+
+class Transaction:
+    """ Command sent to the device and waiting for reply """
+
+    __slots__ = 'command', 'address', 'timeout', 'deadline', 'future', 'index', 'sent'
+
+    def __init__(self, command: bytes, address: int, timeout: float, index: int):
+        self.command = command
+        self.address = address
+        self.timeout = timeout
+        self.deadline = float('inf')  # set when command is sent, so unsent transaction never expires
+        self.future = Future()
+        self.index = index  # sequence number, defines global order of transactions
+        self.sent = None  # perf_counter_ns() of the moment command has been sent
+
+
+class TransactionEngine:
+    """ Pipelined request/reply layer over PelengTransceiver
+        Keeps up to `depth` commands in flight per device address - commands are sent without waiting
+            for replies to previous ones, so idle time between writes and reads is eliminated
+        Replies are read by background thread and matched to transactions by header ADR field:
+            • reply carrying device address resolves the oldest pending transaction of that device
+            • reply carrying master address resolves the oldest pending transaction overall
+        Real devices reply with master address (ADR = 0, see PelengTransceiver.chch_packet_in),
+            so in practice replies are matched in global FIFO order of sent commands
+        Commands are sent outside of the lock in order of submission by whichever submitter finds
+            no other one sending, so slow serial writes block neither other submitters nor the reader thread
+        .submit() returns concurrent.futures.Future resolved with reply payload
+            or failed with SerialReadTimeoutError if no reply is received for transaction timeout
+        NOTE: protocol has no transaction IDs, so late reply to an already timed out transaction
+              would be matched to the next one - transaction timeouts should exceed device reply time
+        Usage:
+            >>> with TransactionEngine(transceiver, depth=4) as engine:
+            >>>     futures = [engine.submit(command, address) for address in devices]
+            >>>     replies = [future.result() for future in futures]
+    """
+
+    def __init__(self, transceiver, depth: int = 4, timeout: float = None):
+        self.transceiver = transceiver
+        self.depth: int = depth
+        self.timeout: float = timeout if timeout is not None else transceiver.timeout
+        self.pending: Dict[int, Deque[Transaction]] = defaultdict(deque)
+        self.outbox: Deque[Transaction] = deque()  # registered transactions waiting to be sent
+        self.sending: bool = False  # True while some submitter is sending commands from the outbox
+        self.lock = Condition()
+        self.running: bool = False
+        self.thread: Optional[Thread] = None
+        self.counter = count()
+        self._savedAddressAction_: str = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, errtype, value, traceback):
+        self.stop()
+
+    def start(self):
+        if self.running: return
+        if self.thread is not None: self.stop()  # receiver thread has been terminated by serial error
+        # ▼ Replies are addressed by devices, so decoder should not deny them
+        self._savedAddressAction_ = self.transceiver.ADDRESS_MISMATCH_ACTION
+        self.transceiver.ADDRESS_MISMATCH_ACTION = 'NONE'
+        self.running = True
+        self.thread = Thread(name=f"Transactions: {self.transceiver.port}", target=self._receive_, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        if self.thread is None: return
+        self.running = False
+        self.thread.join()
+        self.thread = None
+        self.transceiver.ADDRESS_MISMATCH_ACTION = self._savedAddressAction_
+        with self.lock:
+            for transactions in self.pending.values():
+                for transaction in transactions: transaction.future.cancel()
+            self.pending.clear()
+            self.outbox.clear()
+            self.lock.notify_all()
+
+    def submit(self, command: bytes, address: int = None, timeout: float = None,
+               callback: Callable[[Future], None] = None) -> Future:
+        """ Send command to device `address` (transceiver.deviceAddress by default) and return Future of reply
+            Blocks while `depth` transactions of that device are in flight,
+                raises RuntimeError if engine is stopped meanwhile
+            `callback` is called with the future as the only argument when transaction is completed
+            Errors of sending the command (serial errors, invalid address, ...) are set to the returned future
+        """
+
+        if not self.running: raise RuntimeError("Transaction engine is not started")
+        if address is None: address = self.transceiver.deviceAddress
+        if timeout is None: timeout = self.timeout
+
+        with self.lock:
+            while self.running and len(self.pending[address]) >= self.depth:
+                self.lock.wait()
+            # ▼ No receiver is left to resolve transactions of stopped engine
+            if not self.running: raise RuntimeError("Transaction engine has been stopped")
+            queue = self.pending[address]
+            transaction = Transaction(command, address, timeout, next(self.counter))
+            if callback is not None: transaction.future.add_done_callback(callback)
+            queue.append(transaction)
+            self.outbox.append(transaction)
+            if self.sending: return transaction.future  # will be sent by active sender in registration order
+            self.sending = True
+        self._send_()
+        return transaction.future
+
+    def _send_(self):
+        """ Send commands from the outbox until it is empty, serial writes are performed without holding the lock """
+        while True:
+            with self.lock:
+                if not self.outbox:
+                    self.sending = False
+                    return
+                transaction = self.outbox.popleft()
+            try:
+                self.transceiver.sendPacket(transaction.command, transaction.address)
+            except Exception as e:
+                with self.lock:
+                    queue = self.pending.get(transaction.address)
+                    if queue and transaction in queue: queue.remove(transaction)
+                    self.lock.notify_all()
+                if not transaction.future.done(): transaction.future.set_exception(e)
+            else:
+                with self.lock:
+                    transaction.sent = perf_counter_ns()
+                    transaction.deadline = monotonic() + transaction.timeout
+
+    def _receive_(self):
+        transceiver = self.transceiver
+        decoder = transceiver.decoder
+        while self.running:
+            try:
+                data = transceiver.readSimple(max(transceiver.in_waiting, decoder.needed))
+            except SerialError as e:
+                log.error(e)
+                self.running = False
+                self._fail_(e)
+                return
+            if data:
+                decoder.feed(data)
+                while True:
+                    try: frame = decoder.frame()
+                    except SerialCommunicationError as e:
+                        log.warning(e)
+                        continue
+                    if frame is None: break
+                    self._resolve_(frame)
+            self._expire_()
+
+    def _resolve_(self, frame: Frame):
+        with self.lock:
+            queue = self.pending.get(frame.address)
+            if not queue and frame.address == self.transceiver.masterAddress:
+                queues = tuple(queue for queue in self.pending.values() if queue)
+                queue = min(queues, key=lambda q: q[0].index) if queues else None
+            if not queue:
+                log.warning(f"Unexpected reply from device {frame.address} - discarded")
+                return
+            transaction = queue.popleft()
+            self.lock.notify_all()
+        self.transceiver.metrics.packetReceived(len(frame.packet), sent=transaction.sent)
+        transaction.future.set_result(frame.data)
+
+    def _expire_(self):
+        now = monotonic()
+        expired = []
+        with self.lock:
+            for queue in self.pending.values():
+                while queue and queue[0].deadline < now:
+                    expired.append(queue.popleft())
+            if expired: self.lock.notify_all()
+        for transaction in expired:
+            self.transceiver.nTimeouts += 1
+            transaction.future.set_exception(SerialReadTimeoutError(f"No reply from device {transaction.address}"))
+
+    def _fail_(self, error: Exception):
+        with self.lock:
+            failed = [transaction for queue in self.pending.values() for transaction in queue]
+            for queue in self.pending.values(): queue.clear()
+            self.lock.notify_all()
+        for transaction in failed:
+            transaction.future.set_exception(error)
@@ -0,0 +1,142 @@
+import os
+import random
+from collections import deque
+from select import select
+from threading import Thread
+from time import sleep
+from typing import Callable, Deque, Dict, Optional
+
+from Utils import Logger
+from .checksums import rfc1071
+from .decoder import PelengDecoder
+from .errors import *
+from .serial_transceiver import PelengProtocol
+
+log = Logger("VirtualDevice")
+log.setLevel('WARNING')
+
+
+class VirtualDevice:
+    """ Pseudo-terminal based device simulator speaking Peleng protocol (Linux/POSIX only)
+        Opens a pty pair and serves commands sent to its slave end (.port) in background thread:
+            each valid command addressed to .address is answered after .latency seconds
+            with reply payload generated by .handler (ACK byte + command echo by default,
+            ACK byte + .replySize bytes if it is set)
+        Faults may be injected into replies - either once via .inject() or randomly via .faults
+            probabilities {fault: probability}. Supported faults:
+                'badHeaderRfc' - header checksum is corrupted
+                'badPacketRfc' - packet checksum is corrupted
+                'wrongMaster'  - reply is addressed to other master
+                'oddEven'      - EVEN flag is inverted (checksums are kept valid)
+                'truncated'    - packet tail is not sent
+        Usage:
+            >>> with VirtualDevice(address=12, latency=0.001) as device:
+            >>>     transceiver = PelengTransceiver(port=device.port, device=12)
+    """
+
+    ACK = b'\x01'
+    FAULTS = ('badHeaderRfc', 'badPacketRfc', 'wrongMaster', 'oddEven', 'truncated')
+
+    def __init__(self, address: int = 1, master: int = PelengProtocol.MASTER_ADR, latency: float = 0.0,
+                 replySize: int = None, handler: Callable[[bytes], bytes] = None,
+                 faults: Dict[str, float] = None):
+        self.address: int = address
+        self.master: int = master
+        self.latency: float = latency
+        self.replySize: Optional[int] = replySize
+        self.handler: Callable[[bytes], bytes] = handler or self.defaultHandler
+        self.faults: Dict[str, float] = faults or {}
+        self.pending: Deque[str] = deque()  # faults to be injected once, in order
+        self.nCommands: int = 0
+        self.nReplies: int = 0
+        self.decoder = PelengDecoder(master=address, addressAction='DENY')
+        self.encoder = PelengProtocol()
+        self.encoder.deviceAddress = master
+        self.masterFd: Optional[int] = None
+        self.slaveFd: Optional[int] = None
+        self.port: Optional[str] = None
+        self.running: bool = False
+        self.thread: Optional[Thread] = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, errtype, value, traceback):
+        self.stop()
+
+    def start(self):
+        if self.running: return
+        import tty
+        self.masterFd, self.slaveFd = os.openpty()
+        tty.setraw(self.slaveFd)
+        self.port = os.ttyname(self.slaveFd)
+        self.running = True
+        self.thread = Thread(name=f"VirtualDevice: {self.port}", target=self._serve_, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        if not self.running: return
+        self.running = False
+        self.thread.join()
+        os.close(self.masterFd)
+        os.close(self.slaveFd)
+        self.masterFd = self.slaveFd = self.port = None
+
+    def inject(self, *faults: str):
+        """ Inject given faults into next replies, one fault per reply """
+        for fault in faults:
+            if fault not in self.FAULTS: raise ValueError(f"Unknown fault '{fault}'")
+        self.pending.extend(faults)
+
+    def defaultHandler(self, command: bytes) -> bytes:
+        if self.replySize is None: return self.ACK + command
+        return self.ACK + bytes(i & 0xFF for i in range(self.replySize))
+
+    def makeReply(self, payload: bytes, fault: str = None) -> bytes:
+        """ Wrap reply payload into packet, applying given fault """
+        HEADER_LEN = self.encoder.HEADER_LEN
+        buffer = bytearray(self.encoder.packetSize(len(payload)))
+        buffer[HEADER_LEN:HEADER_LEN + len(payload)] = payload
+        self.encoder.wrapPacket(buffer, len(payload), self.master + 1 if fault == 'wrongMaster' else None)
+        if fault == 'badHeaderRfc':
+            buffer[HEADER_LEN - 1] ^= 0xFF
+        elif fault == 'badPacketRfc':
+            buffer[-1] ^= 0xFF
+        elif fault == 'oddEven':
+            buffer[3] ^= 0x80  # EVEN flag is b15 of little-endian length field
+            buffer[HEADER_LEN - 2:HEADER_LEN] = rfc1071(buffer[:HEADER_LEN - 2])
+            buffer[-2:] = rfc1071(buffer[:-2])
+        elif fault == 'truncated':
+            del buffer[-max(len(buffer) // 3, 1):]
+        return bytes(buffer)
+
+    def _nextFault_(self) -> Optional[str]:
+        if self.pending: return self.pending.popleft()
+        for fault, probability in self.faults.items():
+            if random.random() < probability: return fault
+        return None
+
+    def _serve_(self):
+        decoder = self.decoder
+        while self.running:
+            ready, _, _ = select((self.masterFd,), (), (), 0.05)
+            if not ready: continue
+            try:
+                decoder.feed(os.read(self.masterFd, 65536))
+            except OSError as e:
+                log.error(f"Failed to read from pty: {e}")
+                return
+            while True:
+                try:
+                    command = decoder.frame()
+                except SerialCommunicationError as e:
+                    log.warning(e)
+                    continue
+                if command is None: break
+                self.nCommands += 1
+                if self.latency: sleep(self.latency)
+                reply = memoryview(self.makeReply(self.handler(command.data), self._nextFault_()))
+                while reply:
+                    reply = reply[os.write(self.masterFd, reply):]
+                self.nReplies += 1
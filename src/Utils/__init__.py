@@ -1,5 +1,12 @@
 from .utils import *
 from .bits import *
+from .hexdump import *
+from .bitarrays import BitLayout
+from .bitstruct import BitStruct
+from .histogram import Histogram
+from .profiling import Profiler, profiler
+from .records import record, RecordArray
 from .context_proxy import Context
 from .configloader import ConfigLoader
+from .configwatcher import ConfigWatcher
 from .colored_logger import Logger, Formatters
@@ -0,0 +1,224 @@
+""" Batched counterparts of Utils.bits functions operating on whole arrays of words at once
+    Functions accept NumPy arrays, array.array objects, typed memoryviews and lists of ints
+        and keep Utils.bits semantics (bit indices are counted right to left, both range limits are inclusive)
+    If NumPy is available, operations are vectorized and return NumPy arrays,
+        otherwise they fall back to per-word processing returning lists
+    Raw byte buffers (bytes, bytearray, received packets) should be viewed as words with words() first
+"""
+
+from typing import Dict, Iterable, Tuple, Union
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+__all__ = 'words', 'extract', 'set', 'clear', 'flag', 'flags', 'bitsarray', 'BitLayout'
+
+
+def _mask(frombit: int, tobit: int = 0) -> int:
+    return ((1 << frombit + 1) - 1) & ~((1 << tobit) - 1)
+
+
+def words(buffer, dtype: str = '<u2'):
+    """ View raw byte buffer as array of words of given NumPy dtype (little-endian 16-bit by default)
+        Buffer data is not copied if NumPy is available
+    """
+    if numpy is not None:
+        return numpy.frombuffer(buffer, dtype=dtype)
+    import struct
+    return [word for word, in struct.iter_unpack(_structFormat(dtype), buffer)]
+
+
+def _structFormat(dtype: str) -> str:
+    """ Convert simple NumPy dtype string ('<u2', '>i4', 'u1', ...) to struct module format """
+    order = dtype[0] if dtype[0] in '<>=' else '='
+    kind, size = dtype.lstrip('<>=|')[0], int(dtype.lstrip('<>=|')[1:])
+    code = {1: 'b', 2: 'h', 4: 'i', 8: 'q'}[size]
+    return order + (code.upper() if kind == 'u' else code)
+
+
+def _array(values):
+    if numpy is not None: return numpy.asarray(values)
+    if isinstance(values, memoryview) and values.format in ('B', 'b', 'c'): return list(values.cast('B'))
+    return list(values)
+
+
+def extract(values, frombit=None, tobit=0):
+    """ Extract bits [frombit..tobit] from every word, see Utils.bits.extract() """
+
+    values = _array(values)
+    if not frombit:
+        if numpy is not None: return values >> tobit
+        return [value >> tobit for value in values]
+    mask = (1 << frombit + 1) - 1
+    if numpy is not None: return (values & mask) >> tobit
+    return [(value & mask) >> tobit for value in values]
+
+
+def set(values, bits=0):
+    """ Set specified bits to 1 in every word, see Utils.bits.set() """
+
+    mask = sum(1 << bit for bit in bits) if hasattr(bits, '__iter__') else 1 << bits
+    values = _array(values)
+    if numpy is not None: return values | numpy.asarray(mask).astype(values.dtype)
+    return [value | mask for value in values]
+
+
+def clear(values, bits=0):
+    """ Set specified bits to 0 in every word, see Utils.bits.clear() """
+
+    mask = sum(1 << bit for bit in bits) if hasattr(bits, '__iter__') else 1 << bits
+    values = _array(values)
+    if numpy is not None: return values & numpy.asarray(~mask & _fullMask(values.dtype)).astype(values.dtype)
+    return [value & ~mask for value in values]
+
+
+def _fullMask(dtype) -> int:
+    return (1 << dtype.itemsize * 8) - 1
+
+
+def flag(values, pos: int):
+    """ Extract one-bit boolean value at `pos` from every word, see Utils.bits.flag() """
+
+    values = _array(values)
+    if numpy is not None: return (values >> pos & 1).astype(bool)
+    return [bool(value >> pos & 1) for value in values]
+
+
+def flags(values, n: int):
+    """ Unpack `n` rightmost bits of every word into boolean matrix of shape (len(values), n)
+        Columns are ordered right to left, so row i equals to Utils.bits.flags(values[i], n)
+    """
+
+    values = _array(values)
+    if numpy is not None:
+        return (values[:, None] >> numpy.arange(n, dtype=values.dtype) & 1).astype(bool)
+    return [tuple(bool(value >> i & 1) for i in range(n)) for value in values]
+
+
+def bitsarray(matrix, dtype: str = '<u2'):
+    """ Pack boolean matrix (rows of flags ordered right to left) into words, inverse of flags()
+        Row i equals to Utils.bits.bitsarray(*matrix[i])
+    """
+
+    if numpy is not None:
+        matrix = numpy.asarray(matrix, dtype=bool)
+        weights = numpy.left_shift(numpy.ones(1, dtype=dtype), numpy.arange(matrix.shape[1], dtype=dtype))
+        return (matrix * weights).sum(axis=1, dtype=dtype) if matrix.size else numpy.zeros(len(matrix), dtype)
+    return [sum(bool(bit) << i for i, bit in enumerate(row)) for row in matrix]
+
+
+class BitLayout:
+    """ Compiled description of named bit fields of a word
+        Fields are defined once as keyword arguments:
+            name=bit - one-bit flag, decoded to bool
+            name=(frombit, tobit) - multi-bit field [frombit..tobit], both inclusive, decoded to int
+        Masks and shifts are precomputed, so whole buffers of words are decoded in one call
+        Usage:
+            >>> STATUS = BitLayout('<u2', ready=0, error=1, mode=(4, 2), counter=(15, 8))
+            >>> columns = STATUS.decode(payload)       # {'ready': array([...]), 'mode': array([...]), ...}
+            >>> payload = STATUS.encode(**columns).tobytes()
+            >>> STATUS.unpack(0x0105)                  # {'ready': True, 'error': False, 'mode': 1, 'counter': 1}
+    """
+
+    def __init__(self, dtype: str = '<u2', **fields: Union[int, Tuple[int, int]]):
+        self.dtype: str = dtype
+        self.bits: int = int(dtype.lstrip('<>=|')[1:]) * 8
+        # ▼ (name, shift, mask of field bits after shifting, isFlag)
+        self.fields: Tuple[Tuple[str, int, int, bool], ...] = tuple(self._compile_(name, spec)
+                                                                   for name, spec in fields.items())
+        self.names: Tuple[str, ...] = tuple(fields)
+        used = 0
+        for name, shift, mask, _ in self.fields:
+            if used & mask << shift: raise ValueError(f"Field '{name}' overlaps with other fields")
+            used |= mask << shift
+
+    def _compile_(self, name: str, spec) -> Tuple[str, int, int, bool]:
+        if isinstance(spec, int): frombit, tobit, isFlag = spec, spec, True
+        else: (frombit, tobit), isFlag = spec, False
+        if not 0 <= tobit <= frombit < self.bits:
+            raise ValueError(f"Field '{name}' bits [{frombit}..{tobit}] do not fit into {self.bits}-bit word")
+        return name, tobit, _mask(frombit - tobit), isFlag
+
+    def __repr__(self):
+        fields = ', '.join(f"{name}={shift + mask.bit_length() - 1}..{shift}" if not isFlag else f"{name}={shift}"
+                           for name, shift, mask, isFlag in self.fields)
+        return f"{self.__class__.__name__}({self.dtype}: {fields})"
+
+    def decode(self, buffer) -> Dict[str, Iterable]:
+        """ Decode every word of `buffer` (raw bytes or array of words) into {field name: column of values} """
+
+        values = words(buffer, self.dtype) if isinstance(buffer, (bytes, bytearray)) else _array(buffer)
+        if numpy is not None:
+            return {name: (values >> shift & mask).astype(bool) if isFlag else values >> shift & mask
+                    for name, shift, mask, isFlag in self.fields}
+        return {name: [bool(value >> shift & mask) if isFlag else value >> shift & mask for value in values]
+                for name, shift, mask, isFlag in self.fields}
+
+    def encode(self, **columns):
+        """ Pack columns of field values into array of words, missing fields are set to 0
+            Values are truncated to field width
+        """
+
+        unknown = columns.keys() - self.names
+        if unknown: raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+        size = max(map(len, columns.values()), default=0)
+        if numpy is not None:
+            result = numpy.zeros(size, dtype=self.dtype)
+            for name, shift, mask, isFlag in self.fields:
+                if name not in columns: continue
+                result |= (numpy.asarray(columns[name]).astype(self.dtype) & mask) << shift
+            return result
+        return [self.pack(**{name: column[i] for name, column in columns.items()}) for i in range(size)]
+
+    def unpack(self, word: int) -> Dict[str, Union[int, bool]]:
+        """ Decode single word into {field name: value} """
+        return {name: bool(word >> shift & mask) if isFlag else word >> shift & mask
+                for name, shift, mask, isFlag in self.fields}
+
+    def pack(self, **values: Union[int, bool]) -> int:
+        """ Encode field values into single word, missing fields are set to 0 """
+        word = 0
+        for name, shift, mask, _ in self.fields:
+            if name in values: word |= (int(values[name]) & mask) << shift
+        return word
+
+
+if __name__ == '__main__':
+    import random
+    from array import array
+    from timeit import timeit
+    from Utils import bits
+
+    def test_same_semantics():
+        data = [random.getrandbits(16) for _ in range(1000)] + [0, 0xFFFF]
+        for frombit, tobit in ((None, 0), (None, 3), (0, 0), (7, 4), (15, 0), (3, 3)):
+            assert list(extract(array('H', data), frombit, tobit)) == \
+                   [bits.extract(value, frombit, tobit) for value in data], (frombit, tobit)
+        assert list(set(data, (0, 5))) == [bits.set((0, 5), value) for value in data]
+        assert list(clear(data, (0, 15))) == [bits.clear(value, (0, 15)) for value in data]
+        assert list(flag(data, 9)) == [bits.flag(value, 9) for value in data]
+        matrix = flags(data, 16)
+        assert [tuple(row) for row in matrix] == [bits.flags(value, 16) for value in data]
+        assert list(bitsarray(matrix)) == data
+        print("Same semantics: OK")
+
+    def benchmark():
+        layout = BitLayout('<u2', ready=0, error=1, mode=(4, 2), counter=(15, 8))
+        buffer = bytes(random.getrandbits(8) for _ in range(2 * 10_000))
+        values = words(buffer)
+        print(f"{'10k words':<24} {'batched':>12} {'per-word':>12}  (ms)")
+        cases = {
+            'extract [7..4]': (lambda: extract(values, 7, 4),
+                               lambda: [bits.extract(int(value), 7, 4) for value in values]),
+            'flags x16': (lambda: flags(values, 16),
+                          lambda: [bits.flags(int(value), 16) for value in values]),
+            'layout decode': (lambda: layout.decode(buffer),
+                              lambda: [layout.unpack(int(value)) for value in values]),
+        }
+        for name, (batched, single) in cases.items():
+            print(f"{name:<24} {timeit(batched, number=10) * 100:>12.3f} {timeit(single, number=1) * 1000:>12.3f}")
+
+    test_same_semantics()
+    benchmark()
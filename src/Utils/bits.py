@@ -1,5 +1,4 @@
 from functools import reduce
-from math import log2
 
 
 __all__ = 'set', 'clear', 'combine', 'extract', 'flag', 'flags', 'bitsarray'
@@ -73,8 +72,8 @@ def extract(val, frombit=None, tobit=0):
     """
 
     if (val == 0): return 0
-    # set 'frombit' to leftmost meaningful bit if undefined
-    if (not frombit): frombit = int(log2(val))+1
+    # no upper limit if 'frombit' is undefined
+    if (not frombit): return val >> tobit
     return (val & ((1<<frombit+1) - 1)) >> tobit
 
 
@@ -0,0 +1,119 @@
+import struct
+import sys
+from collections import namedtuple
+from typing import Iterator, Sequence, Tuple, Union
+
+from .bitarrays import BitLayout, _structFormat
+
+__all__ = 'BitStruct',
+
+
+def _endianness(order: str) -> str:
+    """ Return 'little' or 'big' for struct/NumPy byte order character """
+    if order in '<>!': return 'little' if order == '<' else 'big'
+    return sys.byteorder  # '=', '@' - native
+
+
+class BitStruct:
+    """ Declarative binary record codec: struct fields, optionally split into bit fields
+        Each field is defined as (name, format):
+            format - struct format code of a single item ('B', 'H', '2s', ...)
+                     or BitLayout describing bit fields of an integer item
+                     (bit fields become record fields instead of the item itself)
+            Byte order of BitLayout dtype ('>u2', ...) should match `byteorder` of the struct, if specified
+        Layout is compiled once into struct.Struct and generated pack/unpack functions
+            with masks and shifts inlined, so no per-field Python logic runs on (de)coding
+        Records are decoded into namedtuple (.Record), bit fields follow Utils.bits.extract() semantics
+        Usage:
+            >>> HEADER = BitStruct('Header', (('start', 'B'), ('address', 'B'),
+            >>>                               ('length', BitLayout('<u2', words=(11, 0), even=15))), '<')
+            >>> header = HEADER.unpack_from(packet)     # Header(start=90, address=0, words=3, even=True)
+            >>> HEADER.pack_into(buffer, 0, 0x5A, 12, words=3, even=True)
+            >>> for record in HEADER.iter_unpack(dump): ...
+    """
+
+    def __init__(self, name: str, fields: Sequence[Tuple[str, Union[str, BitLayout]]], byteorder: str = '<'):
+        self.name = name
+        self.fields = tuple(fields)
+        codes = []
+        names = []
+        decoders = []  # expression decoding each record field from raw item variables
+        encoders = []  # expression encoding each raw item from record field variables
+        for index, (fieldName, spec) in enumerate(self.fields):
+            raw = f'_{index}'
+            if isinstance(spec, BitLayout):
+                itemFormat = _structFormat(spec.dtype)
+                if spec.dtype[0] in '<>=' and struct.calcsize(itemFormat) > 1 and \
+                        _endianness(spec.dtype[0]) != _endianness(byteorder):
+                    raise ValueError(f"Byte order of field '{fieldName}' layout ({spec.dtype}) "
+                                     f"conflicts with '{byteorder}' byte order of {name}")
+                codes.append(itemFormat[1:])
+                terms = []
+                for bitName, shift, mask, isFlag in spec.fields:
+                    names.append(bitName)
+                    value = f'{raw} >> {shift} & {mask:#x}' if shift else f'{raw} & {mask:#x}'
+                    decoders.append(f'bool({value})' if isFlag else value)
+                    term = f'(int({bitName}) & {mask:#x})'
+                    terms.append(f'{term} << {shift}' if shift else term)
+                encoders.append(' | '.join(terms) or '0')
+            else:
+                codes.append(spec)
+                names.append(fieldName)
+                decoders.append(raw)
+                encoders.append(fieldName)
+
+        for fieldName in names:
+            if not fieldName.isidentifier() or fieldName.startswith('_') or fieldName in ('buffer', 'offset'):
+                raise ValueError(f"Invalid field name '{fieldName}'")
+        if len(set(names)) != len(names): raise ValueError(f"Duplicate field names in {name}")
+
+        self.struct = struct.Struct(byteorder + ''.join(codes))
+        self.size: int = self.struct.size
+        self.Record = namedtuple(name, names)
+        self.names: Tuple[str, ...] = tuple(names)
+
+        defaults = ', '.join(f"{name}={b'' if self._isBytes_(name) else 0!r}" for name in names)
+        items = ', '.join(f'_{i}' for i in range(len(codes)))
+        template = (
+            f"def unpack_from(buffer, offset=0):\n"
+            f"    {items}, = _unpack_from(buffer, offset)\n"
+            f"    return _Record({', '.join(decoders)})\n"
+            f"def unpack_items({items}):\n"
+            f"    return _Record({', '.join(decoders)})\n"
+            f"def pack({defaults}):\n"
+            f"    return _pack({', '.join(encoders)})\n"
+            f"def pack_into(buffer, offset, {defaults}):\n"
+            f"    _pack_into(buffer, offset, {', '.join(encoders)})\n"
+        )
+        namespace = dict(_unpack_from=self.struct.unpack_from, _pack=self.struct.pack,
+                         _pack_into=self.struct.pack_into, _Record=self.Record)
+        exec(compile(template, f'<{name} BitStruct codec>', 'exec'), namespace)
+        self.source: str = template
+        self.unpack_from = namespace['unpack_from']
+        self._unpackItems_ = namespace['unpack_items']
+        self.pack = namespace['pack']
+        self.pack_into = namespace['pack_into']
+
+    def _isBytes_(self, name: str) -> bool:
+        for fieldName, spec in self.fields:
+            if fieldName == name and isinstance(spec, str): return spec.endswith(('s', 'p'))
+        return False
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}({self.name}: '{self.struct.format}' → {', '.join(self.names)})"
+
+    def unpack(self, buffer):
+        """ Decode record from buffer of exactly .size bytes """
+        if len(buffer) != self.size:
+            raise struct.error(f"{self.name} requires a buffer of {self.size} bytes, got {len(buffer)}")
+        return self.unpack_from(buffer)
+
+    def iter_unpack(self, buffer) -> Iterator[tuple]:
+        """ Decode consecutive records filling the whole buffer """
+        unpackItems = self._unpackItems_
+        return (unpackItems(*items) for items in self.struct.iter_unpack(buffer))
+
+    def encode(self, record) -> bytes:
+        """ Encode record (namedtuple or any object with record field attrs) """
+        if isinstance(record, tuple): return self.pack(*record)
+        return self.pack(**{name: getattr(record, name) for name in self.names})
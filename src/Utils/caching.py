@@ -0,0 +1,341 @@
+from collections import OrderedDict, namedtuple
+from functools import wraps
+from heapq import heapify, heappop, heappush, heapreplace
+from itertools import count
+from threading import Lock, RLock
+from time import monotonic
+from weakref import ref
+
+__all__ = 'memo', 'memoLastPosArgs', 'cachedproperty', 'CacheInfo'
+
+
+CacheInfo = namedtuple('CacheInfo', 'hits misses evictions expired maxsize currsize')
+
+_MISS = object()
+_KWARGS = object()  # separates positional and keyword args in cache key
+
+
+class _Cache:
+    """ Bounded mapping {args key: result} with LRU or LFU eviction and optional TTL
+        Lookups (.get) do not take the lock - they rely on atomicity of OrderedDict C methods under the GIL,
+            so concurrent hits never block each other. Insertions and evictions are serialized by the lock
+        Hit/miss counters are updated without locking and are approximate under heavy concurrency
+        LFU victim is found with a lazily updated heap of (uses, order, key), so hits only increment use counters
+            and eviction is amortized O(log maxsize) (see ._leastUsed_())
+    """
+
+    __slots__ = ('data', 'uses', 'heap', 'order', 'maxsize', 'ttl', 'lfu', 'lock',
+                 'hits', 'misses', 'evictions', 'expired')
+
+    def __init__(self, maxsize, ttl, lfu):
+        self.data = OrderedDict()  # key -> result, or (result, expiration time) if ttl is set
+        self.uses = {} if lfu else None  # key -> number of hits (LFU only)
+        self.heap = [] if lfu else None  # (uses, order, key), uses may be outdated (LFU only)
+        self.order = count()
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.lfu = lfu
+        self.lock = Lock()
+        self.hits = self.misses = self.evictions = self.expired = 0
+
+    def get(self, key):
+        entry = self.data.get(key, _MISS)
+        if entry is _MISS:
+            self.misses += 1
+            return _MISS
+        if self.ttl is not None:
+            result, expires = entry
+            if monotonic() >= expires:
+                self.expired += 1
+                self.misses += 1
+                self.data.pop(key, None)
+                if self.lfu: self.uses.pop(key, None)
+                return _MISS
+        else:
+            result = entry
+        try:
+            if self.lfu: self.uses[key] += 1
+            elif self.maxsize is not None: self.data.move_to_end(key)
+        except KeyError: pass  # entry has just been evicted by other thread
+        self.hits += 1
+        return result
+
+    def put(self, key, result):
+        entry = result if self.ttl is None else (result, monotonic() + self.ttl)
+        with self.lock:
+            data = self.data
+            if key not in data and self.maxsize is not None:
+                while len(data) >= self.maxsize and data:
+                    if self.lfu:
+                        victim = self._leastUsed_()
+                        data.pop(victim, None)
+                        self.uses.pop(victim, None)
+                    else:
+                        victim, _ = data.popitem(last=False)
+                    self.evictions += 1
+            data[key] = entry
+            if self.lfu and key not in self.uses:
+                self.uses[key] = 0
+                heappush(self.heap, (0, next(self.order), key))
+                # ▼ Drop entries of removed keys piling up in the heap
+                if len(self.heap) > 2 * len(data) + 16: self._rebuildHeap_()
+
+    def _leastUsed_(self):
+        """ Return key of least frequently used entry, called under the lock
+            Heap entry whose use count is outdated is pushed back with actual count, so every hit
+                causes at most one extra heap operation, and the entry on top with actual count is the minimum
+                (counts only grow, so no other key can be used less)
+        """
+        heap, uses = self.heap, self.uses
+        while True:
+            used, _, key = heap[0]
+            actual = uses.get(key)
+            if actual is None: heappop(heap)  # entry of removed key
+            elif actual != used: heapreplace(heap, (actual, next(self.order), key))
+            else:
+                heappop(heap)
+                return key
+
+    def _rebuildHeap_(self):
+        self.heap = [(used, next(self.order), key) for key, used in self.uses.items()]
+        heapify(self.heap)
+
+    def pop(self, key):
+        with self.lock:
+            self.data.pop(key, None)
+            if self.lfu: self.uses.pop(key, None)
+
+    def clear(self):
+        with self.lock:
+            self.data.clear()
+            if self.lfu:
+                self.uses.clear()
+                self.heap.clear()
+
+
+def _isMethod(f) -> bool:
+    code = f.__code__
+    return code.co_argcount > 0 and code.co_varnames[0] == 'self'
+
+
+def memo(f=None, *, maxsize: int = None, ttl: float = None, policy: str = 'LRU', method: bool = None):
+    """ Cache no-side-effect function/method output
+        Function arguments must be hashable
+        May be used bare (@memo - unbounded cache, same as before) or with options:
+            maxsize - max number of cached results, least recently (LRU) or least frequently (LFU)
+                      used result is evicted when the cache is full. None means no limit
+            ttl - seconds after which cached result expires. None means results never expire
+            policy - 'LRU' or 'LFU' eviction policy
+            method - cache results per instance, excluding 'self' from the key.
+                     Detected automatically if first function argument is named 'self'
+        Method results are kept in per-instance caches held by weak references,
+            so they are freed together with the instance. Instances that do not support
+            weak references share one cache with the instance included in the key
+        Wrapper provides:
+            .cache_info() - CacheInfo with hits, misses, evictions, expired, maxsize and currsize
+                            (summed over all instances for methods)
+            .cache_clear(instance=None) - drop all cached results (of given instance only, if provided)
+            .invalidate(*args, **kwargs) - drop cached result for given arguments
+                                           (including instance as first argument for methods)
+    """
+
+    if f is None:
+        return lambda function: memo(function, maxsize=maxsize, ttl=ttl, policy=policy, method=method)
+    if policy.upper() not in ('LRU', 'LFU'): raise ValueError(f"Unknown cache eviction policy '{policy}'")
+    if maxsize is not None and maxsize < 1: raise ValueError("Cache size should be positive")
+    lfu = policy.upper() == 'LFU'
+    if method is None: method = _isMethod(f)
+
+    def key(args, kwargs):
+        if not kwargs: return args
+        return args + (_KWARGS,) + tuple(sorted(kwargs.items()))
+
+    if not method:
+        cache = _Cache(maxsize, ttl, lfu)
+
+        @wraps(f)
+        def memo_wrapper(*args, **kwargs):
+            k = key(args, kwargs)
+            result = cache.get(k)
+            if result is _MISS:
+                result = f(*args, **kwargs)
+                cache.put(k, result)
+            return result
+
+        def caches(): return (cache,)
+
+        memo_wrapper.invalidate = lambda *args, **kwargs: cache.pop(key(args, kwargs))
+        memo_wrapper.cache_clear = lambda instance=None: cache.clear()
+
+    else:
+        # ▼ {id(instance): (weak reference to instance, its cache)}, entries are removed when instances die
+        #   Lookup by id avoids creating weak references on every call
+        instanceCaches = {}
+        sharedCache = _Cache(maxsize, ttl, lfu)  # for instances that cannot be weakly referenced
+        lock = Lock()
+
+        def cacheFor(instance) -> _Cache:
+            entry = instanceCaches.get(id(instance))
+            if entry is not None and entry[0]() is instance: return entry[1]
+            with lock:
+                entry = instanceCaches.get(id(instance))
+                if entry is not None and entry[0]() is instance: return entry[1]
+                identity = id(instance)
+                try: reference = ref(instance, lambda _: instanceCaches.pop(identity, None))
+                except TypeError: return None
+                cache = _Cache(maxsize, ttl, lfu)
+                instanceCaches[identity] = reference, cache
+                return cache
+
+        @wraps(f)
+        def memo_wrapper(self, *args, **kwargs):
+            cache = cacheFor(self)
+            k = key(args, kwargs)
+            if cache is None: cache, k = sharedCache, (self,) + k
+            result = cache.get(k)
+            if result is _MISS:
+                result = f(self, *args, **kwargs)
+                cache.put(k, result)
+            return result
+
+        def caches(): return (sharedCache, *(cache for _, cache in tuple(instanceCaches.values())))
+
+        def invalidate(self, *args, **kwargs):
+            cache = cacheFor(self)
+            if cache is None: sharedCache.pop((self,) + key(args, kwargs))
+            else: cache.pop(key(args, kwargs))
+
+        def cache_clear(instance=None):
+            if instance is None:
+                with lock: instanceCaches.clear()
+                sharedCache.clear()
+                return
+            cache = cacheFor(instance)
+            if cache is not None: cache.clear()
+            else:
+                with sharedCache.lock:
+                    for k in [k for k in sharedCache.data if k[0] is instance]: del sharedCache.data[k]
+
+        memo_wrapper.invalidate = invalidate
+        memo_wrapper.cache_clear = cache_clear
+
+    def cache_info() -> CacheInfo:
+        current = caches()
+        names = 'hits', 'misses', 'evictions', 'expired'
+        counters = (sum(getattr(cache, name) for cache in current) for name in names)
+        return CacheInfo(*counters, maxsize, sum(len(cache.data) for cache in current))
+
+    memo_wrapper.cache_info = cache_info
+    return memo_wrapper
+
+
+def _sameArgs(args: tuple, cachedArgs: tuple) -> bool:
+    """ Compare arguments by identity or equality
+        Arguments with ambiguous equality (like numpy arrays) are considered same only if identical
+    """
+    if len(args) != len(cachedArgs): return False
+    for arg, cachedArg in zip(args, cachedArgs):
+        if arg is cachedArg: continue
+        try:
+            if not arg == cachedArg: return False
+        except (ValueError, TypeError): return False
+    return True
+
+
+def memoLastPosArgs(f):
+    """ Cache single last no-side-effect function/method output
+        Function should accept positional arguments only
+        Arguments are compared with the last ones by equality, so they need not be hashable
+            (lists, dicts, numpy arrays - these are compared by identity)
+        Methods keep their last result per instance """
+
+    if not _isMethod(f):
+        last = [None]  # (args, result) of last call
+
+        @wraps(f)
+        def memoLastPosArgs_wrapper(*args):
+            entry = last[0]
+            if entry is not None and _sameArgs(args, entry[0]): return entry[1]
+            result = f(*args)
+            last[0] = args, result
+            return result
+
+        return memoLastPosArgs_wrapper
+
+    # ▼ {id(instance): (weak reference to instance, args, result)} of last calls, removed when instances die
+    lastCalls = {}
+    shared = [None]  # (instance, args, result) of last call on instance that cannot be weakly referenced
+
+    @wraps(f)
+    def memoLastPosArgs_wrapper(self, *args):
+        identity = id(self)
+        entry = lastCalls.get(identity)
+        if entry is not None and entry[0]() is self:
+            if _sameArgs(args, entry[1]): return entry[2]
+            reference = entry[0]
+        else:
+            entry = shared[0]
+            if entry is not None and entry[0] is self and _sameArgs(args, entry[1]): return entry[2]
+            try: reference = ref(self, lambda _: lastCalls.pop(identity, None))
+            except TypeError: reference = None
+        result = f(self, *args)
+        if reference is None: shared[0] = self, args, result
+        else: lastCalls[identity] = reference, args, result
+        return result
+
+    return memoLastPosArgs_wrapper
+
+
+class cachedproperty:
+    """ Decorator implementing lazily computed per-instance attribute
+        Decorated method is called once on first attribute access, its result is stored in the instance
+            under the same name, so subsequent reads are plain attribute reads with no Python-level calls
+            (this is a non-data descriptor, so instance attribute shadows it)
+        Classes with __slots__ should be decorated with Utils.add_slots - it replaces cached properties
+            with dedicated same-name slots and computes them from __getattr__ when slot is not yet set
+        First computation is serialized per property, so value is computed exactly once
+            even if accessed from several threads simultaneously
+        Invalidate with `del obj.name` or cachedproperty.invalidate(obj, *names) -
+            value will be recomputed on next access
+    """
+
+    def __init__(self, function):
+        self.function = function
+        self.name = function.__name__
+        self.lock = RLock()
+        self.__doc__ = function.__doc__
+
+    def __set_name__(self, owner, name):
+        self.name = name
+
+    def __get__(self, instance, owner=None):
+        if instance is None: return self
+        try: namespace = instance.__dict__
+        except AttributeError:
+            raise TypeError(f"Cannot cache '{self.name}' attribute - '{type(instance).__name__}' "
+                            f"instances have no __dict__ (decorate the class with add_slots)") from None
+        with self.lock:
+            # ▼ Value might have been computed by other thread while waiting for the lock
+            value = namespace.get(self.name, _MISS)
+            if value is _MISS: value = namespace[self.name] = self.function(instance)
+        return value
+
+    def compute(self, instance):
+        """ Compute and store value into same-name slot of `instance` (used by add_slots classes) """
+        with self.lock:
+            try: return object.__getattribute__(instance, self.name)
+            except AttributeError: pass
+            value = self.function(instance)
+            object.__setattr__(instance, self.name, value)
+            return value
+
+    @staticmethod
+    def invalidate(instance, *names: str):
+        """ Drop cached values of given properties of `instance` (all cached properties if no names provided) """
+        if not names:
+            names = {name for cls in type(instance).__mro__ for name in getattr(cls, '__cachedproperties__', ())}
+            names.update(name for cls in type(instance).__mro__ for name, attr in vars(cls).items()
+                         if isinstance(attr, cachedproperty))
+        for name in names:
+            try: delattr(instance, name)
+            except AttributeError: pass  # not computed yet
@@ -1,12 +1,20 @@
 from __future__ import annotations
 
+import marshal
+import re
+from collections import deque
 from copy import deepcopy
-from os import linesep, makedirs, listdir
+from hashlib import blake2b
+from io import StringIO
+from logging import DEBUG
+from os import linesep, makedirs, listdir, replace, fsync, fstat, remove
 from os.path import join as joinpath, basename, isdir, expandvars as envar, isfile
-from shutil import copyfile
-from typing import Dict, Type, Set
+from shutil import copy2, copyfile
+from threading import RLock
+from typing import Callable, Dict, List, Optional, Type, Set, Tuple
 
 from .colored_logger import Logger
+from .configwatcher import ConfigWatcher
 from .utils import formatDict, formatList, isiterable, classproperty
 from ruamel.yaml import YAML, YAMLError
 
@@ -18,8 +26,110 @@ log.setLevel("DEBUG")
 CONFIG_CLASSES: Set[Type[ConfigLoader]] = set()
 CONFIGS_DICT: Dict[str, dict] = {}
 
+# ▼ {section name: (section dict from CONFIGS_DICT, its YAML text)}, so only changed sections are re-dumped on save
+SECTION_TEXTS: Dict[str, Tuple[dict, str]] = {}
 
-class ConfigLoader:
+# ▼ Parsed config cache format version, cache files of other versions are ignored
+CACHE_VERSION = (1, marshal.version)
+
+# ▼ {section name: its YAML text} of sections read from config file, but not parsed yet (see ConfigLoader.LAZY_LOAD)
+PENDING_SECTIONS: Dict[str, str] = {}
+
+# ▼ Section names in order of config file, so saving lazily loaded config does not reorder sections
+SECTION_ORDER: List[str] = []
+
+# ▼ {section name: its YAML text} as of last save/reload of watched config file, so reload parses only edited sections
+FILE_SECTIONS: Dict[str, str] = {}
+
+# ▼ Serializes lazy sections materialization and application of reloaded sections
+LOCK = RLock()
+
+# ▼ Top-level key of block-style YAML mapping, which is sure to be parsed to the same string
+SECTION_KEY = re.compile(r'([A-Za-z_][\w.-]*)[ \t]*:(?:[ \t]|\r?\n|$)')
+YAML_ANCHOR = re.compile(r'(?:^|[\s\[{,:-])&[^\s]')
+
+
+def _indexSections_(text: str) -> Optional[Dict[str, str]]:
+    """ Split YAML mapping of config sections into {section name: section YAML text} without parsing it
+        Return None if text cannot be split safely (flow style, anchors, complex or non-string keys, ...),
+            so it should be parsed as a whole
+    """
+    if YAML_ANCHOR.search(text): return None
+    index = {}
+    name, start = None, 0
+    position = 0
+    for line in text.splitlines(keepends=True):
+        if line[:1] not in ('', ' ', '\t', '\r', '\n', '#'):
+            match = SECTION_KEY.match(line)
+            if not match or line.startswith(('---', '...')): return None
+            key = match.group(1)
+            if key.lower() in ('true', 'false', 'null', 'yes', 'no', 'on', 'off', 'y', 'n') or key in index:
+                return None
+            if name is not None: index[name] = text[start:position]
+            name, start = key, position
+        position += len(line)
+    if name is not None:
+        # ▼ Sections are written back as is, so the last one should not glue to the section saved after it
+        index[name] = text[start:] if text.endswith('\n') else text[start:] + '\n'
+    return index
+
+
+IMMUTABLE_TYPES = (int, float, str, bytes, bool, type(None))
+SCALAR_TYPES = frozenset(IMMUTABLE_TYPES)
+
+
+def _isImmutable(value) -> bool:
+    """ Return True if `value` cannot be changed in-place (so assignment tracking is enough to detect changes) """
+    if type(value) in SCALAR_TYPES or isinstance(value, IMMUTABLE_TYPES): return True
+    return type(value) is tuple and all(_isImmutable(item) for item in value)
+
+
+def _detach(value):
+    """ Return copy of config value sharing no mutable objects with `value`
+        Flat containers of scalars (numeric tables, ...) are copied shallowly, which is much faster than deepcopy()
+    """
+    if _isImmutable(value): return value
+    valueType = type(value)
+    if valueType in (list, set) and all(type(item) in SCALAR_TYPES for item in value): return valueType(value)
+    if valueType is dict and all(type(item) in SCALAR_TYPES for item in value.values()): return dict(value)
+    return deepcopy(value)
+
+
+def _snapshot(members) -> dict:
+    """ Return copy of config params detached from class attrs """
+    return {name: _detach(value) for name, value in members}
+
+
+class ConfigLoaderType(type):
+    """ Metaclass tracking assignments to config params
+        Assigning or deleting UPPERCASE class attr marks config section as dirty,
+            so unchanged sections are detected without comparing every param
+        Lazily loaded sections (see ConfigLoader.LAZY_LOAD) are materialized on first access to any param
+    """
+
+    def __getattr__(cls, name):
+        # ▼ Called only for missing attrs, so materialized sections are accessed with no overhead
+        #   Lookup may have missed the param while other thread was materializing the section,
+        #   so wait for materialization (if any) under LOCK and look the param up again
+        if name.isupper():
+            cls._materialize_()
+            return type.__getattribute__(cls, name)
+        raise AttributeError(f"type object '{cls.__name__}' has no attribute '{name}'")
+
+    def __setattr__(cls, name, value):
+        if name.isupper():
+            if cls.__dict__.get('_pending_'): cls._materialize_()
+            type.__setattr__(cls, '_dirty_', True)
+        type.__setattr__(cls, name, value)
+
+    def __delattr__(cls, name):
+        if name.isupper():
+            if cls.__dict__.get('_pending_'): cls._materialize_()
+            type.__setattr__(cls, '_dirty_', True)
+        type.__delattr__(cls, name)
+
+
+class ConfigLoader(metaclass=ConfigLoaderType):
     """ Usage: class CONFIG(ConfigLoader, section='NAME')
         When subclassed, stores all UPPERCASE (of which isupper() returns True)
         class attrs as dict of categories with config parameters
@@ -39,6 +149,15 @@ class ConfigLoader:
     # ▼ Config file will be created automatically in case no one was found on specified path
     AUTO_CREATE_CONFIG_FILE = True
 
+    # ▼ Keep parsed config in binary cache file next to config file ('config.yaml.cache'),
+    #   so YAML is parsed only after the config file has been changed
+    CACHE_PARSED_CONFIG = False
+
+    # ▼ Parse and apply config section only on first access to any of class config params after .load()
+    #   Config file is split into sections without parsing, sections never accessed are saved back as is
+    #   Valid parsed config cache (if enabled) is used instead, as it provides all sections at once
+    LAZY_LOAD = False
+
     filename: str = 'config.yaml'
     path: str = None
 
@@ -50,10 +169,16 @@ class ConfigLoader:
 
     # Initialized in successors:
     _ignoreUpdates_: bool
+    _dirty_: bool  # True if params may differ from CONFIGS_DICT section due to assignments
+    _pending_: bool = False  # True if section application is deferred until first param access
+    _stash_: Dict[str, object]  # params of pending section, removed from class to intercept access to them
+    _callbacks_: List[Callable[[Dict[str, object]], None]]  # called with changed params on reload
     __section__: str
 
     def __init_subclass__(cls, *, section):
         cls._ignoreUpdates_ = False
+        cls._dirty_ = True
+        cls._callbacks_ = []
         cls.__section__: str = section
         CONFIG_CLASSES.add(cls)
 
@@ -87,7 +212,7 @@ class ConfigLoader:
 
         log.info(f"Fetching config for '{cls.__section__}'...")
 
-        if force or not CONFIGS_DICT:
+        if force or not CONFIGS_DICT and not PENDING_SECTIONS:
             # Empty CONFIGS_DICT => .load() is called for the first time => load config from file
             log.debug(f"Config path: {cls.path}")
             path = joinpath(cls.path, cls.filename)
@@ -96,14 +221,60 @@ class ConfigLoader:
                     cls._addCurrentSection_()
                     return cls._useDefaultConfig_()
 
+        if cls.LAZY_LOAD: return cls._defer_()
+        params = dict(cls.members())
+        loaded = cls._applySection_(params)
+        if loaded is None: return cls._useDefaultConfig_()
+        for name, value in loaded.items(): setattr(cls, name, value)
+        # ▼ Params not found in file keep defaults, which are not stored in CONFIGS_DICT yet
+        cls._dirty_ = len(loaded) != len(params)
+
+    @classmethod
+    def _defer_(cls):
+        """ Remove config params from class, so first access to any of them applies config section """
+        with LOCK:
+            if cls._pending_: return
+            cls._stash_ = dict(cls.members())
+            for name in cls._stash_: type.__delattr__(cls, name)
+            cls._pending_ = True
+        log.debug(f"Config '{cls.__section__}' will be loaded on first access")
+
+    @classmethod
+    def _materialize_(cls):
+        """ Apply config section to params removed by ._defer_() and put them back to class
+            Params are put back with final values only, so concurrent readers never observe defaults:
+                param found in class dict already has its final value, param not found yet
+                makes reader wait for LOCK in ConfigLoaderType.__getattr__()
+            ._pending_ is reset only after all params are put back
+        """
+        with LOCK:
+            if not cls._pending_: return
+            params = cls._stash_
+            loaded = cls._applySection_(params)
+            if loaded is None: cls._useDefaultConfig_()
+            else: params.update(loaded)
+            for name, value in params.items(): type.__setattr__(cls, name, value)
+            type.__setattr__(cls, '_dirty_', loaded is not None and len(loaded) != len(params))
+            cls._pending_ = False
+            del cls._stash_
+
+    @classmethod
+    def _applySection_(cls, params: Dict[str, object]) -> Optional[Dict[str, object]]:
+        """ Cast config section params to types of `params` values
+            Return {name: value} of params loaded from config section, None if there is no such section
+        """
+
         try: sectionDict = CONFIGS_DICT[cls.__section__]
         except KeyError:
-            log.warning(f"Cannot find section '{cls.__section__}' in config file. Creating new one with defaults.")
-            cls._addCurrentSection_()
-            return cls._useDefaultConfig_()
-
-        loadedParams = []
-        for parName, currPar in cls.members():
+            sectionDict = cls._parsePendingSection_(cls.__section__)
+            if sectionDict is None:
+                log.warning(f"Cannot find section '{cls.__section__}' in config file. "
+                            f"Creating new one with defaults.")
+                cls._addCurrentSection_(params)
+                return None
+
+        loaded = {}
+        for parName, currPar in params.items():
             try: newPar = sectionDict[parName]
             except KeyError:
                 log.error(f"Parameter '{parName}': not found in {cls.filename}")
@@ -115,33 +286,38 @@ class ConfigLoader:
                         log.error(f"Parameter '{parName}': cannot convert '{newPar}' "
                                   f"to type '{type(currPar).__name__}' — {e}")
                         continue
-                if hasattr(newPar, 'copy'): setattr(cls, parName, deepcopy(newPar))
-                else: setattr(cls, parName, newPar)
-                loadedParams.append(parName)
+                loaded[parName] = _detach(newPar)
                 sectionDict[parName] = newPar
-        extraParams = sectionDict.keys() - loadedParams
+        extraParams = sectionDict.keys() - loaded.keys()
         if len(extraParams) > 0:
             log.warning(f"Unexpected parameters found in configuration file: {', '.join(extraParams)}")
             for par in extraParams: del sectionDict[par]
+        SECTION_TEXTS.pop(cls.__section__, None)
 
-        if len(loadedParams) > 0: log.info(f"Config '{cls.__section__}' loaded, {len(loadedParams)} items")
+        if len(loaded) > 0: log.info(f"Config '{cls.__section__}' loaded, {len(loaded)} items")
         else: log.warning(f"Nothing was loaded for '{cls.__section__}' "
                           f"from {cls.filename} (wrong section name specified?)")
 
-        log.debug(f"{cls.__name__}: {formatDict(dict(cls.members()))}")
+        if log.isEnabledFor(DEBUG): log.debug(f"{cls.__name__}: {formatDict({**params, **loaded})}")
+        return loaded
 
     @classproperty
     def updated(cls):
         """ Returns True if actual config has been changed, False otherwise, None if configured to ignore updates
             May be used to save current class config only: CFG.save(CFG.update())
+            Params are compared only if some of them were assigned since last load/save,
+                otherwise only mutable ones (lists, dicts, ...) are checked for in-place changes
             CONSIDER: Type casting and comparisons are shallow, so (True, 2, 3.0) == (1,2,3) is accepted
         """
 
         if cls._ignoreUpdates_ is True:
             log.info(f"Section '{cls.__section__}': updates ignored by request")
             return None
-        try: return CONFIGS_DICT[cls.__section__] != dict(cls.members())
+        if cls._pending_: return False  # no param has been accessed since loading
+        try: stored = CONFIGS_DICT[cls.__section__]
         except KeyError: return True
+        if cls._dirty_: return stored != dict(cls.members())
+        return any(not _isImmutable(value) and stored.get(name, stored) != value for name, value in cls.members())
 
     @classmethod
     def save(cls, force: bool = None) -> bool:
@@ -178,33 +354,152 @@ class ConfigLoader:
             updatedConfigs = CONFIG_CLASSES
             log.debug(f"Force saving config for sections {', '.join(sections)}")
 
-        newConfigsDict = {cfgCls.__section__: dict(cfgCls.members()) for cfgCls in updatedConfigs}
-        global CONFIGS_DICT
-        CONFIGS_DICT.update({key: deepcopy(cfg) for key, cfg in newConfigsDict.items()})
-
-        if isfile(path): cls.createBackup(path)
+        for cfgCls in updatedConfigs:
+            CONFIGS_DICT[cfgCls.__section__] = _snapshot(cfgCls.members())
+            cfgCls._dirty_ = False
 
         log.debug(f"Saving config to file {cls.filename}...")
         try:
-            with open(path, 'w', encoding='utf-8') as configFile:
-                cls.loader.dump(CONFIGS_DICT, configFile)
+            text = cls._dumpSections_()
+            cls._writeAtomically_(path, text)
         except (OSError, YAMLError) as e:
             log.error(f"Failed to save configuration file:{linesep}{e}")
             return False
         else:
+            with LOCK:
+                if FILE_SECTIONS:
+                    # ▼ Saved sections are known to be applied, so reload triggered by this save parses nothing
+                    FILE_SECTIONS.clear()
+                    FILE_SECTIONS.update(_indexSections_(text) or {})
             log.info(f"Config saved to {cls.filename}")
             return True
 
     @classmethod
-    def createBackup(cls, path) -> bool:
+    def reload(cls) -> Set[str]:
+        """ Re-read config file and apply changed config sections to loaded config classes
+            Only sections edited since last save/reload are parsed (if file can be split into sections)
+            Whole reload is performed under LOCK, so concurrent reloads (ex: manual one and watcher) are serialized
+                and each change is detected exactly once. New values of all changed sections are prepared first
+                and then assigned to class attrs one by one: readers holding LOCK see either old or new values
+                of all sections, but plain attr reads may see a section with only some of its params updated
+            .onChange() callbacks of changed sections are called after LOCK is released
+            Params are replaced with values from file, even if they have been changed in code and not saved yet
+            Return names of sections whose params have changed
+        """
+
+        path = joinpath(cls.path, cls.filename)
+        with LOCK:
+            try:
+                with open(path, encoding='utf-8') as configFile: text = configFile.read()
+            except OSError as e:
+                log.warning(f"Failed to reload config: {e}")
+                return set()
+            index = _indexSections_(text)
+            try:
+                if index is None: configsDict = cls.loader.load(text)
+                else: configsDict = {section: cls.loader.load(sectionText)[section] for section, sectionText
+                                     in index.items() if FILE_SECTIONS.get(section) != sectionText}
+            except (YAMLError, TypeError, KeyError) as e:
+                # ▼ File is likely being written, next change will trigger reload again
+                log.error(f"Failed to parse {cls.filename} on reload:{linesep}{e}")
+                return set()
+            if not isinstance(configsDict, dict):
+                log.error(f"Config loader {cls.loader.__class__.__name__} "
+                          f"returned invalid result type: {configsDict.__class__.__name__}")
+                return set()
+            FILE_SECTIONS.clear()
+            FILE_SECTIONS.update(index or {})
+
+            changes = {}
+            for section, config in configsDict.items():
+                if not isinstance(config, dict) or CONFIGS_DICT.get(section) == config: continue
+                PENDING_SECTIONS.pop(section, None)
+                CONFIGS_DICT[section] = config
+                for configCls in CONFIG_CLASSES:
+                    # ▼ Pending classes will get new section on materialization
+                    if configCls.__section__ != section or configCls._pending_: continue
+                    params = dict(configCls.members())
+                    loaded = configCls._applySection_(params)
+                    changed = {name: value for name, value in loaded.items() if params[name] != value}
+                    configCls._dirty_ = configCls._dirty_ or len(loaded) != len(params)
+                    if changed: changes[configCls] = changed
+            for configCls, changed in changes.items():
+                for name, value in changed.items(): type.__setattr__(configCls, name, value)
+
+        for configCls, changed in changes.items():
+            log.info(f"Config '{configCls.__section__}' reloaded, changed: {', '.join(changed)}")
+            for callback in configCls._callbacks_:
+                try: callback(changed)
+                except Exception as e:
+                    log.error(f"Config '{configCls.__section__}' change callback "
+                              f"{getattr(callback, '__qualname__', callback)} failed: {e}")
+        return {configCls.__section__ for configCls in changes}
+
+    @classmethod
+    def onChange(cls, callback: Callable[[Dict[str, object]], None]):
+        """ Register callback(changed) to be called with {param name: new value} when reload changes
+                any param of this class (see .reload() and .watch()), may be used as decorator
+            Callbacks are called from the thread that performed reload
+        """
+        cls._callbacks_.append(callback)
+        return callback
+
+    @classmethod
+    def watch(cls, *, interval: float = 1.0, debounce: float = 0.2, polling: bool = False) -> ConfigWatcher:
+        """ Start background watcher calling .reload() whenever config file is changed, return started watcher
+            Config file is watched with inotify on Linux, elsewhere (or if `polling` is True)
+                it is checked every `interval` seconds. Reload is performed after file has not been changed
+                for `debounce` seconds, so bursts of writes are parsed once
+            NOTE: Changes made to config file between .load() and .watch() are not detected
+        """
         try:
-            copyfile(path, path + '.bak')
+            with LOCK, open(joinpath(cls.path, cls.filename), encoding='utf-8') as configFile:
+                FILE_SECTIONS.update(_indexSections_(configFile.read()) or {})
         except OSError as e:
-            log.error(f"Failed to create backup config file: {e}")
-            return False
-        else:
-            log.debug(f"Created backup config {cls.filename + '.bak'}")
-            return True
+            log.warning(f"Failed to read config file: {e}")
+        return ConfigWatcher(cls, interval=interval, debounce=debounce, polling=polling).start()
+
+    @classmethod
+    def _dumpSections_(cls) -> str:
+        """ Return YAML text of CONFIGS_DICT and not yet parsed PENDING_SECTIONS, reusing cached text
+                of sections that have not changed
+            Sections read from config file keep their order, new sections are appended
+        """
+        texts = []
+        known = set(SECTION_ORDER)
+        for section in (*SECTION_ORDER, *(section for section in CONFIGS_DICT if section not in known)):
+            config = CONFIGS_DICT.get(section)
+            if config is None:
+                if section in PENDING_SECTIONS: texts.append(PENDING_SECTIONS[section])
+                continue
+            cached = SECTION_TEXTS.get(section)
+            if cached is None or cached[0] is not config:
+                stream = StringIO()
+                cls.loader.dump({section: config}, stream)
+                cached = SECTION_TEXTS[section] = config, stream.getvalue()
+            texts.append(cached[1])
+        return ''.join(texts)
+
+    @classmethod
+    def _writeAtomically_(cls, path, text: str):
+        """ Write config text to temporary file and rename it to `path`, previous file is copied to backup first
+            Config file exists and is complete at any moment (readers and ConfigWatcher never see it missing),
+                even if writing is interrupted
+        """
+        tempPath = path + '.tmp'
+        try:
+            with open(tempPath, 'w', encoding='utf-8') as configFile:
+                configFile.write(text)
+                configFile.flush()
+                fsync(configFile.fileno())
+            if isfile(path):
+                copy2(path, path + '.bak')
+                log.debug(f"Created backup config {cls.filename + '.bak'}")
+            replace(tempPath, path)
+        except OSError:
+            try: remove(tempPath)
+            except OSError: pass
+            raise
 
     @classmethod
     def revert(cls, path=path):
@@ -225,37 +520,44 @@ class ConfigLoader:
     @classmethod
     def params(cls):
         """ Yield all class attr names that are treated as config params """
+        if cls._pending_: cls._materialize_()
         yield from (attrName for attrName in vars(cls).keys() if attrName.isupper())
 
     @classmethod
     def members(cls):
         """ Yield (name, value) pairs from all class config params """
+        if cls._pending_: cls._materialize_()
         yield from ((name, value) for name, value in vars(cls).items() if name.isupper())
         # yield from filter(lambda dictItem: dictItem[0].isupper(), vars(cls).items())
 
     @classmethod
     def _checkInvalidTypes_(cls) -> Set[str]:
-        pending = list(cls.members())
-        done = []
+        """ Return names of config params (or their items, like 'NAME[2]') of types not listed in SUPPORTED_TYPES
+            Containers are traversed breadth-first, each object is checked once (self references are skipped)
+            Scalar items of containers are checked in place, so big numeric tables cost one type lookup per item
+        """
+        supported = cls.SUPPORTED_TYPES
+        scalars = {scalar for scalar in SCALAR_TYPES if scalar in supported}
+        pending = deque(cls.members())
+        done = set()  # ids of objects already checked, all of them are referenced by config params
         invalid = set()
-        while True:
-            try: name, value = pending.pop(0)
-            except IndexError: return invalid
-            # print(f'{name} = {value}')
-            if not isinstance(value, cls.SUPPORTED_TYPES):
-                # print(f'{name}: invalid')
+        while pending:
+            name, value = pending.popleft()
+            if type(value) in scalars: continue
+            if not isinstance(value, supported):
                 invalid.add(name)
-            elif isiterable(value):
-                # print(f'{name}: iterable')
-                if isinstance(value, dict): iterator = value.items()
-                else: iterator = enumerate(value)
-                for i, elem in iterator:
-                    if any(elem is verified for verified in done) or elem is value:
-                        # print(f'{name}[{i}]: dup')
-                        continue
-                    pending.append((f'{name}[{i}]', elem))
-            done.append(value)
-            # print(f'{name}: done')
+            elif isinstance(value, dict):
+                cls._enqueueItems_(pending, name, value, value.items(), scalars, done)
+            elif not isinstance(value, (str, bytes)) and isiterable(value):
+                cls._enqueueItems_(pending, name, value, enumerate(value), scalars, done)
+            done.add(id(value))
+        return invalid
+
+    @staticmethod
+    def _enqueueItems_(pending: deque, name: str, container, items, scalars: set, done: set):
+        for i, elem in items:
+            if type(elem) in scalars or id(elem) in done or elem is container: continue
+            pending.append((f'{name}[{i}]', elem))
 
     @classmethod
     def _useDefaultConfig_(cls):
@@ -272,27 +574,36 @@ class ConfigLoader:
         filetype = 'backup' if backup else 'config'
         log.info(f"Loading {filetype} from {cls.filename}...")
         try:
-            with open(path, encoding='utf-8') as configFile:
-                # ▼ expect dict of config dicts in config file
-                configsDict = cls.loader.load(configFile)
-                if configsDict is None:
-                    log.warning(f"{filetype.capitalize()} file is empty")
-                    return False
-                if not isinstance(configsDict, dict):
-                    log.error(f"Config loader {cls.loader.__class__.__name__} "
-                              f"returned invalid result type: {configsDict.__class__.__name__}")
-                    return False
+            with open(path, 'rb') as configFile:
+                data = configFile.read()
+                stat = fstat(configFile.fileno())
+            # ▼ expect dict of config dicts in config file
+            if cls.CACHE_PARSED_CONFIG and not backup: configsDict = cls._loadCached_(path, data, stat)
+            elif cls.LAZY_LOAD and cls._indexFile_(data.decode('utf-8')): return True
+            else: configsDict = cls.loader.load(data.decode('utf-8'))
+            if configsDict is None:
+                log.warning(f"{filetype.capitalize()} file is empty")
+                return False
+            if not isinstance(configsDict, dict):
+                log.error(f"Config loader {cls.loader.__class__.__name__} "
+                          f"returned invalid result type: {configsDict.__class__.__name__}")
+                return False
+            else:
+                global CONFIGS_DICT
+                SECTION_TEXTS.clear()
+                SECTION_ORDER[:] = configsDict
+                for section in configsDict: PENDING_SECTIONS.pop(section, None)
+                for configCls in CONFIG_CLASSES:
+                    if configCls.__section__ in configsDict: configCls._dirty_ = True
+                if not CONFIGS_DICT:
+                    CONFIGS_DICT = {key: cfg if cfg is not None else {} for key, cfg in configsDict.items()}
                 else:
-                    global CONFIGS_DICT
-                    if not CONFIGS_DICT:
-                        CONFIGS_DICT = {key: cfg if cfg is not None else {} for key, cfg in configsDict.items()}
-                    else:
-                        for section, config in configsDict.items():
-                            sectionDict = CONFIGS_DICT.setdefault(section, {})
-                            if config is not None: sectionDict.update(config)
-                    log.debug(f"Loaded sections: "
-                              f"{', '.join(f'{sName}({len(cDict)})' for sName, cDict in configsDict.items())}")
-                    return True  # succeeded loading from file
+                    for section, config in configsDict.items():
+                        sectionDict = CONFIGS_DICT.setdefault(section, {})
+                        if config is not None: sectionDict.update(config)
+                log.debug(f"Loaded sections: "
+                          f"{', '.join(f'{sName}({len(cDict)})' for sName, cDict in configsDict.items())}")
+                return True  # succeeded loading from file
         except YAMLError as e:
             log.error(f"Failed to parse {filetype} file:{linesep}{e}")
             return False
@@ -301,8 +612,71 @@ class ConfigLoader:
             return False
 
     @classmethod
-    def _addCurrentSection_(cls):
-        CONFIGS_DICT[cls.__section__] = deepcopy(dict(cls.members()))
+    def _indexFile_(cls, text: str) -> bool:
+        """ Split config file text into sections to be parsed on demand, return False if that is not possible
+            Sections already present in CONFIGS_DICT are parsed and updated right away
+        """
+        index = _indexSections_(text)
+        if not index: return False
+        SECTION_TEXTS.clear()
+        SECTION_ORDER[:] = index
+        for configCls in CONFIG_CLASSES:
+            if configCls.__section__ in index: configCls._dirty_ = True
+        for section, sectionText in index.items():
+            PENDING_SECTIONS[section] = sectionText
+            if section in CONFIGS_DICT: cls._parsePendingSection_(section)  # updates existing section
+        log.debug(f"Indexed sections: {', '.join(index)}")
+        return True
+
+    @classmethod
+    def _parsePendingSection_(cls, section: str) -> Optional[dict]:
+        """ Parse section text read by lazy load into CONFIGS_DICT, return None if there is no such section """
+        with LOCK:
+            text = PENDING_SECTIONS.pop(section, None)
+            if text is None: return None
+            try: config = cls.loader.load(text)[section]
+            except (YAMLError, TypeError, KeyError) as e:
+                log.error(f"Failed to parse section '{section}':{linesep}{e}")
+                config = None
+            sectionDict = CONFIGS_DICT.setdefault(section, {})
+            if isinstance(config, dict): sectionDict.update(config)
+            return sectionDict
+
+    @classmethod
+    def _loadCached_(cls, path, data: bytes, stat):
+        """ Return config dict from cache file if it matches config file `data`,
+                otherwise parse `data` and update cache file
+            Cache is keyed by config file mtime, size and hash, so any change of config file invalidates it
+            Cache is stored with marshal, which handles all SUPPORTED_TYPES and is much faster than YAML
+            NOTE: marshal is not secure against erroneous or maliciously constructed data, so cache file
+                  is trusted local state (written only by this class next to the config file), it is validated
+                  against config file by mtime, size and blake2b hash, not against tampering
+        """
+        cachePath = path + '.cache'
+        key = (stat.st_mtime_ns, stat.st_size, blake2b(data, digest_size=16).digest())
+        try:
+            with open(cachePath, 'rb') as cacheFile:
+                version, cachedKey, configsDict = marshal.load(cacheFile)
+            if version == CACHE_VERSION and cachedKey == key:
+                log.debug(f"Using parsed config cache {basename(cachePath)}")
+                return configsDict
+        except FileNotFoundError: pass
+        except (OSError, EOFError, ValueError, TypeError) as e:
+            log.debug(f"Ignoring invalid config cache {basename(cachePath)}: {e}")
+
+        configsDict = cls.loader.load(data.decode('utf-8'))
+        try:
+            cache = marshal.dumps((CACHE_VERSION, key, configsDict))
+            with open(cachePath + '.tmp', 'wb') as cacheFile: cacheFile.write(cache)
+            replace(cachePath + '.tmp', cachePath)
+        except (OSError, ValueError) as e:  # ValueError - unsupported types (ex: YAML timestamps)
+            log.debug(f"Cannot cache parsed config: {e}")
+        return configsDict
+
+    @classmethod
+    def _addCurrentSection_(cls, params: Dict[str, object] = None):
+        CONFIGS_DICT[cls.__section__] = _snapshot((params if params is not None else dict(cls.members())).items())
+        cls._dirty_ = False
         log.debug(f"New section added: {cls.__section__} {formatDict(CONFIGS_DICT[cls.__section__])}")
 
     # @staticmethod
@@ -0,0 +1,175 @@
+""" Background watcher reloading ConfigLoader sections when config file is edited externally
+    On Linux config directory is watched with inotify (via libc, no extra dependencies),
+        elsewhere or if inotify is not available config file is polled with os.stat()
+"""
+
+import os
+import select
+import struct
+import sys
+from os.path import basename, dirname, join as joinpath
+from threading import Event, Thread
+from time import monotonic
+from typing import Optional
+
+from .colored_logger import Logger
+
+__all__ = 'ConfigWatcher',
+
+log = Logger("ConfigWatcher")
+log.setLevel('INFO')
+
+
+class _Poller:
+    """ Detects config file changes by comparing its (mtime, size, inode) every `interval` seconds """
+
+    def __init__(self, path: str, interval: float):
+        self.path = path
+        self.interval = interval
+        self.stopped = Event()
+        self.stamp = self._stamp_()
+
+    def _stamp_(self):
+        try: stat = os.stat(self.path)
+        except OSError: return None
+        return stat.st_mtime_ns, stat.st_size, stat.st_ino
+
+    def wait(self, timeout: Optional[float]) -> bool:
+        """ Return True if file has changed within `timeout` seconds (None - until changed or woken up) """
+        deadline = None if timeout is None else monotonic() + timeout
+        while True:
+            stamp = self._stamp_()
+            if stamp != self.stamp:
+                self.stamp = stamp
+                return True
+            delay = self.interval if deadline is None else min(self.interval, deadline - monotonic())
+            if delay <= 0 or self.stopped.wait(delay): return False
+
+    def wakeup(self):
+        """ Make current and all further .wait() calls return False (poller is not reusable after that) """
+        self.stopped.set()
+
+    def close(self): pass
+
+
+class _Inotify:
+    """ Detects config file changes with inotify watch of its directory
+        Directory is watched instead of the file itself, as atomic saves replace the file (and its inode)
+    """
+
+    IN_MODIFY = 0x002
+    IN_CLOSE_WRITE = 0x008
+    IN_MOVED_FROM = 0x040
+    IN_MOVED_TO = 0x080
+    IN_CREATE = 0x100
+    IN_DELETE = 0x200
+    EVENT = struct.Struct('iIII')  # wd, mask, cookie, name length
+
+    def __init__(self, path: str):
+        import ctypes
+        import ctypes.util
+        if not sys.platform.startswith('linux'): raise OSError(f"inotify is not available on {sys.platform}")
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        self.filename = basename(path).encode()
+        self.fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0: raise OSError(ctypes.get_errno(), "inotify_init1() failed")
+        mask = (self.IN_MODIFY | self.IN_CLOSE_WRITE | self.IN_MOVED_FROM | self.IN_MOVED_TO |
+                self.IN_CREATE | self.IN_DELETE)
+        if libc.inotify_add_watch(self.fd, (dirname(path) or '.').encode(), mask) < 0:
+            os.close(self.fd)
+            raise OSError(ctypes.get_errno(), f"inotify_add_watch() failed for {dirname(path)}")
+        self.wakeupReader, self.wakeupWriter = os.pipe()
+
+    def wait(self, timeout: Optional[float]) -> bool:
+        """ Return True if file has changed within `timeout` seconds (None - until changed or woken up) """
+        deadline = None if timeout is None else monotonic() + timeout
+        while True:
+            delay = None if deadline is None else max(deadline - monotonic(), 0)
+            ready, _, _ = select.select((self.fd, self.wakeupReader), (), (), delay)
+            if not ready or self.wakeupReader in ready: return False
+            if self._readEvents_(): return True
+
+    def _readEvents_(self) -> bool:
+        """ Drain pending events, return True if any of them refers to watched file """
+        changed = False
+        try: data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError: return False
+        offset, size = 0, self.EVENT.size
+        while offset < len(data):
+            _, _, _, length = self.EVENT.unpack_from(data, offset)
+            name = data[offset + size: offset + size + length].rstrip(b'\0')
+            if name == self.filename: changed = True
+            offset += size + length
+        return changed
+
+    def wakeup(self):
+        os.write(self.wakeupWriter, b'\0')
+
+    def close(self):
+        for fd in (self.fd, self.wakeupReader, self.wakeupWriter): os.close(fd)
+
+
+class ConfigWatcher:
+    """ Background thread calling loader.reload() whenever config file of `loader` class is changed
+        Bursts of changes (editor saves, partial writes) are debounced: config is reloaded once,
+            after file has not been changed for `debounce` seconds
+        inotify is used on Linux, other platforms (or `polling=True`) check file every `interval` seconds
+        Usage:
+            >>> watcher = CONFIG.watch()
+            >>> @CONFIG.onChange
+            >>> def retune(changed): ...
+            >>> watcher.stop()
+    """
+
+    def __init__(self, loader, *, interval: float = 1.0, debounce: float = 0.2, polling: bool = False):
+        self.loader = loader
+        self.path: str = joinpath(loader.path, loader.filename)
+        self.interval: float = interval
+        self.debounce: float = debounce
+        self.polling: bool = polling
+        self.reloads: int = 0
+        self.running: bool = False
+        self.thread: Optional[Thread] = None
+        self.waiter = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, errtype, value, traceback):
+        self.stop()
+
+    def start(self):
+        if self.running: return self
+        # ▼ Waiter is created on every start, as .stop() wakes it up for good and closes it
+        if not self.polling:
+            try: self.waiter = _Inotify(self.path)
+            except (OSError, AttributeError) as e:
+                log.debug(f"Falling back to polling config file: {e}")
+        if self.waiter is None: self.waiter = _Poller(self.path, self.interval)
+        self.running = True
+        self.thread = Thread(name=f"ConfigWatcher: {basename(self.path)}", target=self._watch_, daemon=True)
+        self.thread.start()
+        log.debug(f"Watching {self.path} ({self.waiter.__class__.__name__.strip('_')})")
+        return self
+
+    def stop(self):
+        if not self.running: return
+        self.running = False
+        self.waiter.wakeup()
+        self.thread.join()
+        self.waiter.close()
+        self.waiter = None
+
+    def _watch_(self):
+        waiter = self.waiter
+        while self.running:
+            if not waiter.wait(None): continue
+            # ▼ Wait for the file to settle, so the change is parsed once
+            while self.running and waiter.wait(self.debounce): pass
+            if not self.running: break
+            try:
+                self.loader.reload()
+            except Exception as e:
+                log.error(f"Failed to reload config {basename(self.path)}: {e}")
+            self.reloads += 1
@@ -0,0 +1,139 @@
+from typing import Iterator, TextIO
+
+__all__ = 'bytewise', 'bytewise_format', 'bitwise', 'hexlines', 'hexdump'
+
+# ▼ Precomputed representations of all byte values
+HEX_TABLE = tuple(f'{byte:02X}' for byte in range(256))
+BIN_TABLE = tuple(f'{byte >> 4:04b} {byte & 0x0F:04b}' for byte in range(256))
+PRINTABLE_TABLE = bytes(byte if 0x20 <= byte < 0x7F else ord('.') for byte in range(256))
+
+# ▼ Wrapped dumps are formatted in blocks of this many lines, so memory overhead does not depend on data size
+LINES_PER_BLOCK = 1024
+
+
+def _hex(data) -> str:
+    """ Return space-separated uppercase hex octets, `data` should support buffer protocol """
+    return data.hex(' ').upper()
+
+
+def bytewise(bBytes, collapseAfter=None):
+    """
+    Represents sequence of bytes as hexidecimal space-separated
+    octets or '<Void>' if sequence is empty or equals to None
+
+    :param bBytes: bytes sequence to display
+    :type bBytes: bytes
+    :param collapseAfter: defines maximum output string length. Intermediate bytes are replaced with ellipsis.
+                          No length limit if 'collapseAfter' is set to 'None'
+                          Elided bytes are not formatted at all, so collapsed output costs the same for any data size
+    :type collapseAfter: int
+    :return: bytewise space-separated string
+    :rtype str
+    """
+
+    if (not bBytes or bBytes is None): return '<Void>'
+    if (collapseAfter is None or len(bBytes) <= collapseAfter): return _hex(memoryview(bBytes))
+    view = memoryview(bBytes)
+    headSize = (collapseAfter - 2) // 3 + 1 if collapseAfter >= 2 else len(view)
+    head = _hex(view[:headSize])[:collapseAfter - 2]
+    return f"{head} ... {HEX_TABLE[view[-1]]} ({len(bBytes)} bytes)"
+
+
+def bytewise_format(bBytes, void='<Void>'):
+    """Same as 'bytewise', but accepts any iterable of byte values"""
+
+    if not bBytes: return void
+    if not hasattr(bBytes, 'hex'): bBytes = bytes(bBytes)
+    return _hex(memoryview(bBytes))
+
+
+def bitwise(bBytes):
+    """
+    Represents sequence of bytes as bianry space-separated
+    octets or '<Void>' if sequence is empty or 'None'
+
+    :param bBytes: bytes sequence to display
+    :type bBytes: bytes
+    :return: bitwise space-separated string
+    :rtype str
+    """
+
+    if bBytes is None: return '<Void>'
+    return "  ".join(map(BIN_TABLE.__getitem__, bBytes))
+
+
+def hexlines(data, width: int = 16, offsets: bool = True, text: bool = False, start: int = 0) -> Iterator[str]:
+    """ Generate hex dump of `data` line by line, `width` bytes per line
+            offsets - prepend each line with hex offset of its first byte (counted from `start`)
+            text - append printable ASCII representation of line bytes
+        Data is formatted in blocks of LINES_PER_BLOCK lines, so multi-MB buffers are dumped
+            without building the whole dump in memory
+    """
+
+    view = memoryview(data).cast('B')
+    lineLength = width * 3 - 1
+    blockSize = width * LINES_PER_BLOCK
+    for blockStart in range(0, len(view), blockSize):
+        block = view[blockStart:blockStart + blockSize]
+        octets = _hex(block)
+        printable = bytes(block).translate(PRINTABLE_TABLE).decode('ascii') if text else None
+        for lineStart in range(0, len(block), width):
+            line = octets[lineStart * 3:lineStart * 3 + lineLength]
+            if text:
+                line = f"{line:<{lineLength}}  |{printable[lineStart:lineStart + width]}|"
+            if offsets:
+                line = f"{start + blockStart + lineStart:08X}  {line}"
+            yield line
+
+
+def hexdump(data, width: int = 16, offsets: bool = True, text: bool = False, file: TextIO = None):
+    """ Return multiline hex dump of `data` (see hexlines()) or write it to `file` if provided """
+    lines = hexlines(data, width, offsets, text)
+    if file is None: return '\n'.join(lines)
+    for line in lines: file.write(line + '\n')
+
+
+if __name__ == '__main__':
+    import random
+    from timeit import timeit
+
+    def _ref_bytewise(bBytes, collapseAfter=None):
+        if (not bBytes or bBytes is None): return '<Void>'
+        strRepr = " ".join(list(map(''.join, zip(*[iter(bBytes.hex().upper())] * 2))))
+        if (collapseAfter is None or len(bBytes) <= collapseAfter): return strRepr
+        else: return f"{strRepr[:collapseAfter - 2]} ... {strRepr[-2:]} ({len(bBytes)} bytes)"
+
+    def _ref_bytewise_format(bBytes, void='<Void>'):
+        return " ".join(f"{byte:02X}" for byte in iter(bBytes)) if bBytes else void
+
+    def _ref_bitwise(bBytes):
+        return "  ".join(
+                f"{byte >> 4:04b} {byte & 0x0F:04b}" for byte in iter(bBytes)
+        ) if bBytes is not None else '<Void>'
+
+    def test_exact():
+        for size in (0, 1, 2, 3, 15, 16, 17, 47, 48, 49, 1000):
+            data = bytes(random.getrandbits(8) for _ in range(size))
+            for collapseAfter in (None, 0, 1, 2, 3, 5, 16, 48, 100):
+                assert bytewise(data, collapseAfter) == _ref_bytewise(data, collapseAfter), (size, collapseAfter)
+            assert bytewise_format(data) == _ref_bytewise_format(data)
+            assert bitwise(data) == _ref_bitwise(data)
+        assert bytewise(None) == _ref_bytewise(None) and bitwise(None) == _ref_bitwise(None)
+        print("Exact: OK")
+
+    def benchmark():
+        print(f"{'size':>10} {'bytewise':>12} {'ref':>12} {'format':>12} {'ref':>12} {'bitwise':>12} {'ref':>12}"
+              f"  (µs per call)")
+        for size in (16, 256, 4096, 131_070):
+            data = bytes(random.getrandbits(8) for _ in range(size))
+            n = max(1, 200_000 // size)
+            results = [timeit(lambda: function(data), number=n) / n * 1e6 for function in
+                       (bytewise, _ref_bytewise, bytewise_format, _ref_bytewise_format, bitwise, _ref_bitwise)]
+            print(f"{size:>10} " + ' '.join(f"{result:>12.2f}" for result in results))
+        data = bytes(random.getrandbits(8) for _ in range(10_000_000))
+        print(f"Collapsed 10 MB: {timeit(lambda: bytewise(data, collapseAfter=48), number=100) * 1e4:.2f} µs")
+        print(f"Wrapped 10 MB: {timeit(lambda: sum(1 for _ in hexlines(data, text=True)), number=1):.2f} s")
+
+    test_exact()
+    benchmark()
+    print(hexdump(bytes(range(40)), text=True))
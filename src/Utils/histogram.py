@@ -0,0 +1,82 @@
+from math import ceil
+from typing import List, Optional
+
+__all__ = 'Histogram',
+
+
+class Histogram:
+    """ HDR-style histogram of non-negative integer values with fixed relative precision
+        Values are counted in log-linear buckets: values below 2**PRECISION_BITS are counted exactly,
+            larger ones - with relative error below 2**(1-PRECISION_BITS) (~1.6% by default)
+        .record() is O(1) and does not allocate, so histogram may be updated on every packet
+        Histogram is written by single thread and may be read from any other one:
+            .snapshot() works over a copy of bucket counts, so it never observes a half-updated state
+            of buckets (although .min / .max may be one record ahead of them)
+    """
+
+    PRECISION_BITS: int = 7
+
+    def __init__(self, highest: int = 3_600_000_000, unit: str = 'us'):
+        """ highest - largest value tracked precisely, larger ones are counted in the last bucket """
+        self.unit: str = unit
+        self.highest: int = highest
+        self.counts: List[int] = [0] * (self._index_(highest) + 1)
+        self.total: int = 0  # sum of all recorded values
+        self.min: Optional[int] = None
+        self.max: Optional[int] = None
+
+    @classmethod
+    def _index_(cls, value: int) -> int:
+        shift = value.bit_length() - cls.PRECISION_BITS
+        if shift <= 0: return value
+        return (shift << cls.PRECISION_BITS - 1) + (value >> shift)
+
+    @classmethod
+    def _highestEquivalent_(cls, index: int) -> int:
+        """ Return largest value counted in bucket `index` """
+        half = 1 << cls.PRECISION_BITS - 1
+        if index < half * 2: return index
+        shift = index // half - 1
+        return ((index - shift * half) << shift) + (1 << shift) - 1
+
+    def record(self, value: int):
+        if value < 0: value = 0
+        # ▼ Inlined ._index_(), this is on the hot path of every measurement
+        shift = value.bit_length() - self.PRECISION_BITS
+        index = value if shift <= 0 else (shift << self.PRECISION_BITS - 1) + (value >> shift)
+        counts = self.counts
+        if index >= len(counts): index = len(counts) - 1
+        counts[index] += 1
+        self.total += value
+        if self.min is None or value < self.min: self.min = value
+        if self.max is None or value > self.max: self.max = value
+
+    @property
+    def count(self) -> int:
+        return sum(self.counts)
+
+    def reset(self):
+        self.counts = [0] * len(self.counts)
+        self.total = 0
+        self.min = self.max = None
+
+    def percentile(self, percent: float, counts: List[int] = None) -> Optional[int]:
+        """ Return value below or equal to which `percent` of recorded values lie, None if histogram is empty """
+        if counts is None: counts = self.counts[:]
+        number = sum(counts)
+        if not number: return None
+        target = max(ceil(percent / 100 * number), 1)
+        accumulated = 0
+        for index, bucketCount in enumerate(counts):
+            accumulated += bucketCount
+            if accumulated >= target:
+                return min(self._highestEquivalent_(index), self.max)
+        return self.max
+
+    def snapshot(self) -> dict:
+        counts = self.counts[:]
+        number = sum(counts)
+        return dict(unit=self.unit, count=number, min=self.min, max=self.max,
+                    mean=self.total / number if number else None,
+                    **{f'p{str(percent).replace(".", "")}': self.percentile(percent, counts)
+                       for percent in (50, 90, 99, 99.9)})
@@ -0,0 +1,135 @@
+import json
+from functools import wraps
+from threading import Lock, local
+from time import perf_counter_ns
+from typing import Dict, Optional
+
+from .histogram import Histogram
+
+__all__ = 'Profiler', 'profiler'
+
+
+class _NullSpan:
+    """ Shared no-op span returned by disabled profiler """
+
+    __slots__ = ()
+
+    def __enter__(self): return self
+
+    def __exit__(self, errtype, value, traceback): pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    __slots__ = 'profiler', 'name', 'path', 'stack', 'start'
+
+    def __init__(self, profiler, name: str):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        stack = self.stack = self.profiler._stack_()
+        self.path = f'{stack[-1]}/{self.name}' if stack else self.name
+        stack.append(self.path)
+        self.start = perf_counter_ns()
+        return self
+
+    def __exit__(self, errtype, value, traceback):
+        elapsed = perf_counter_ns() - self.start
+        self.stack.pop()
+        self.profiler.record(self.path, elapsed)
+
+
+class Profiler:
+    """ Aggregating profiler of named code spans measured with perf_counter_ns()
+        Spans are nestable: span entered within other span (in the same thread) is recorded
+            under 'outer/inner' path, so report shows where the time of outer span is spent
+        Every span keeps HDR histogram of its durations (in ns), giving count/min/mean/p50/p99/max
+            with ~1.6% precision and constant memory regardless of number of measurements
+        Disabled profiler (.enabled = False) returns shared no-op span and calls decorated functions
+            directly, so instrumentation may be left in production code
+        Usage:
+            >>> with profiler.span('config.load'): ...
+            >>> @profiler.profile()                 # span named after function qualname
+            >>> def receivePacket(self): ...
+            >>> print(profiler.report())
+    """
+
+    def __init__(self, enabled: bool = True):
+        self.enabled: bool = enabled
+        self.spans: Dict[str, Histogram] = {}
+        self.lock = Lock()
+        self.local = local()
+
+    def _stack_(self) -> list:
+        try: return self.local.stack
+        except AttributeError:
+            stack = self.local.stack = []
+            return stack
+
+    def span(self, name: str):
+        """ Return context manager measuring time spent within `with` block """
+        if not self.enabled: return _NULL_SPAN
+        return _Span(self, name)
+
+    def profile(self, name: str = None):
+        """ Decorator measuring every call of decorated function (as a span named `name` or function qualname) """
+
+        def decorator(function):
+            spanName = name or function.__qualname__
+
+            @wraps(function)
+            def profile_wrapper(*args, **kwargs):
+                if not self.enabled: return function(*args, **kwargs)
+                with _Span(self, spanName):
+                    return function(*args, **kwargs)
+
+            return profile_wrapper
+
+        return decorator
+
+    def record(self, path: str, elapsed: int):
+        """ Record externally measured duration (ns) of span `path` """
+        with self.lock:
+            histogram = self.spans.get(path)
+            if histogram is None:
+                histogram = self.spans[path] = Histogram(highest=3_600_000_000_000, unit='ns')
+            histogram.record(elapsed)
+
+    def stats(self, path: str) -> Optional[dict]:
+        """ Return statistics of span `path`, None if it was never recorded """
+        with self.lock:
+            histogram = self.spans.get(path)
+            return histogram.snapshot() if histogram else None
+
+    def reset(self):
+        with self.lock: self.spans.clear()
+
+    def snapshot(self) -> Dict[str, dict]:
+        with self.lock:
+            paths = sorted(self.spans, key=lambda path: path.split('/'))
+            return {path: self.spans[path].snapshot() for path in paths}
+
+    def json(self, **kwargs) -> str:
+        return json.dumps(self.snapshot(), **kwargs)
+
+    def report(self, unit: str = 'us') -> str:
+        """ Return table of span statistics, nested spans are indented under their parents """
+
+        divider = {'ns': 1, 'us': 1e3, 'ms': 1e6, 's': 1e9}[unit]
+        columns = ('count', 'min', 'mean', 'p50', 'p99', 'max')
+        snapshot = self.snapshot()
+        width = max((len(path.rsplit('/', 1)[-1]) + 2 * path.count('/') for path in snapshot), default=4)
+        lines = [f"{'span':<{width}} " + ' '.join(f'{column:>10}' for column in columns) + f'  ({unit})']
+        for path, stats in snapshot.items():
+            name = '  ' * path.count('/') + path.rsplit('/', 1)[-1]
+            values = (f"{stats['count']:>10}",
+                      *(f"{stats[column] / divider:>10.3f}" for column in columns[1:]))
+            lines.append(f"{name:<{width}} " + ' '.join(values))
+        return '\n'.join(lines)
+
+
+# ▼ Default process-wide profiler, disabled until explicitly turned on
+profiler = Profiler(enabled=False)
@@ -1,14 +1,17 @@
 from contextlib import contextmanager
 from enum import Enum
 from functools import wraps
+import inspect
+from inspect import Parameter
 from itertools import chain as itertools_chain, zip_longest
 from os import linesep, system
-from typing import Union, Iterable, Type, Mapping
-from time import time
+from typing import Union, Iterable, Type, Mapping, ClassVar, get_origin
+from time import perf_counter_ns
 
 import stdlib_list
 
-from .bits import extract
+from .hexdump import bytewise, bytewise_format, bitwise
+from .caching import memo, memoLastPosArgs, cachedproperty
 
 sampledict = {
     1: 'a',
@@ -29,36 +32,43 @@ sampledict['self'] = sampledict
 
 
 class Timer:
+    """ Context manager printing duration of `with` block (in seconds multiplied by `mul`)
+        Measured duration is also kept in .elapsed
+        Use Utils.profiler to aggregate repeated measurements
+    """
 
     def __init__(self, name=None, mul=1):
         self.name = name
         self.multiplier = mul
         self.tstart = None
+        self.elapsed = None
         self.running = False
 
     def __enter__(self):
         self.start()
+        return self
 
     def __exit__(self, errtype, value, traceback):
         if errtype is None:
-            self.err()
+            self.stop(perf_counter_ns())
         else:
-            self.stop(time())
+            self.err()
 
     def start(self):
         if not self.running:
             self.running = True
-            self.tstart = time()
+            self.tstart = perf_counter_ns()
 
-    def stop(self, tick):
+    def stop(self, tick=None):
         if self.running:
             self.running = False
-            print(f"[{self.name or 'Timer'}] duration: {(tick - self.tstart)*self.multiplier}")
+            self.elapsed = ((tick or perf_counter_ns()) - self.tstart) / 1e9
+            print(f"[{self.name or 'Timer'}] duration: {self.elapsed*self.multiplier}")
 
     def err(self):
         if self.running:
             self.running = False
-            print(f"[{self.name or 'Timer'}] execution failure)")
+            print(f"[{self.name or 'Timer'}] execution failure")
 
 
 class InternalNameShadingVerifier():
@@ -151,48 +161,6 @@ def isint(num):
         return False
 
 
-def bytewise(bBytes, collapseAfter=None):
-    """
-    Represents sequence of bytes as hexidecimal space-separated
-    octets or '<Void>' if sequence is empty or equals to None
-
-    :param bBytes: bytes sequence to display
-    :type bBytes: bytes
-    :param collapseAfter: defines maximum output string length. Intermediate bytes are replaced with ellipsis.
-                          No length limit if 'collapseAfter' is set to 'None'
-    :type collapseAfter: int
-    :return: bytewise space-separated string
-    :rtype str
-    """
-
-    if (not bBytes or bBytes is None): return '<Void>'
-    strRepr = " ".join(list(map(''.join, zip(*[iter(bBytes.hex().upper())] * 2))))
-    if (collapseAfter is None or len(bBytes) <= collapseAfter): return strRepr
-    else: return f"{strRepr[:collapseAfter - 2]} ... {strRepr[-2:]} ({len(bBytes)} bytes)"
-
-
-def bytewise_format(bBytes, void='<Void>'):
-    """Same as 'bytewise' except different (more readable) implementation"""
-
-    return " ".join(f"{byte:02X}" for byte in iter(bBytes)) if bBytes else void
-
-
-def bitwise(bBytes):
-    """
-    Represents sequence of bytes as bianry space-separated
-    octets or '<Void>' if sequence is empty or 'None'
-
-    :param bBytes: bytes sequence to display
-    :type bBytes: bytes
-    :return: bitwise space-separated string
-    :rtype str
-    """
-
-    return "  ".join(
-            f"{byte >> 4:04b} {extract(byte, frombit=3):04b}" for byte in iter(bBytes)
-    ) if bBytes is not None else '<Void>'
-
-
 def legacy(legacy_entity):
     """ Decorator.
         Force prints warning mesage on legacy_function call.
@@ -214,57 +182,149 @@ def legacy(legacy_entity):
         return funWrapper
 
 
+class _Source(str):
+    """ String rendered without quotes by repr(), used to emit default value references into signatures """
+    def __repr__(self): return self
+
+
+def _empty(): pass
+def _emptyDocumented(): """ Docstring """
+
+
+def _isEmpty(function) -> bool:
+    """ Return whether function body does nothing (consists of 'pass' and/or docstring only) """
+    return function.__code__.co_code in (_empty.__code__.co_code, _emptyDocumented.__code__.co_code)
+
+
+def _generateInit(initFunc, at: str = 'end', assign: str = 'attr'):
+    """ Compile __init__ with `initFunc` signature that assigns its arguments to same-name object attrs
+            and calls `initFunc` with the same arguments before ('start') or after ('end') that
+        Generated once, so construction costs as much as hand-written assignments
+        assign - how attrs are set:
+            'attr' - plain `self.name = name`
+            'dict' - directly into instance __dict__
+            'object' - via object.__setattr__() (bypassing class __setattr__)
+        Defaults (including keyword-only ones) are assigned too, extra **kwargs are assigned as attrs
+        Call of `initFunc` is omitted if its body is empty
+    """
+
+    signature = inspect.signature(initFunc)
+    params = list(signature.parameters.values())
+    if not params or params[0].kind not in (Parameter.POSITIONAL_ONLY, Parameter.POSITIONAL_OR_KEYWORD):
+        raise TypeError(f"'{initFunc.__qualname__}' should take 'self' as first argument")
+    selfName = params[0].name
+    defaults = {}
+    signatureParams = [params[0]]
+    callArgs = []
+    names = []
+    varKeyword = None
+    for param in params[1:]:
+        if param.default is not Parameter.empty:
+            defaults[param.name] = param.default
+            param = param.replace(default=_Source(f"_defaults_[{param.name!r}]"))
+        signatureParams.append(param.replace(annotation=Parameter.empty))
+        if param.kind is Parameter.VAR_POSITIONAL:
+            callArgs.append(f'*{param.name}')
+        elif param.kind is Parameter.VAR_KEYWORD:
+            callArgs.append(f'**{param.name}')
+            varKeyword = param.name
+        else:
+            callArgs.append(f'{param.name}={param.name}' if param.kind is Parameter.KEYWORD_ONLY else param.name)
+            names.append(param.name)
+    signature = signature.replace(parameters=signatureParams, return_annotation=Parameter.empty)
+
+    if assign == 'attr':
+        lines = [f'{selfName}.{name} = {name}' for name in names]
+        if varKeyword: lines.append(f'for _name_, _value_ in {varKeyword}.items(): setattr({selfName}, _name_, _value_)')
+    elif assign == 'dict':
+        lines = [f'_dict_ = {selfName}.__dict__']
+        lines.extend(f'_dict_[{name!r}] = {name}' for name in names)
+        if varKeyword: lines.append(f'_dict_.update({varKeyword})')
+    elif assign == 'object':
+        lines = [f'_setattr_({selfName}, {name!r}, {name})' for name in names]
+        if varKeyword: lines.append(f'for _name_, _value_ in {varKeyword}.items(): _setattr_({selfName}, _name_, _value_)')
+    else: raise ValueError(f"Unknown assignment mode '{assign}'")
+    call = f"_init_({', '.join((selfName, *callArgs))})"
+    if _isEmpty(initFunc): lines.append('pass')
+    elif at in ('start', 's'): lines.insert(0, call)
+    else: lines.append(call)
+
+    template = f"def __init__{signature}:\n    " + '\n    '.join(lines) + '\n'
+    namespace = dict(_init_=initFunc, _defaults_=defaults, _setattr_=object.__setattr__)
+    exec(compile(template, f'<{initFunc.__qualname__} generated __init__>', 'exec'), namespace)
+    init = wraps(initFunc)(namespace['__init__'])
+    init.__source__ = template
+    return init
+
+
 def inject_args(initFunc):
     """ __init__ decorator.
         Automatically creates and initializes same-name object attrs based on args passed to '__init__'
+        (including default ones) before calling it
     """
-    # TODO: does not assign to default values specified in function definition
-    #       like '4' in following function: def f(a, b, c=4): ...
-    def init_wrapper(*args, **kwargs):
-        _self = args[0]
-        _self.__dict__.update(kwargs)
-        _total_names = initFunc.__code__.co_varnames[1:initFunc.__code__.co_argcount]
-        _values = args[1:]
-        _names = [n for n in _total_names if not n in kwargs]
-        d = dict()
-        for n, v in zip(_names, _values): d[n] = v
-        _self.__dict__.update(d)
-        initFunc(*args, **kwargs)
-
-    return init_wrapper
+    return _generateInit(initFunc, at='end', assign='dict')
 
 
 def inject_slots(at):
     """ __init__ decorator.
         Automatically creates and initializes same-name object slots based on args passed to '__init__'
+        (including default ones). `at` sets where original '__init__' body runs:
+            'start' (default, bare @inject_slots) - body runs first, slots are assigned after it
+            'end' - slots are assigned first, body runs after that and may use them
+        >>> @inject_slots('end')
+        >>> def __init__(self, a, b=2): ...
     """
-    # TODO: does not assign to default values specified in function definition
-    #       like '4' in following function: def f(a, b, c=4): ...
     if (type(at) is not str):
-        f = at
-        at = 'start'
+        return _generateInit(at, at='start', assign='object')
     elif (at not in ('start', 's', 'end', 'e')):
         raise ValueError("Define slots injection order as 'start' or 'end'")
 
     def decorator_inject_slots(initFunc):
-        @wraps(initFunc)
-        def init_wrapper(*args, **kwargs):
-            if (at == 'start' or at == 's'): initFunc(*args, **kwargs)
-            _self = args[0]
-            try: _self.__slots__
-            except AttributeError: raise TypeError(f"Class '{_self.__class__.__name__}' does not have __slots__ set")
-            for par, value in kwargs.items(): object.__setattr__(_self, par, value)
-            _total_names = initFunc.__code__.co_varnames[1:initFunc.__code__.co_argcount]
-            _values = args[1:]
-            _names = [n for n in _total_names if not n in kwargs]
-            args_dict = dict()
-            for n, v in zip(_names, _values): args_dict[n] = v
-            for par, value in args_dict.items(): object.__setattr__(_self, par, value)
-            if (at == 'end' or at == 'e'): initFunc(*args, **kwargs)
-
-        return init_wrapper
-
-    return decorator_inject_slots(f)
+        return _generateInit(initFunc, at=at, assign='object')
+
+    return decorator_inject_slots
+
+
+def inject_init(cls=None, *, at: str = 'end'):
+    """ Class decorator.
+        Replaces class '__init__' with generated one that assigns all its arguments
+            (positional, keyword-only, defaults and extra **kwargs) to same-name attrs/slots
+            and then ('end', default) or before that ('start') runs original '__init__' body
+        Code is generated once with exec, so construction runs at dataclass speed
+        Classes with custom __setattr__ (frozen records) are initialized via object.__setattr__()
+        >>> @inject_init
+        >>> @add_slots
+        >>> class Point:
+        >>>     x: int
+        >>>     y: int
+        >>>     def __init__(self, x, y=0, *, tag=None): pass
+    """
+
+    if cls is None: return lambda c: inject_init(c, at=at)
+    if at not in ('start', 's', 'end', 'e'): raise ValueError("Define injection order as 'start' or 'end'")
+    initFunc = cls.__dict__.get('__init__')
+    if initFunc is None: raise TypeError(f"Class '{cls.__name__}' does not define __init__")
+    assign = 'attr' if cls.__setattr__ is object.__setattr__ else 'object'
+    init = _generateInit(initFunc, at=at, assign=assign)
+    init.__qualname__ = f'{cls.__qualname__}.__init__'
+    cls.__init__ = init
+    return cls
+
+
+def _isClassVar(annotation) -> bool:
+    if isinstance(annotation, str):
+        annotation = annotation.replace(' ', '')
+        return annotation in ('ClassVar', 'typing.ClassVar') or \
+               annotation.startswith(('ClassVar[', 'typing.ClassVar[')) and annotation.endswith(']')
+    return annotation is ClassVar or get_origin(annotation) is ClassVar
+
+
+def _inheritedSlots(cls) -> set:
+    slots = set()
+    for base in cls.__mro__[1:]:
+        baseSlots = base.__dict__.get('__slots__', ())
+        slots.update((baseSlots,) if isinstance(baseSlots, str) else baseSlots)
+    return slots
 
 
 def add_slots(oldclass):
@@ -272,15 +332,23 @@ def add_slots(oldclass):
         Adds __slots__ to the class attrs that were annotated,
         except ones annotated with typing.ClassVar - those are left
         as conventional class variables
+        Slots already defined by base classes are not duplicated
+        Each cachedproperty gets a dedicated same-name slot, computed
+        on first access via __getattr__ (slot reads need no calls after that)
     """
 
     oldclass_dict = dict(oldclass.__dict__)
-    # inherited_slots = set().union(*(getattr(c, '__slots__', set()) for c in oldclass.mro()))
-    field_names = tuple(var[0] for var in getattr(oldclass, '__annotations__').items()
-                        if not (str(var[1]).startswith('ClassVar[') and str(var[1]).endswith(']')))
+    inherited_slots = _inheritedSlots(oldclass)
+    field_names = tuple(name for name, annotation in oldclass.__dict__.get('__annotations__', {}).items()
+                        if not _isClassVar(annotation))
+    cached = {name: attr for name, attr in oldclass_dict.items() if isinstance(attr, cachedproperty)}
 
-    oldclass_dict['__slots__'] = tuple(field for field in field_names)  # '... if field not in inherited_slots'
+    oldclass_dict['__slots__'] = tuple(field for field in (*field_names, *cached) if field not in inherited_slots)
     for f in field_names: oldclass_dict.pop(f, None)
+    if cached:
+        for name in cached: del oldclass_dict[name]
+        oldclass_dict['__cachedproperties__'] = cached
+        oldclass_dict['__getattr__'] = _cachedGetattr(cached, oldclass_dict.get('__getattr__'), oldclass)
     oldclass_dict.pop('__dict__', None)
     oldclass_dict.pop('__weakref__', None)
     newclass = type(oldclass.__name__, oldclass.__bases__, oldclass_dict)
@@ -289,10 +357,29 @@ def add_slots(oldclass):
     return newclass
 
 
+def _cachedGetattr(cached: dict, getattr_, oldclass):
+    """ Create __getattr__ computing cached properties of add_slots class
+        Other names are delegated to class own or inherited __getattr__, if any
+    """
+
+    if getattr_ is None:
+        getattr_ = next((vars(cls)['__getattr__'] for cls in oldclass.__mro__[1:] if '__getattr__' in vars(cls)), None)
+
+    def __getattr__(self, name):
+        prop = cached.get(name)
+        if prop is not None: return prop.compute(self)
+        if getattr_ is not None: return getattr_(self, name)
+        raise AttributeError(f"'{type(self).__name__}' object has no attribute '{name}'")
+
+    return __getattr__
+
+
 def store_value(name):
     """ Decorator (to use with methods only!) to cache single-output result
         Returns existing 'class.name' attr if one exists
         Otherwise computes and creates it first
+        Every call still goes through the wrapper - use cachedproperty
+            for argumentless methods, it costs a plain attribute read after first access
     """
     if (type(name) is not str): raise TypeError("Attribute name is required")
 
@@ -435,38 +522,6 @@ def formatList(seq, indent=0):
     return linesep.join(' '*indent + str(item) for item in seq)
 
 
-def memo(f):
-    """ Cache every no-side-effect function/method output
-        Function arguments must be immutable
-        'self' argument in methods is not cached """
-    excludeFirst = True if 'self' in f.__code__.co_varnames else False
-    memory = {}
-
-    @wraps(f)
-    def memoize_wrapper(*args, **kwargs):
-        if not kwargs: key = args[excludeFirst:]
-        else: key = (tuple(args), frozenset(kwargs.items()))
-        if key not in memory: memory[key] = f(*args, **kwargs)
-        return memory[key]
-    return memoize_wrapper
-
-
-def memoLastPosArgs(f):
-    """ Cache single last no-side-effect function/method output
-        Function should accept positional arguments only
-        'self' argument in methods is not cached """
-    f.cachedArgs = None
-    f.cachedRes = None
-    excludeFirst = True if 'self' in f.__code__.co_varnames else False
-
-    def wrapper(*args):
-        if args[excludeFirst:] != f.cachedArgs:
-            f.cachedArgs = args[excludeFirst:]
-            f.cachedRes = f(*args)
-        return f.cachedRes
-    return wrapper
-
-
 class Dummy:
     """ Void mock class returning itself on every attr access
         Use to avoid attribute/name errors with no if-checks